@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+# Route API reads to the async views (main/async_views.py)
+os.environ.setdefault('API_ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
@@ -0,0 +1,194 @@
+"""
+Gunicorn configuration, loaded with ``gunicorn -c python:backend.server``.
+
+The application and worker class follow SERVER_WORKER_CLASS:
+
+- ``sync`` (default): one request per process, backend.wsgi
+- ``gthread``: SERVER_THREADS requests per process, backend.wsgi
+- ``asgi``: uvicorn workers running backend.asgi and its async API views
+
+SERVER_PROFILE picks the rest. ``production`` (default) preloads Django
+in the master, so the workers it forks share its memory copy-on-write;
+sizes the workers from the CPUs and memory the container may use; and
+restarts each worker after about SERVER_MAX_REQUESTS requests, so memory
+a worker accumulates is given back. ``development`` runs one reloading
+worker with no timeout.
+
+WEB_CONCURRENCY and SERVER_THREADS override the computed sizes. Each
+worker logs its resident memory when it starts, split into the part it
+shares with the other processes (what preloading saves per worker) and
+the part that is its own.
+"""
+import gc
+import math
+import os
+import sys
+
+# The hooks below use Django settings, which the master has not loaded
+# unless the app is preloaded
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+WORKER_CLASSES = {
+    'sync': ('sync', 'backend.wsgi:application'),
+    'gthread': ('gthread', 'backend.wsgi:application'),
+    'asgi': ('uvicorn_worker.UvicornWorker', 'backend.asgi:application'),
+}
+
+# Share of the container's memory the workers may use between them, and
+# the budget for one worker (resident memory after serving for a while)
+MEMORY_SHARE = 0.75
+WORKER_MEMORY = int(os.getenv('SERVER_WORKER_MEMORY_MB', '192')) * 1024 * 1024
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def available_cpus():
+    """
+    CPUs this process may use: its affinity mask, capped by a cgroup CPU quota
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    # cgroup v2 "<quota> <period>" or "max <period>"; v1 has two files, -1 for no quota
+    quota = (_read('/sys/fs/cgroup/cpu.max') or '').split()
+    if len(quota) != 2:
+        quota = [_read('/sys/fs/cgroup/cpu/cpu.cfs_quota_us'), _read('/sys/fs/cgroup/cpu/cpu.cfs_period_us')]
+    try:
+        cpus = min(cpus, math.ceil(int(quota[0]) / int(quota[1])))
+    except (TypeError, ValueError, ZeroDivisionError):
+        pass
+    return max(1, cpus)
+
+
+def available_memory():
+    """
+    Bytes of memory this process may use: the machine's, capped by a cgroup memory limit
+    """
+    limits = []
+    for line in (_read('/proc/meminfo') or '').splitlines():
+        if line.startswith('MemTotal:'):
+            limits.append(int(line.split()[1]) * 1024)
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        value = _read(path)
+        if value and value.isdigit():
+            limits.append(int(value))
+    return min(limits) if limits else None
+
+
+def worker_count(cpus, memory):
+    """
+    2 × CPUs + 1 workers, or fewer if that many would not fit in memory
+    """
+    workers = 2 * cpus + 1
+    if memory is not None:
+        workers = min(workers, int(memory * MEMORY_SHARE // WORKER_MEMORY))
+    return max(1, workers)
+
+
+def thread_count(cpus, workers):
+    """
+    Threads per gthread worker, so all workers together run as many
+    requests as 2 × (2 × CPUs + 1) sync workers would
+    """
+    return max(2, min(16, math.ceil(2 * (2 * cpus + 1) / workers)))
+
+
+def memory_usage(pid='self'):
+    """
+    (resident, shared, private) bytes of a process, or None off Linux
+    """
+    fields = {}
+    for line in (_read(f'/proc/{pid}/smaps_rollup') or '').splitlines():
+        name, _, value = line.partition(':')
+        value = value.split()
+        if len(value) == 2 and value[1] == 'kB':
+            fields[name] = int(value[0]) * 1024
+    if 'Rss' not in fields:
+        return None
+    shared = fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)
+    return fields['Rss'], shared, fields['Rss'] - shared
+
+
+profile = os.getenv('SERVER_PROFILE', 'production')
+if profile not in ('production', 'development'):
+    sys.exit(f'SERVER_PROFILE must be production or development, not {profile!r}')
+server_worker_class = os.getenv('SERVER_WORKER_CLASS', 'sync')
+if server_worker_class not in WORKER_CLASSES:
+    sys.exit(f'SERVER_WORKER_CLASS must be one of {", ".join(WORKER_CLASSES)}, not {server_worker_class!r}')
+
+worker_class, wsgi_app = WORKER_CLASSES[server_worker_class]
+bind = os.getenv('DJANGO_BIND', '0.0.0.0:8000')
+cpus = available_cpus()
+memory = available_memory()
+
+if profile == 'development':
+    workers = int(os.getenv('WEB_CONCURRENCY', '1'))
+    reload = True
+    preload_app = False
+    timeout = 0
+    loglevel = 'debug'
+    accesslog = '-'
+else:
+    workers = int(os.getenv('WEB_CONCURRENCY') or worker_count(cpus, memory))
+    preload_app = os.getenv('SERVER_PRELOAD', 'True').lower() in ('1', 'true', 'yes')
+    # Restart workers after this many requests, at staggered times
+    max_requests = int(os.getenv('SERVER_MAX_REQUESTS', '1000'))
+    max_requests_jitter = max_requests // 10
+    # Just under nginx's 60s proxy timeouts, so a stuck worker is killed
+    # before nginx gives up on the request
+    timeout = int(os.getenv('SERVER_TIMEOUT', '55'))
+    graceful_timeout = 30
+    keepalive = 5
+    loglevel = os.getenv('SERVER_LOG_LEVEL', 'info')
+
+threads = 1
+if server_worker_class == 'gthread':
+    threads = int(os.getenv('SERVER_THREADS') or thread_count(cpus, workers))
+
+
+def on_starting(server):
+    # Worker pids are reused across restarts; start the request metrics afresh
+    from main import metrics
+    metrics.reset()
+    size = f'{memory // 2 ** 20} MiB' if memory else 'unknown memory'
+    server.log.info(
+        'Profile %s: %d %s worker(s)%s for %d CPU(s) and %s%s',
+        profile, workers, server_worker_class, f' × {threads} threads' if threads > 1 else '',
+        cpus, size, ', app preloaded' if preload_app else '',
+    )
+
+
+def pre_fork(server, worker):
+    if not preload_app:
+        return
+    # Connections opened while loading the app must not be shared with the workers
+    if 'django.db' in sys.modules:
+        from django.db import connections
+        connections.close_all()
+        # Nor a connection pool, whose threads do not survive the fork
+        for connection in connections.all():
+            if getattr(connection, 'pool', None) is not None:
+                connection.close_pool()
+    # Keep the collector off the preloaded objects, so it does not write
+    # to (and so copy) the pages the workers share with the master
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    from main import metrics
+    metrics.retire(worker.pid)
+
+
+def post_worker_init(worker):
+    usage = memory_usage()
+    if usage is not None:
+        resident, shared, private = (size / 2 ** 20 for size in usage)
+        worker.log.info('Worker %s started: %.1f MiB resident, %.1f MiB shared, %.1f MiB private',
+                        worker.pid, resident, shared, private)
@@ -8,6 +8,7 @@ Designed to work with SQLite locally and DATABASE_URL (Postgres) in production.
 
 from pathlib import Path
 import os
+import tempfile
 from datetime import timedelta
 import dj_database_url
 
@@ -39,6 +40,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "main.middleware.ServerTimingMiddleware",  # first, to time everything below
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  # serve static files in production
@@ -71,13 +73,27 @@ TEMPLATES = [
 WSGI_APPLICATION = "backend.wsgi.application"
 
 # Database
+# Connection pooling (Postgres, psycopg 3): each worker process keeps
+# DATABASE_POOL_MIN_SIZE to DATABASE_POOL_MAX_SIZE connections per database
+# open and lends them to requests, which wait up to DATABASE_POOL_TIMEOUT
+# seconds for one. With gthread workers, MAX_SIZE should cover
+# SERVER_THREADS. A pool replaces persistent connections, so
+# DATABASE_CONN_MAX_AGE is 0 with one. Pool usage is reported in /metrics
+DATABASE_POOL = os.getenv("DATABASE_POOL", "False").lower() in ("1", "true", "yes")
+DATABASE_POOL_OPTIONS = {
+    "min_size": int(os.getenv("DATABASE_POOL_MIN_SIZE", "1")),
+    "max_size": int(os.getenv("DATABASE_POOL_MAX_SIZE", "4")),
+    "timeout": float(os.getenv("DATABASE_POOL_TIMEOUT", "10")),
+}
+DATABASE_CONN_MAX_AGE = 0 if DATABASE_POOL else int(os.getenv("DATABASE_CONN_MAX_AGE", "600"))
+
 # Prefer DATABASE_URL env (Postgres). Fallback to sqlite for local dev.
 DATABASE_URL = os.getenv("DATABASE_URL", "")
 if DATABASE_URL:
     DATABASES = {
         "default": dj_database_url.parse(
             DATABASE_URL, 
-            conn_max_age=600,
+            conn_max_age=DATABASE_CONN_MAX_AGE,
             conn_health_checks=True,  # Added for better connection handling
         )
     }
@@ -86,9 +102,37 @@ else:
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            # Take the write lock when a transaction starts, so a job worker and
+            # the dev server wait for each other instead of failing with
+            # "database is locked" when both upgrade a read to a write
+            "OPTIONS": {"transaction_mode": "IMMEDIATE"},
         }
     }
 
+# Read replicas: comma-separated database URLs. Safe-method API requests
+# read from them in turn (see main/routers.py); writes, and requests from a
+# client that just wrote, stay on the default database
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+DATABASE_REPLICAS = []
+for index, url in enumerate(DATABASE_REPLICA_URLS):
+    alias = f"replica_{index}"
+    DATABASES[alias] = dj_database_url.parse(url, conn_max_age=DATABASE_CONN_MAX_AGE, conn_health_checks=True)
+    # Tests read the replicas' rows from the test copy of the default database
+    DATABASES[alias]["TEST"] = {"MIRROR": "default"}
+    DATABASE_REPLICAS.append(alias)
+# Seconds a client that wrote keeps reading from the primary, a replica that
+# failed is left alone, and a response read from a replica may be cached
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv("DATABASE_REPLICA_PIN_SECONDS", "5"))
+DATABASE_REPLICA_RETRY_SECONDS = int(os.getenv("DATABASE_REPLICA_RETRY_SECONDS", "30"))
+DATABASE_REPLICA_CACHE_TIMEOUT = int(os.getenv("DATABASE_REPLICA_CACHE_TIMEOUT", "30"))
+if DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ["main.routers.ReplicaRouter"]
+    MIDDLEWARE.insert(1, "main.middleware.ReplicaRoutingMiddleware")
+if DATABASE_POOL:
+    for database in DATABASES.values():
+        if database["ENGINE"] == "django.db.backends.postgresql":
+            database.setdefault("OPTIONS", {})["pool"] = dict(DATABASE_POOL_OPTIONS)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
@@ -116,17 +160,94 @@ MEDIA_ROOT = BASE_DIR / "media"
 # REST framework
 REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": ["rest_framework.permissions.AllowAny"],
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    "DEFAULT_PAGINATION_CLASS": "main.pagination.KeysetPagination",
     "PAGE_SIZE": 10,
-    # Added for production
+    # JSON encoded with orjson, byte for byte as JSONRenderer would (main/renderers.py)
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
+        "main.renderers.ORJSONRenderer",
     ] if not DEBUG else [
-        "rest_framework.renderers.JSONRenderer",
+        "main.renderers.ORJSONRenderer",
         "rest_framework.renderers.BrowsableAPIRenderer",
     ],
 }
 
+# Cache
+# Redis when REDIS_URL is set (needs the `redis` package), otherwise a file
+# cache that all gunicorn workers in the container share.
+REDIS_URL = os.getenv("REDIS_URL", "")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.getenv("CACHE_DIR", os.path.join(tempfile.gettempdir(), "aiclub-cache")),
+            "OPTIONS": {"MAX_ENTRIES": 5000},
+        }
+    }
+
+# API response cache (main/cache.py). Entries are invalidated when the
+# underlying models change; the timeout bounds staleness of views_count,
+# which is updated without signals.
+API_CACHE_ENABLED = os.getenv("API_CACHE_ENABLED", "True").lower() in ("1", "true", "yes")
+API_CACHE_TIMEOUT = int(os.getenv("API_CACHE_TIMEOUT", "300"))
+
+# Blog view counter: views are buffered per process and flushed in batches
+VIEW_COUNTER_FLUSH_INTERVAL = float(os.getenv("VIEW_COUNTER_FLUSH_INTERVAL", "5"))
+VIEW_COUNTER_FLUSH_THRESHOLD = int(os.getenv("VIEW_COUNTER_FLUSH_THRESHOLD", "100"))
+VIEW_COUNTER_MAX_BEACON_IDS = int(os.getenv("VIEW_COUNTER_MAX_BEACON_IDS", "50"))
+
+# Widths, in pixels, of the resized copies made of uploaded images (see main/images.py)
+IMAGE_RENDITION_WIDTHS = [
+    int(width) for width in os.getenv("IMAGE_RENDITION_WIDTHS", "96,320,960,1920").split(",")
+]
+
+# Background jobs (see main/jobs.py; run them with `manage.py run_worker`).
+# JOBS_ALWAYS_EAGER runs jobs in-process after the commit instead, for development
+JOBS_ALWAYS_EAGER = os.getenv("JOBS_ALWAYS_EAGER", "False").lower() in ("1", "true", "yes")
+JOBS_MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", "5"))
+# Retry delay doubles from JOBS_BACKOFF_SECONDS up to JOBS_BACKOFF_MAX_SECONDS
+JOBS_BACKOFF_SECONDS = float(os.getenv("JOBS_BACKOFF_SECONDS", "10"))
+JOBS_BACKOFF_MAX_SECONDS = float(os.getenv("JOBS_BACKOFF_MAX_SECONDS", "3600"))
+# A running job whose worker has not finished it after this long is requeued
+JOBS_LEASE_SECONDS = int(os.getenv("JOBS_LEASE_SECONDS", "900"))
+JOBS_KEEP_DONE_SECONDS = int(os.getenv("JOBS_KEEP_DONE_SECONDS", "86400"))
+
+# The /api/stats/ snapshot (main/stats.py) is rebuilt at least this often,
+# for view counts; run_worker rebuilds it on this schedule
+STATS_REFRESH_INTERVAL = int(os.getenv("STATS_REFRESH_INTERVAL", "300"))
+
+# Pre-rendered API responses that nginx serves (main/snapshots.py); off
+# unless API_SNAPSHOT_DIR is set. API_SNAPSHOT_BASE_URL is the public origin,
+# for the absolute URLs in them; its host must be in ALLOWED_HOSTS
+API_SNAPSHOT_DIR = os.getenv("API_SNAPSHOT_DIR", "")
+API_SNAPSHOT_BASE_URL = os.getenv("API_SNAPSHOT_BASE_URL", "http://localhost")
+API_SNAPSHOT_REFRESH_INTERVAL = int(os.getenv("API_SNAPSHOT_REFRESH_INTERVAL", "300"))
+
+# Serve list and detail GETs from the async views (main/async_views.py);
+# backend/asgi.py turns this on, WSGI deployments leave it off
+API_ASYNC_VIEWS = os.getenv("API_ASYNC_VIEWS", "False").lower() in ("1", "true", "yes")
+
+# Request metrics (main/metrics.py): each worker writes its own to METRICS_DIR
+# at most every METRICS_FLUSH_INTERVAL seconds, and /metrics adds them up
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(tempfile.gettempdir(), "aiclub-metrics"))
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+# /metrics answers loopback and private addresses that did not come through a
+# proxy; with a token set, it answers requests sending "Authorization: Bearer <token>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Build list responses from values_list() rows rather than model instances
+# and serializer fields (main/values.py); the output is the same
+API_VALUES_SERIALIZERS = os.getenv("API_VALUES_SERIALIZERS", "True").lower() in ("1", "true", "yes")
+
+# Rows fetched per query by the /export/ endpoints
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "2000"))
+
 # CORS
 # Provide CORS_ALLOWED_ORIGINS as comma separated env or fallback to local dev ports
 _default_cors = "http://localhost:5173,http://localhost:3000,http://127.0.0.1:5173,http://127.0.0.1:3000"
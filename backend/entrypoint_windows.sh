@@ -54,19 +54,20 @@ echo "[entrypoint] Installing requirements from requirements.txt..."
 # Upgrade pip, setuptools, wheel before install
 pip install --upgrade pip setuptools wheel
 
-# Create temp requirements file excluding psycopg2-binary
-grep -v 'psycopg2-binary' "$ROOT_DIR/requirements.txt" > /tmp/req_no_psycopg2.txt || true
+# Create temp requirements file excluding psycopg
+grep -v '^psycopg' "$ROOT_DIR/requirements.txt" > /tmp/req_no_psycopg.txt || true
 
-# Install everything except psycopg2-binary first
+# Install everything except psycopg first
 echo "[entrypoint] Installing core requirements..."
-pip install -r /tmp/req_no_psycopg2.txt
+pip install -r /tmp/req_no_psycopg.txt
 
-# Try to install psycopg2-binary with binary wheels only
-echo "[entrypoint] Attempting to install psycopg2-binary..."
-if pip install --only-binary=:all: psycopg2-binary; then
-  echo "[entrypoint] psycopg2-binary installed successfully."
+# Try to install psycopg with binary wheels only
+PSYCOPG_REQUIREMENT="$(grep '^psycopg' "$ROOT_DIR/requirements.txt")"
+echo "[entrypoint] Attempting to install $PSYCOPG_REQUIREMENT..."
+if pip install --only-binary=:all: "$PSYCOPG_REQUIREMENT"; then
+  echo "[entrypoint] psycopg installed successfully."
 else
-  echo "[entrypoint] WARNING: Could not install psycopg2-binary."
+  echo "[entrypoint] WARNING: Could not install psycopg."
   echo "This is OK if you're using SQLite. For PostgreSQL, install PostgreSQL and add pg_config to PATH."
 fi
 
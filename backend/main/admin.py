@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Member, BlogPost, Project
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .models import Member, BlogPost, Project, Technology, Job
 
 # Register your models here.
 
@@ -82,3 +84,33 @@ class ProjectAdmin(admin.ModelAdmin):
             'fields': ('start_date', 'end_date', 'status'),
         }),
     )
+
+
+@admin.register(Technology)
+class TechnologyAdmin(admin.ModelAdmin):
+    list_display = ('name', 'key')
+    search_fields = ('name', 'key')
+    readonly_fields = ('key',)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'run_at', 'finished_at', 'dedupe_key')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'dedupe_key', 'last_error')
+    readonly_fields = ('locked_by', 'locked_at', 'created_at', 'finished_at', 'last_error')
+    actions = ('retry',)
+
+    @admin.action(description='Run selected failed jobs again')
+    def retry(self, request, queryset):
+        count = 0
+        for job in queryset.filter(status=Job.FAILED):
+            try:
+                with transaction.atomic():
+                    Job.objects.filter(pk=job.pk).update(
+                        status=Job.QUEUED, attempts=0, run_at=timezone.now(), finished_at=None)
+            except IntegrityError:
+                # A job with the same dedupe key is already queued
+                continue
+            count += 1
+        self.message_user(request, f'Queued {count} job(s) again')
@@ -1,6 +1,23 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'main'
+
+    def ready(self):
+        # Connect the signal handlers and register the background jobs
+        from . import images, roster, signals, snapshots, stats  # noqa: F401
+        post_migrate.connect(repair_search_index, sender=self)
+
+
+def repair_search_index(using, **kwargs):
+    # A safety net; migration 0003 creates the index. SQLite drops a table's
+    # triggers when a later migration rebuilds the table, so recreate them
+    from django.db import connections
+    from .search import FTS_TABLE, install_search_index
+
+    connection = connections[using]
+    if connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names():
+        install_search_index(connection)
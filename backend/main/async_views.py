@@ -0,0 +1,212 @@
+"""
+Native async read path for the API viewsets, used when served over ASGI.
+
+``GET`` list and detail requests for members, blogs and projects are
+answered by ``async_read_view()`` views that use the async ORM
+(``aaggregate``, ``acount``, ``aiterator``, ``aget``), so while one
+request waits on the cache or the database the worker's event loop serves
+others. Django runs each query in a thread, so queries themselves are no
+faster; a cache hit or a 304 costs one trip to a thread for the cache.
+
+The response cache, validators, sparse fields, serializers and page-number
+pagination are the viewset's own, so both paths produce the same bytes and
+share cache entries. Anything else (other methods, ``?format=``, the
+browsable API, cursor pagination) is handed to the DRF viewset, which runs
+in a thread like any sync view under ASGI.
+
+The routes are only installed when API_ASYNC_VIEWS is set, which
+backend/asgi.py does. Under WSGI an async view would need a new event loop
+per request, so there every request goes straight to the sync viewsets.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.core.paginator import InvalidPage, Page
+from django.http import Http404, HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException, NotAcceptable, NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.views import exception_handler
+
+from .cache import get_versions
+from .conditional import conditional_response, set_validators
+from .renderers import ORJSONRenderer
+from .search import aget_search_backend
+
+
+def async_read_view(viewset_class, basename, detail=False):
+    """
+    Async view for a read-only viewset's list (or, with ``detail``, retrieve) route
+    """
+    action = 'retrieve' if detail else 'list'
+    sync_view = sync_to_async(viewset_class.as_view({'get': action}, basename=basename, detail=detail))
+
+    # DRF checks CSRF itself for the requests handed to the viewset
+    @csrf_exempt
+    async def view(request, **kwargs):
+        viewset = viewset_class(basename=basename, detail=detail, action=action)
+        # What ViewSetMixin.as_view() sets up; handlers also decide the Allow header
+        viewset.action_map = {'get': action}
+        viewset.get = viewset.head = getattr(viewset, action)
+        viewset.args, viewset.kwargs = (), kwargs
+        viewset.format_kwarg = None
+        # A public, read-only API: no authentication, which may query the session
+        viewset.request = Request(request, authenticators=(), negotiator=viewset.get_content_negotiator())
+        viewset.headers = viewset.default_response_headers
+        if request.method != 'GET' or not _can_serve(viewset):
+            return await sync_view(request, **kwargs)
+        try:
+            response = await _cached(viewset, _retrieve if detail else _list)
+        except (APIException, Http404) as exc:
+            response = exception_handler(exc, {'view': viewset, 'request': viewset.request})
+            # Headers the handler added, e.g. Retry-After; not the unrendered Content-Type
+            headers = {name: value for name, value in response.items() if name != 'Content-Type'}
+            response = _render(viewset, response.data, response.status_code, headers)
+        return _finalize(viewset, response)
+
+    # What ServerTimingMiddleware names the view after, as for the DRF viewsets
+    view.cls, view.actions = viewset_class, {'get': action}
+    return view
+
+
+def _can_serve(viewset):
+    request = viewset.request
+    if viewset.settings.URL_FORMAT_OVERRIDE in request.query_params:
+        return False
+    if getattr(viewset, 'keyset_field', None) and viewset.paginator.use_keyset(request):
+        return False
+    try:
+        renderer, media_type = viewset.perform_content_negotiation(request)
+    except NotAcceptable:
+        return False
+    # Not a subclass: the browsable API renderer is one
+    if type(renderer) not in (JSONRenderer, ORJSONRenderer):
+        return False
+    request.accepted_renderer, request.accepted_media_type = renderer, media_type
+    return True
+
+
+def _render(viewset, data, status=200, headers=None):
+    """
+    The response DRF would send for ``data``, rendered with the negotiated JSON renderer
+    """
+    request = viewset.request
+    renderer = getattr(request, 'accepted_renderer', None) or ORJSONRenderer()
+    media_type = getattr(request, 'accepted_media_type', None) or renderer.media_type
+    response = HttpResponse(status=status, content_type=media_type)
+    response.content = renderer.render(data, media_type, {'view': viewset, 'request': request, 'response': response})
+    for name, value in (headers or {}).items():
+        response[name] = value
+    return response
+
+
+def _finalize(viewset, response):
+    # The headers APIView.finalize_response() adds to every response
+    headers = dict(viewset.headers)
+    vary = headers.pop('Vary', None)
+    if vary is not None:
+        patch_vary_headers(response, [vary])
+    for name, value in headers.items():
+        response[name] = value
+    return response
+
+
+async def _cached(viewset, build):
+    """
+    CachedResponseMixin.cached_response() for async views
+    """
+    request = viewset.request
+    # The cache calls go to a thread together: Django's async cache methods
+    # would each take their own trip through the thread that runs sync code
+    if not settings.API_CACHE_ENABLED:
+        versions = await sync_to_async(get_versions, thread_sensitive=False)(viewset.cache_dependencies)
+        return await build(viewset, versions)
+
+    versions, key, entry = await sync_to_async(viewset.cache_lookup, thread_sensitive=False)(request)
+    if entry is not None:
+        response = viewset._not_modified(request, entry['headers'])
+        if response is None:
+            response = _render(viewset, entry['data'], entry['status'], entry['headers'])
+        response['X-Cache'] = 'HIT'
+        return response
+
+    response = await build(viewset, versions)
+    await sync_to_async(viewset.cache_store, thread_sensitive=False)(key, response)
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+async def _filtered_queryset(viewset):
+    queryset = viewset.get_queryset()
+    # BlogSearchFilter looks up the search backend with a query the first time
+    await aget_search_backend(queryset.db)
+    return viewset.filter_queryset(queryset)
+
+
+async def _list(viewset, versions):
+    request = viewset.request
+    queryset = await _filtered_queryset(viewset)
+    values = await queryset.order_by().aaggregate(**viewset.list_aggregates())
+    etag, last_modified = viewset.list_validators(request, values, versions)
+    response = conditional_response(request, etag, last_modified)
+    if response is not None:
+        return response
+
+    paginator = viewset.paginator
+    page = await _paginate(paginator, queryset, request)
+    data = paginator.get_paginated_response(viewset.get_serializer(page, many=True).data).data
+    response = _render(viewset, data)
+    response.data = data
+    set_validators(response, etag, last_modified)
+    return response
+
+
+async def _paginate(paginator, queryset, request):
+    """
+    PageNumberPagination.paginate_queryset() with async queries
+    """
+    page_size = paginator.get_page_size(request)
+    django_paginator = paginator.django_paginator_class(queryset, page_size)
+    # Paginator.count is a cached_property; fill it so nothing counts synchronously
+    django_paginator.count = await queryset.acount()
+    page_number = paginator.get_page_number(request, django_paginator)
+    try:
+        number = django_paginator.validate_number(page_number)
+    except InvalidPage as exc:
+        raise NotFound(paginator.invalid_page_message.format(page_number=page_number, message=str(exc)))
+    bottom = (number - 1) * page_size
+    top = bottom + page_size
+    if top + django_paginator.orphans >= django_paginator.count:
+        top = django_paginator.count
+    rows = [row async for row in queryset[bottom:top].aiterator(chunk_size=page_size)]
+
+    paginator.page = Page(rows, number, django_paginator)
+    paginator.request = request
+    # KeysetPagination's link methods check which mode produced the page
+    paginator.keyset = False
+    return rows
+
+
+async def _retrieve(viewset, versions):
+    request = viewset.request
+    queryset = await _filtered_queryset(viewset)
+    if hasattr(viewset, 'get_lookup_filter'):
+        lookup = viewset.get_lookup_filter()
+    else:
+        lookup = {viewset.lookup_field: viewset.kwargs[viewset.lookup_url_kwarg or viewset.lookup_field]}
+    try:
+        instance = await queryset.aget(**lookup)
+    except (ObjectDoesNotExist, TypeError, ValueError, ValidationError):
+        raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+
+    etag, last_modified = viewset.get_object_validators(request, instance, versions)
+    response = conditional_response(request, etag, last_modified)
+    if response is not None:
+        return response
+    data = viewset.get_serializer(instance).data
+    response = _render(viewset, data)
+    response.data = data
+    set_validators(response, etag, last_modified)
+    return response
@@ -0,0 +1,202 @@
+"""
+Helpers shared by the benchmark_* management commands
+"""
+import asyncio
+import math
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.test import Client
+from django.test.utils import override_settings
+
+
+class Rollback(Exception):
+    """
+    Raised inside transaction.atomic() to throw away benchmark data
+    """
+
+
+def measure(func, repeat):
+    """
+    Call ``func`` ``repeat`` times and return each call's duration in milliseconds
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of ``values`` (0 < pct <= 100)
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(durations):
+    return {
+        'p50': percentile(durations, 50),
+        'p95': percentile(durations, 95),
+        'p99': percentile(durations, 99),
+        'mean': sum(durations) / len(durations) if durations else 0.0,
+    }
+
+
+@contextmanager
+def api_client(**settings_overrides):
+    """
+    In-process test client with the response cache off, so every request does real work
+    """
+    settings_overrides.setdefault('API_CACHE_ENABLED', False)
+    with override_settings(ALLOWED_HOSTS=['testserver'], **settings_overrides):
+        yield Client()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def server(args, port, env=None, ready_path='/api/', timeout=60):
+    """
+    Run ``args`` (a server command line listening on ``port``) in the project
+    directory until the block exits; waits until ``ready_path`` answers
+    """
+    process = subprocess.Popen(
+        args, cwd=settings.BASE_DIR, env={**os.environ, **(env or {})},
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f'{args[0]} exited: {process.stderr.read().decode(errors="replace")[-2000:]}')
+            try:
+                status, _ = asyncio.run(_get('127.0.0.1', port, ready_path))
+                if status < 500:
+                    break
+            except OSError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f'{args[0]} did not answer on port {port} within {timeout}s')
+            time.sleep(0.2)
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def gunicorn_args(port, workers=None):
+    """
+    Command line for gunicorn with the server profile in backend/server.py;
+    the worker class comes from SERVER_WORKER_CLASS in the environment
+    """
+    args = [sys.executable, '-m', 'gunicorn', '--config', 'python:backend.server',
+            '--bind', f'127.0.0.1:{port}', '--log-level', 'warning']
+    if workers:
+        args += ['--workers', str(workers)]
+    return args
+
+
+async def _read_response(reader):
+    """
+    Read one HTTP/1.1 response; return (status, keep the connection open)
+    """
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip().lower()
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif status not in (204, 304):
+        await reader.read()
+        return status, False
+    return status, headers.get('connection') != 'close'
+
+
+def _request(host, port, path):
+    return (f'GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n'
+            f'Accept: application/json\r\nAccept-Encoding: identity\r\n\r\n').encode()
+
+
+async def _get(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(_request(host, port, path))
+        return await _read_response(reader)
+    finally:
+        writer.close()
+
+
+async def _client(host, port, paths, offset, deadline, timeout, latencies, failures):
+    reader = writer = None
+    index = offset
+    while time.perf_counter() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+            writer.write(_request(host, port, path))
+            status, keep_alive = await asyncio.wait_for(_read_response(reader), timeout)
+        except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            failures.append(None)
+            keep_alive = False
+        else:
+            latencies.append((time.perf_counter() - start) * 1000)
+            if status >= 400:
+                failures.append(status)
+        if not keep_alive and writer is not None:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+def run_load(port, paths, connections, duration, timeout=30, host='127.0.0.1'):
+    """
+    Keep ``connections`` clients requesting ``paths`` in turn for ``duration`` seconds
+
+    Connections are kept alive when the server allows it (gunicorn's sync
+    workers close them after every response). Returns (latencies in ms of
+    completed requests, failed requests, elapsed seconds).
+    """
+    async def main():
+        latencies, failures = [], []
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(
+            _client(host, port, paths, offset, deadline, timeout, latencies, failures)
+            for offset in range(connections)
+        ))
+        return latencies, len(failures), time.perf_counter() - start
+
+    return asyncio.run(main())
@@ -0,0 +1,163 @@
+"""
+Response cache for the read-only API viewsets.
+
+Serialized response data is cached under a key built from the request
+host, path and normalized query parameters plus the current *version* of
+every model the response depends on. Saving or deleting a model bumps its
+version (see main/signals.py), so stale entries are never read again and
+simply expire. Responses carry an ``X-Cache: HIT`` or ``MISS`` header,
+which ServerTimingMiddleware counts in the per-process metrics (see
+main/metrics.py); the request path writes nothing to the cache but the
+entries themselves.
+"""
+import functools
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+from .routers import pinned_to_primary, reading_replica
+
+KEY_PREFIX = 'api'
+
+# Response headers stored with an entry and replayed on a hit
+CACHED_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control', 'Vary')
+
+# Query parameters whose values are compared case-insensitively by the views
+_LOWERCASE_PARAMS = {'active', 'por_holders', 'published'}
+
+
+def _version_key(model):
+    return f'{KEY_PREFIX}:version:{model._meta.label_lower}'
+
+
+def get_versions(models):
+    """
+    Return the current cache version of each model, initialising missing ones
+    """
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # A time-based start value means an evicted version can never
+            # come back as one that older entries were stored under
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(model):
+    """
+    Invalidate every cached response that depends on ``model``
+    """
+    cache.set(_version_key(model), time.time_ns(), None)
+
+
+def normalize_query(query_params):
+    """
+    Return a canonical query string so equivalent requests share a cache entry
+    """
+    items = []
+    for key in sorted(query_params.keys()):
+        for value in sorted(query_params.getlist(key)):
+            if key == 'search':
+                value = ' '.join(value.split()).lower()
+            elif key in _LOWERCASE_PARAMS:
+                value = value.lower()
+            elif key == 'page' and value == '1':
+                continue
+            items.append((key, value))
+    return urlencode(items)
+
+
+def response_cache_key(request, resource, dependencies, versions=None):
+    if versions is None:
+        versions = get_versions(dependencies)
+    raw = '|'.join([
+        request.scheme,
+        request.get_host(),
+        request.path,
+        normalize_query(request.query_params),
+        ','.join(str(version) for version in versions),
+    ])
+    digest = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    return f'{KEY_PREFIX}:response:{resource}:{digest}'
+
+
+class CachedResponseMixin:
+    """
+    Cache successful GET responses of a read-only viewset
+
+    ``cache_dependencies`` lists every model whose changes can alter the
+    viewset's output, e.g. BlogPost responses embed Member details.
+    """
+    cache_dependencies = ()
+
+    def cached_response(self, request, build):
+        if not settings.API_CACHE_ENABLED or request.method not in ('GET', 'HEAD'):
+            return build()
+
+        _, key, entry = self.cache_lookup(request)
+        if entry is not None:
+            response = self._not_modified(request, entry['headers'])
+            if response is None:
+                response = Response(entry['data'], status=entry['status'], headers=entry['headers'])
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = build()
+        self.cache_store(key, response)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def cache_lookup(self, request):
+        """
+        Return (dependency versions, cache key, cached entry or None)
+        """
+        versions = get_versions(self.cache_dependencies)
+        key = response_cache_key(request, self.basename, self.cache_dependencies, versions)
+        # A client that just wrote rebuilds the entry from the primary: the
+        # one stored may have come from a replica that had not caught up
+        entry = None if pinned_to_primary() else cache.get(key)
+        return versions, key, entry
+
+    def cache_store(self, key, response):
+        if response.status_code == 200:
+            headers = {name: response[name] for name in CACHED_HEADERS if name in response}
+            timeout = settings.API_CACHE_TIMEOUT
+            if reading_replica() is not None:
+                timeout = min(timeout, settings.DATABASE_REPLICA_CACHE_TIMEOUT)
+            cache.set(key, {'data': response.data, 'status': response.status_code, 'headers': headers}, timeout)
+
+    def _not_modified(self, request, headers):
+        # Answer conditional requests from the stored validators, without the database
+        etag = headers.get('ETag')
+        last_modified = parse_http_date_safe(headers['Last-Modified']) if 'Last-Modified' in headers else None
+        if etag is None and last_modified is None:
+            return None
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            for name, value in headers.items():
+                response[name] = value
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: super(CachedResponseMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: super(CachedResponseMixin, self).retrieve(request, *args, **kwargs))
+
+
+def cached(view_method):
+    """
+    Decorator for custom viewset actions that should go through the response cache
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: view_method(self, request, *args, **kwargs))
+    return wrapper
@@ -0,0 +1,122 @@
+"""
+ETag / Last-Modified validators for the read-only API viewsets.
+
+Validators are computed before anything is serialized: a list's ETag comes
+from one aggregate over the filtered queryset (latest change time, row
+count and any ``etag_fields`` sums) plus the query string, a detail's from
+the fetched object. Both also fold in the cache versions of the viewset's
+``cache_dependencies``, which change on every save, delete and m2m edit, so
+changes the timestamps cannot see (deletions, author changes) still
+produce a new validator.
+"""
+import hashlib
+
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from .cache import get_versions, normalize_query
+
+
+def conditional_response(request, etag=None, last_modified=None):
+    """
+    Return a 304/412 response if the request's preconditions match, else None
+
+    ``last_modified`` is a Unix timestamp.
+    """
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag=None, last_modified=None):
+    if etag:
+        response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Let browsers and proxies keep the body but revalidate before reuse
+    patch_cache_control(response, public=True, no_cache=True)
+    patch_vary_headers(response, ('Accept',))
+
+
+def _version_time(version):
+    return version / 1e9 if isinstance(version, int) else 0
+
+
+def _timestamp(value):
+    return value.timestamp() if value is not None else 0
+
+
+class ConditionalGetMixin:
+    """
+    Answer conditional GETs on list and retrieve with 304 before serializing
+
+    ``last_modified_field`` is the model's auto_now timestamp; ``etag_fields``
+    are columns that change without touching it (e.g. views_count).
+    """
+    last_modified_field = None
+    etag_fields = ()
+
+    def list_aggregates(self):
+        aggregates = {
+            'last_modified': Max(self.last_modified_field),
+            'count': Count('pk'),
+        }
+        for field in self.etag_fields:
+            aggregates[f'sum_{field}'] = Sum(field)
+        return aggregates
+
+    def get_list_validators(self, request, queryset):
+        return self.list_validators(request, queryset.order_by().aggregate(**self.list_aggregates()))
+
+    def list_validators(self, request, values, versions=None):
+        """
+        Validators from the list_aggregates() of the filtered queryset
+        """
+        return self._validators(
+            request,
+            [values[key] for key in sorted(values)],
+            values['last_modified'],
+            versions,
+        )
+
+    def get_object_validators(self, request, obj, versions=None):
+        last_modified = getattr(obj, self.last_modified_field)
+        values = [obj.pk, last_modified] + [getattr(obj, field) for field in self.etag_fields]
+        return self._validators(request, values, last_modified, versions)
+
+    def _validators(self, request, values, last_modified, versions=None):
+        if versions is None:
+            versions = get_versions(self.cache_dependencies)
+        raw = '|'.join([
+            self.basename,
+            request.path,
+            normalize_query(request.query_params),
+            *(str(value) for value in values),
+            *(str(version) for version in versions),
+        ])
+        etag = quote_etag(hashlib.sha1(raw.encode('utf-8')).hexdigest())
+        timestamps = [_timestamp(last_modified)] + [_version_time(version) for version in versions]
+        return etag, int(max(timestamps))
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag, last_modified = self.get_list_validators(request, queryset)
+        response = conditional_response(request, etag, last_modified)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+            set_validators(response, etag, last_modified)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag, last_modified = self.get_object_validators(request, instance)
+        response = conditional_response(request, etag, last_modified)
+        if response is None:
+            serializer = self.get_serializer(instance)
+            response = Response(serializer.data)
+            set_validators(response, etag, last_modified)
+        return response
+
@@ -0,0 +1,211 @@
+"""
+Write-behind view counter for blog posts.
+
+Page views are collected in a per-process buffer and written back in
+batches as atomic ``views_count = views_count + n`` updates, either when
+the buffer reaches ``VIEW_COUNTER_FLUSH_THRESHOLD`` pending views or every
+``VIEW_COUNTER_FLUSH_INTERVAL`` seconds. Pending views are flushed on
+interpreter exit so a graceful worker shutdown does not lose counts.
+
+Only ids that pass ``parse_post_id()`` and belong to an existing post are
+buffered. A flush that fails on a transient database error (a lost
+connection, a locked table) puts its views back for the next flush; any
+other failure drops them, so one bad batch cannot block every later one.
+"""
+import atexit
+import logging
+import os
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, connection
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+
+logger = logging.getLogger(__name__)
+
+# BlogPost's primary key is a BigAutoField
+MAX_POST_ID = 2 ** 63 - 1
+
+# Errors worth retrying on the next flush
+TRANSIENT_ERRORS = (OperationalError, InterfaceError)
+
+
+def parse_post_id(value):
+    """
+    ``value`` as a blog post primary key, or None if it cannot be one
+
+    Accepts integers and strings of digits; not bools, floats or
+    numbers outside the primary key's range.
+    """
+    if isinstance(value, str) and value.isascii() and value.isdigit():
+        value = int(value)
+    if type(value) is not int or not 0 < value <= MAX_POST_ID:
+        return None
+    return value
+
+
+class ViewCounterBuffer:
+    """
+    Thread-safe, per-process buffer of pending blog post views
+    """
+
+    def __init__(self, flush_interval=None, flush_threshold=None):
+        self.flush_interval = (
+            settings.VIEW_COUNTER_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        )
+        self.flush_threshold = (
+            settings.VIEW_COUNTER_FLUSH_THRESHOLD if flush_threshold is None else flush_threshold
+        )
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._size = 0
+        self._timer = None
+
+    def add(self, post_ids):
+        """
+        Record one view for every id in ``post_ids`` (duplicates count twice)
+        """
+        with self._lock:
+            for post_id in post_ids:
+                self._pending[post_id] += 1
+                self._size += 1
+            should_flush = self._size >= self.flush_threshold
+            if not should_flush:
+                self._schedule_flush()
+        if should_flush:
+            try:
+                self.flush()
+            except TRANSIENT_ERRORS:
+                # The views are buffered and the timer retries them; failing
+                # the request would only make the client send them again
+                logger.exception('Failed to flush blog post views, will retry')
+
+    def pending(self):
+        with self._lock:
+            return dict(self._pending)
+
+    def flush(self):
+        """
+        Write all pending views to the database and return how many were written
+
+        Raises the error of a transient failure after putting the views back
+        and scheduling another flush.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._size = 0
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return 0
+
+        try:
+            write_views(pending)
+        except TRANSIENT_ERRORS:
+            # Put the views back so the next flush can retry them
+            with self._lock:
+                self._pending.update(pending)
+                self._size += sum(pending.values())
+                self._schedule_flush()
+            raise
+        except Exception:
+            # Retrying would fail the same way and hold up every later flush
+            logger.exception('Dropped %d blog post views that could not be written', sum(pending.values()))
+            return 0
+        return sum(pending.values())
+
+    def _schedule_flush(self):
+        # Caller holds the lock
+        if self._timer is not None or self.flush_interval <= 0:
+            return
+        self._timer = threading.Timer(self.flush_interval, self._flush_from_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_from_timer(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Timed flush of blog post views failed')
+        finally:
+            # The connection belongs to this timer thread, which is about to exit
+            connection.close()
+
+
+def write_views(pending):
+    """
+    Apply a ``{post_id: views}`` mapping with one UPDATE per distinct increment
+    """
+    from .models import BlogPost
+
+    by_increment = defaultdict(list)
+    for post_id, views in pending.items():
+        by_increment[views].append(post_id)
+
+    for views, post_ids in by_increment.items():
+        BlogPost.objects.filter(pk__in=post_ids).update(
+            views_count=Coalesce(F('views_count'), Value(0)) + views
+        )
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    """
+    Return this process's view counter buffer, creating it on first use
+    """
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = ViewCounterBuffer()
+    return _buffer
+
+
+def existing_post_ids(post_ids):
+    """
+    The ids in ``post_ids`` (already parsed) that belong to a blog post, with repeats kept
+    """
+    from .models import BlogPost
+
+    known = set(BlogPost.objects.filter(pk__in=set(post_ids)).values_list('pk', flat=True))
+    return [post_id for post_id in post_ids if post_id in known]
+
+
+def record_views(post_ids):
+    get_buffer().add(post_ids)
+
+
+def flush_views():
+    """
+    Flush this process's pending views, if any
+    """
+    if _buffer is None:
+        return 0
+    return _buffer.flush()
+
+
+def _flush_at_exit():
+    try:
+        flush_views()
+    except Exception:
+        logger.exception('Flushing blog post views at exit failed')
+
+
+def _reset_after_fork():
+    # A forked worker must not inherit the parent's pending views, lock or timer
+    global _buffer, _buffer_lock
+    _buffer = None
+    _buffer_lock = threading.Lock()
+
+
+atexit.register(_flush_at_exit)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,109 @@
+"""
+Streaming exports of the API viewsets.
+
+``GET /api/<resource>/export/`` returns every row that the list endpoint's
+filters, search and ordering select, unpaginated, as a JSON array or (with
+``?format=ndjson`` or ``Accept: application/x-ndjson``) one object per
+line. Rows are read with ``.iterator(chunk_size=EXPORT_CHUNK_SIZE)`` and
+serialized one by one, and the response streams each chunk as soon as it
+is encoded, so memory stays flat however many rows there are and the
+first byte goes out before the first query runs.
+
+Under ASGI the response streams from an async generator over
+``.aiterator()``: Django would read a sync generator whole, in a thread,
+before sending any of it.
+"""
+import itertools
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework.decorators import action
+
+from .renderers import NDJSONRenderer, ORJSONRenderer, encode
+
+# Encoded rows are written out in chunks of about this many bytes
+FLUSH_BYTES = 64 * 1024
+
+
+class ExportMixin:
+    """
+    Adds a streaming ``export`` action to a read-only viewset
+    """
+
+    @action(detail=False, renderer_classes=[ORJSONRenderer, NDJSONRenderer])
+    def export(self, request):
+        """
+        Stream every matching row, unpaginated
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer()
+        renderer = request.accepted_renderer
+        if isinstance(request._request, ASGIRequest):
+            rows = self.aserialized_rows(queryset, serializer)
+            if renderer.format == 'ndjson':
+                content = _abuffered(rows, end=b'\n')
+            else:
+                content = _abuffered(rows, start=b'[', separator=b',', end_all=b']')
+        elif renderer.format == 'ndjson':
+            content = self.ndjson_chunks(queryset, serializer)
+        else:
+            content = self.json_chunks(queryset, serializer)
+        response = StreamingHttpResponse(content, content_type=renderer.media_type)
+        response['Content-Disposition'] = f'attachment; filename="{self.basename}.{renderer.format}"'
+        return response
+
+    def serialized_rows(self, queryset, serializer):
+        # Prefetches run per chunk when an iterator is given a chunk_size
+        for instance in queryset.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE):
+            yield encode(serializer.to_representation(instance))
+
+    async def aserialized_rows(self, queryset, serializer):
+        async for instance in queryset.aiterator(chunk_size=settings.EXPORT_CHUNK_SIZE):
+            yield encode(serializer.to_representation(instance))
+
+    def json_chunks(self, queryset, serializer):
+        yield b'['
+        rows = self.serialized_rows(queryset, serializer)
+        first = next(rows, None)
+        if first is not None:
+            yield from _buffered(itertools.chain([first], (b',' + row for row in rows)))
+        yield b']'
+
+    def ndjson_chunks(self, queryset, serializer):
+        yield from _buffered(row + b'\n' for row in self.serialized_rows(queryset, serializer))
+
+
+def _buffered(pieces):
+    """
+    Join encoded rows into chunks of about FLUSH_BYTES
+    """
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= FLUSH_BYTES:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+async def _abuffered(rows, start=b'', separator=b'', end=b'', end_all=b''):
+    """
+    ``_buffered()`` for async rows: ``start``, the rows joined by ``separator``
+    and each followed by ``end``, then ``end_all``
+    """
+    buffer, size = [start], len(start)
+    first = True
+    async for row in rows:
+        if not first:
+            buffer.append(separator)
+        buffer += [row, end]
+        size += len(separator) + len(row) + len(end)
+        first = False
+        if size >= FLUSH_BYTES:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    buffer.append(end_all)
+    yield b''.join(buffer)
@@ -0,0 +1,171 @@
+"""
+Resized WebP/JPEG renditions of uploaded images.
+
+Every uploaded image field has a JSON sibling (``photo_file`` ->
+``photo_renditions``) that maps each format to ``{width: storage name}``.
+Files live under ``renditions/`` and are named after a hash of the source
+bytes and the rendition settings, so a name always refers to the same
+content and nginx serves them as immutable. Widths never exceed the
+source; an image narrower than the smallest width gets one rendition at
+its own size.
+
+Saving a model with a new or changed upload queues a ``images.render``
+job (see main/signals.py and main/jobs.py); ``manage.py
+generate_renditions`` backfills existing media.
+"""
+import hashlib
+import io
+import logging
+from functools import partial
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .cache import bump_version
+from .jobs import enqueue, register
+from .models import BlogPost, Member, Project
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS_DIR = 'renditions'
+FORMATS = {
+    # format: (extension, save options)
+    'webp': ('webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# model -> {image field: renditions JSON field}
+IMAGE_FIELDS = {
+    Member: {'photo_file': 'photo_renditions'},
+    BlogPost: {'blog_image_file': 'blog_image_renditions', 'thumbnail': 'thumbnail_renditions'},
+    Project: {'hero_section_image_file': 'hero_section_image_renditions'},
+}
+
+
+def _signature():
+    # Part of every file name, so changing the settings never reuses old files
+    return repr((tuple(settings.IMAGE_RENDITION_WIDTHS), sorted(FORMATS.items()))).encode()
+
+
+def _flatten(image):
+    """
+    RGB copy of ``image`` with any transparency composited onto white, for JPEG
+    """
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def render(source_name, storage=None):
+    """
+    Write the renditions of the image stored as ``source_name`` and return their description
+
+    Files that already exist are not rewritten. Returns ``{'source': source_name}``
+    alone if the file cannot be read as an image, or is too large to.
+    """
+    storage = storage or default_storage
+    with storage.open(source_name, 'rb') as source:
+        data = source.read()
+    try:
+        image = Image.open(io.BytesIO(data))
+        image = ImageOps.exif_transpose(image)
+    # A DecompressionBombError is an image too large to decode safely
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as exc:
+        logger.warning('Cannot make renditions of %s: %s', source_name, exc)
+        return {'source': source_name}
+
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+    width, height = image.size
+    digest = hashlib.sha256(data + _signature()).hexdigest()[:20]
+    renditions = {'source': source_name, 'width': width, 'height': height}
+    for name in FORMATS:
+        renditions[name] = {}
+
+    # Largest first, each resized from the previous one
+    current = image
+    for target in sorted({min(target, width) for target in settings.IMAGE_RENDITION_WIDTHS}, reverse=True):
+        if current.width != target:
+            current = current.resize((target, max(1, round(height * target / width))), Image.LANCZOS)
+        for name, (extension, options) in FORMATS.items():
+            path = f'{RENDITIONS_DIR}/{digest[:2]}/{digest}-{target}.{extension}'
+            if not storage.exists(path):
+                buffer = io.BytesIO()
+                (_flatten(current) if name == 'jpeg' else current).save(buffer, name.upper(), **options)
+                storage.save(path, ContentFile(buffer.getvalue()))
+            renditions[name][str(target)] = path
+    return renditions
+
+
+def stale_fields(instance):
+    """
+    Return {image field: renditions field} for images whose renditions are missing or outdated
+    """
+    stale = {}
+    for field, renditions_field in IMAGE_FIELDS.get(type(instance), {}).items():
+        name = getattr(instance, field).name or None
+        if (getattr(instance, renditions_field) or {}).get('source') != name:
+            stale[field] = renditions_field
+    return stale
+
+
+def sync_renditions(instance):
+    """
+    Make renditions for ``instance``'s new or changed uploads and store them on the row
+    """
+    updates = {}
+    for field, renditions_field in stale_fields(instance).items():
+        name = getattr(instance, field).name
+        updates[renditions_field] = render(name, getattr(instance, field).storage) if name else {}
+    if updates:
+        for renditions_field, renditions in updates.items():
+            setattr(instance, renditions_field, renditions)
+        # update() so saving does not fire the signals (and this function) again
+        type(instance).objects.filter(pk=instance.pk).update(**updates)
+    return updates
+
+
+def queue_renditions(instance):
+    """
+    Queue a job to make ``instance``'s missing renditions, if it has any
+    """
+    if stale_fields(instance):
+        label = instance._meta.label_lower
+        enqueue('images.render', label, instance.pk, dedupe_key=f'images.render:{label}:{instance.pk}')
+
+
+# Not atomic: rendering takes seconds and writes files, not rows, until the end
+@register('images.render', atomic=False)
+def render_job(label, pk):
+    model = apps.get_model(label)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None or not sync_renditions(instance):
+        return
+    # sync_renditions() saves with update(), which sends no signals;
+    # bump after commit, as the signal handlers do
+    transaction.on_commit(partial(bump_version, model))
+    if model is Member:
+        enqueue('roster.refresh', dedupe_key='roster.refresh')
+
+
+def rendition_urls(renditions, build_url=None):
+    """
+    Public description of a renditions field: per-format widths and URLs, plus a srcset
+    """
+    if not renditions or not renditions.get('width'):
+        return None
+    build_url = build_url or (lambda url: url)
+    data = {'width': renditions['width'], 'height': renditions['height']}
+    for name in FORMATS:
+        files = sorted(renditions.get(name, {}).items(), key=lambda item: int(item[0]))
+        urls = [(int(width), build_url(default_storage.url(path))) for width, path in files]
+        data[name] = [{'width': width, 'url': url} for width, url in urls]
+        data[f'{name}_srcset'] = ', '.join(f'{url} {width}w' for width, url in urls)
+    return data
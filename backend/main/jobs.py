@@ -0,0 +1,207 @@
+"""
+Database-backed background jobs.
+
+Slow work is registered under a name with ``@register('name')`` and queued
+with ``enqueue('name', *args)``, which inserts a ``Job`` row inside the
+caller's transaction: the job becomes visible when the request commits and
+disappears if it rolls back. ``manage.py run_worker`` claims due jobs and
+runs them, each in its own transaction unless registered otherwise.
+
+Claiming uses ``SELECT ... FOR UPDATE SKIP LOCKED`` where the database has
+it (PostgreSQL), so workers never wait on each other's rows. Elsewhere
+(SQLite) a worker claims a job with a conditional
+``UPDATE ... WHERE status = 'queued'``; SQLite serializes writers, so only
+one worker's update matches.
+
+A failed job is retried after an exponential backoff until it has used
+``max_attempts``, then left as failed with its traceback. A job still
+running ``JOBS_LEASE_SECONDS`` after it was claimed is taken to have lost
+its worker and is requeued, so jobs should finish well within that time.
+With ``JOBS_ALWAYS_EAGER`` jobs run in-process right after the commit
+instead of being stored, for development without a worker.
+"""
+import logging
+import random
+import traceback
+from contextlib import nullcontext
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def register(name, atomic=True):
+    """
+    Decorator that makes a function runnable as the job ``name``
+
+    Job arguments are stored as JSON, so the function should take ids and
+    other plain values, not model instances. The job runs in a transaction
+    unless ``atomic`` is False, for jobs that spend a long time outside the
+    database and should not hold a transaction open meanwhile.
+    """
+    def decorator(func):
+        if name in _registry:
+            raise ValueError(f'A job named {name!r} is already registered')
+        _registry[name] = (func, atomic)
+        return func
+    return decorator
+
+
+def enqueue(name, *args, dedupe_key=None, delay=None, max_attempts=None):
+    """
+    Queue the job ``name`` with ``args`` and return its Job row
+
+    If a job with the same ``dedupe_key`` is still queued, nothing is added
+    and that job is returned. Returns None when JOBS_ALWAYS_EAGER is set.
+    """
+    if name not in _registry:
+        raise LookupError(f'No job registered as {name!r}')
+    if settings.JOBS_ALWAYS_EAGER:
+        transaction.on_commit(partial(_registry[name][0], *args))
+        return None
+
+    if dedupe_key is not None:
+        queued = Job.objects.filter(dedupe_key=dedupe_key, status=Job.QUEUED).first()
+        if queued is not None:
+            return queued
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                name=name,
+                args=list(args),
+                dedupe_key=dedupe_key,
+                run_at=timezone.now() + timedelta(seconds=delay or 0),
+                max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+            )
+    except IntegrityError:
+        # Another process queued the same key since the check above
+        queued = Job.objects.filter(dedupe_key=dedupe_key, status=Job.QUEUED).first()
+        if dedupe_key is None or queued is None:
+            raise
+        return queued
+
+
+def backoff(attempts):
+    """
+    Seconds to wait before retrying a job that has failed ``attempts`` times
+    """
+    delay = min(settings.JOBS_BACKOFF_MAX_SECONDS, settings.JOBS_BACKOFF_SECONDS * 2 ** (attempts - 1))
+    # Jitter, so jobs that failed together do not all retry together
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def claim(worker):
+    """
+    Mark the oldest due job as running under ``worker`` and return it, or None
+    """
+    now = timezone.now()
+    due = Job.objects.filter(status=Job.QUEUED, run_at__lte=now).order_by('run_at', 'id')
+    running = {'status': Job.RUNNING, 'locked_by': worker, 'locked_at': now, 'attempts': F('attempts') + 1}
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            pk = due.select_for_update(skip_locked=True).values_list('pk', flat=True).first()
+            if pk is None:
+                return None
+            Job.objects.filter(pk=pk).update(**running)
+        return Job.objects.get(pk=pk)
+
+    # Compare-and-set: the update matches only if no other worker got there first
+    for pk in due.values_list('pk', flat=True)[:10]:
+        if Job.objects.filter(pk=pk, status=Job.QUEUED).update(**running):
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def execute(job):
+    """
+    Run a claimed job and record the outcome; return True if it succeeded
+    """
+    func, atomic = _registry.get(job.name, (None, False))
+    try:
+        if func is None:
+            raise LookupError(f'No job registered as {job.name!r}')
+        with transaction.atomic() if atomic else nullcontext():
+            func(*job.args)
+    except Exception:
+        logger.exception('Job %s failed (attempt %d of %d)', job, job.attempts, job.max_attempts)
+        error = traceback.format_exc()
+        if func is not None and job.attempts < job.max_attempts:
+            _retry(job, error, timezone.now() + timedelta(seconds=backoff(job.attempts)))
+        else:
+            _held(job).update(status=Job.FAILED, last_error=error, finished_at=timezone.now(),
+                              locked_by=None, locked_at=None)
+        return False
+
+    _held(job).update(status=Job.DONE, finished_at=timezone.now(), locked_by=None, locked_at=None)
+    return True
+
+
+def run_next(worker):
+    """
+    Claim and run one job; return False if none was due
+    """
+    job = claim(worker)
+    if job is None:
+        return False
+    execute(job)
+    return True
+
+
+def drain(worker='drain'):
+    """
+    Run due jobs in this thread until none are left; return how many ran
+    """
+    count = 0
+    while run_next(worker):
+        count += 1
+    return count
+
+
+def requeue_expired():
+    """
+    Put back jobs claimed more than JOBS_LEASE_SECONDS ago, whose worker crashed or was killed
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.JOBS_LEASE_SECONDS)
+    count = 0
+    for job in Job.objects.filter(status=Job.RUNNING, locked_at__lt=cutoff):
+        error = f'Lease of {job.locked_by} expired'
+        if job.attempts < job.max_attempts:
+            _retry(job, error, timezone.now())
+        else:
+            _held(job).update(status=Job.FAILED, last_error=error, finished_at=timezone.now(),
+                              locked_by=None, locked_at=None)
+        count += 1
+    return count
+
+
+def prune_done():
+    """
+    Delete jobs that finished successfully more than JOBS_KEEP_DONE_SECONDS ago
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.JOBS_KEEP_DONE_SECONDS)
+    return Job.objects.filter(status=Job.DONE, finished_at__lt=cutoff).delete()[0]
+
+
+def _held(job):
+    # Only while this worker still holds the job; after a lease expiry
+    # another worker may have claimed it
+    return Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by)
+
+
+def _retry(job, error, run_at):
+    try:
+        with transaction.atomic():
+            _held(job).update(status=Job.QUEUED, last_error=error, run_at=run_at, locked_by=None, locked_at=None)
+    except IntegrityError:
+        # The same work was queued again meanwhile and will cover this attempt
+        _held(job).delete()
@@ -0,0 +1,27 @@
+"""
+Detail lookups by slug as well as by id.
+"""
+from rest_framework.generics import get_object_or_404
+
+
+class SlugLookupMixin:
+    """
+    Let detail routes take the row's slug in place of its id, e.g.
+    /api/blogs/intro-to-transformers/
+
+    A value of digits only is an id, so an all-digit slug cannot be looked up.
+    """
+    slug_field = 'slug'
+
+    def get_lookup_filter(self):
+        value = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        # An int already under the async routes (see main/urls.py)
+        if str(value).isdigit():
+            return {self.lookup_field: value}
+        return {self.slug_field: value}
+
+    def get_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        instance = get_object_or_404(queryset, **self.get_lookup_filter())
+        self.check_object_permissions(self.request, instance)
+        return instance
@@ -0,0 +1,32 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from main import metrics
+
+
+class Command(BaseCommand):
+    help = 'Shows hit/miss counts of the API response cache, added up across workers from /metrics'
+
+    def handle(self, *args, **options):
+        counts = defaultdict(lambda: {'hit': 0, 'miss': 0})
+        series = metrics.collect(flush=False)['http_request_cache_total']
+        for (view, outcome), value in series.items():
+            if outcome in ('hit', 'miss'):
+                counts[view][outcome] += value
+
+        total_hits = total_misses = 0
+        for view, outcomes in sorted(counts.items()):
+            hits, misses = int(outcomes['hit']), int(outcomes['miss'])
+            total_hits += hits
+            total_misses += misses
+            self.stdout.write(f'{view:<28} hits={hits:<8} misses={misses:<8} hit ratio={self._ratio(hits, misses)}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{"total":<28} hits={total_hits:<8} misses={total_misses:<8} '
+            f'hit ratio={self._ratio(total_hits, total_misses)}'
+        ))
+
+    def _ratio(self, hits, misses):
+        if not hits + misses:
+            return '-'
+        return f'{hits / (hits + misses):.1%}'
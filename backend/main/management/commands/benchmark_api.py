@@ -0,0 +1,301 @@
+import http.client
+import json
+import math
+import platform
+import random
+import re
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import Resolver404, resolve
+
+from main.benchmarking import Rollback, api_client, free_port, gunicorn_args, server, summarize
+from main.cache import bump_version
+from main.counters import flush_views
+from main.models import BlogPost, Member, Project, Technology
+from main.seeding import seed, unseed
+from main.urls import router
+
+METRICS = ('p50', 'p95', 'p99')
+SERVER_TIMING_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+# (name, method, path, JSON body); {member}, {blog}, {project}, {blog_page},
+# {project_page}, {blog_cursor} and {project_cursor} are filled in after seeding
+CASES = [
+    ('api root', 'GET', '/api/', None),
+    ('stats', 'GET', '/api/stats/', None),
+    ('members', 'GET', '/api/members/', None),
+    ('members search', 'GET', '/api/members/?search=mehta', None),
+    ('members filtered', 'GET', '/api/members/?active=true&batch=2023', None),
+    ('members ordered', 'GET', '/api/members/?ordering=-joined_date', None),
+    ('member detail', 'GET', '/api/members/{member}/', None),
+    ('members active', 'GET', '/api/members/active/', None),
+    ('members por_holders', 'GET', '/api/members/por_holders/', None),
+    ('members roster', 'GET', '/api/members/roster/', None),
+    ('members export', 'GET', '/api/members/export/', None),
+    ('blogs', 'GET', '/api/blogs/', None),
+    ('blogs search', 'GET', '/api/blogs/?search=neural+networks', None),
+    ('blogs filtered', 'GET', '/api/blogs/?published=true&author=author+1', None),
+    ('blogs ordered', 'GET', '/api/blogs/?ordering=-views_count', None),
+    ('blogs sparse fields', 'GET', '/api/blogs/?fields=id,title,slug', None),
+    ('blogs deep page', 'GET', '/api/blogs/?page={blog_page}', None),
+    ('blogs deep cursor', 'GET', '{blog_cursor}', None),
+    ('blog detail', 'GET', '/api/blogs/{blog}/', None),
+    ('blog increment_views', 'POST', '/api/blogs/{blog}/increment_views/', None),
+    ('blogs record views', 'POST', '/api/blogs/views/', {'ids': ['{blog}', '{blog}']}),
+    ('blogs export', 'GET', '/api/blogs/export/', None),
+    ('blogs export ndjson', 'GET', '/api/blogs/export/?format=ndjson', None),
+    ('projects', 'GET', '/api/projects/', None),
+    ('projects search', 'GET', '/api/projects/?search=vision', None),
+    ('projects by status', 'GET', '/api/projects/?status=ongoing', None),
+    ('projects by technology', 'GET', '/api/projects/?technology=python,pytorch&technology_match=any', None),
+    ('projects ordered', 'GET', '/api/projects/?ordering=-start_date', None),
+    ('projects deep page', 'GET', '/api/projects/?page={project_page}', None),
+    ('projects deep cursor', 'GET', '{project_cursor}', None),
+    ('project detail', 'GET', '/api/projects/{project}/', None),
+    ('projects ongoing', 'GET', '/api/projects/ongoing/', None),
+    ('projects completed', 'GET', '/api/projects/completed/', None),
+    ('projects export', 'GET', '/api/projects/export/', None),
+    ('metrics', 'GET', '/metrics', None),
+]
+
+
+def last_page(model):
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    return max(1, math.ceil(model.objects.count() / page_size))
+
+
+class InProcessClient:
+    """
+    Django test client in this process; counts queries with CaptureQueriesContext
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def request(self, method, path, body):
+        with CaptureQueriesContext(connection) as queries:
+            if body is None:
+                response = getattr(self.client, method.lower())(path)
+            else:
+                response = getattr(self.client, method.lower())(path, body, content_type='application/json')
+            content = b''.join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, content, len(queries)
+
+
+class ServerClient:
+    """
+    One keep-alive connection to a local server; counts queries from the
+    Server-Timing header, which misses those run while a body streams
+    """
+
+    def __init__(self, port):
+        self.connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+
+    def request(self, method, path, body):
+        headers = {'Host': 'localhost'}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        self.connection.request(method, path, payload, headers)
+        response = self.connection.getresponse()
+        content = response.read()
+        match = SERVER_TIMING_QUERIES.search(response.getheader('Server-Timing') or '')
+        return response.status, content, int(match.group(1)) if match else None
+
+
+class Command(BaseCommand):
+    help = ('Seeds a dataset and measures latency, throughput, queries and response size of every '
+            'API route; writes JSON and flags regressions against an earlier run')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=200)
+        parser.add_argument('--blogs', type=int, default=1000)
+        parser.add_argument('--projects', type=int, default=300)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--repeat', type=int, default=30, help='Timed requests per endpoint')
+        parser.add_argument('--server', action='store_true',
+                            help='Measure a local gunicorn (backend/server.py) instead of the test client; '
+                                 'the rows are committed for the run and deleted afterwards')
+        parser.add_argument('--cache', action='store_true', help='Leave the API response cache on')
+        parser.add_argument('--only', help='Only endpoints whose name contains this text')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--compare', help='Earlier JSON results to compare against')
+        parser.add_argument('--metric', choices=METRICS, default='p95', help='Latency compared with --compare')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='Flag endpoints this much slower (0.25 = 25%%) and at least 1ms slower, '
+                                 'or running more queries')
+
+    def handle(self, *args, **options):
+        cases = [case for case in CASES if not options['only'] or options['only'] in case[0]]
+        if not cases:
+            raise CommandError(f'No endpoint name contains {options["only"]!r}')
+        baseline = self.load(options['compare']) if options['compare'] else None
+
+        rng = random.Random(options['seed'])
+        if options['server']:
+            results = self.run_server(rng, cases, options)
+        else:
+            results = self.run_in_process(rng, cases, options)
+
+        report = {
+            'meta': {
+                'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'mode': 'server' if options['server'] else 'in-process',
+                'cache': options['cache'],
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'dataset': {name: options[name] for name in ('members', 'blogs', 'projects', 'seed')},
+                'repeat': options['repeat'],
+            },
+            'endpoints': results,
+        }
+        self.print_results(results, baseline, options)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
+
+        if baseline is not None:
+            regressions = self.regressions(results, baseline, options)
+            if regressions:
+                raise CommandError('Regressions against {}:\n  {}'.format(options['compare'], '\n  '.join(regressions)))
+            self.stdout.write(self.style.SUCCESS(f'No regressions against {options["compare"]}'))
+
+    def load(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)['endpoints']
+        except (OSError, ValueError, KeyError) as exc:
+            raise CommandError(f'Cannot read results from {path}: {exc}')
+
+    def run_in_process(self, rng, cases, options):
+        # No flush timer: pending views are flushed inside the transaction instead
+        overrides = {'VIEW_COUNTER_FLUSH_INTERVAL': 0}
+        if options['cache']:
+            overrides['API_CACHE_ENABLED'] = True
+        results = {}
+        try:
+            with transaction.atomic(), api_client(**overrides) as client:
+                created = seed(rng, options['members'], options['blogs'], options['projects'])
+                results = self.run_cases(InProcessClient(client), cases, created, options)
+                flush_views()
+                raise Rollback
+        except Rollback:
+            pass
+        return results
+
+    def run_server(self, rng, cases, options):
+        created = seed(rng, options['members'], options['blogs'], options['projects'])
+        try:
+            for model in (Member, BlogPost, Project, Technology):
+                bump_version(model)
+            port = free_port()
+            env = {'API_CACHE_ENABLED': str(options['cache']), 'DEBUG': 'False', 'ALLOWED_HOSTS': 'localhost'}
+            with server(gunicorn_args(port), port, env):
+                return self.run_cases(ServerClient(port), cases, created, options)
+        finally:
+            flush_views()
+            unseed(created)
+
+    def run_cases(self, client, cases, created, options):
+        params = {
+            'member': created['members'][0],
+            'blog': created['blogs'][0],
+            'project': created['projects'][0],
+            'blog_page': last_page(BlogPost),
+            'project_page': last_page(Project),
+        }
+        # Deep cursor pages: as many next links in as the deep numbered page
+        params['blog_cursor'] = self.follow_cursor(client, '/api/blogs/?pagination=cursor', params['blog_page'] - 1)
+        params['project_cursor'] = self.follow_cursor(client, '/api/projects/?pagination=cursor',
+                                                      params['project_page'] - 1)
+        self.check_coverage(cases)
+
+        results = {}
+        for name, method, path, body in cases:
+            path = path.format(**params)
+            if body is not None:
+                body = json.loads(json.dumps(body).replace('"{blog}"', str(params['blog'])))
+            # Warm-up: first-use imports, search backend lookup, connections
+            status, content, queries = client.request(method, path, body)
+            durations = []
+            start = time.perf_counter()
+            for _ in range(options['repeat']):
+                request_start = time.perf_counter()
+                client.request(method, path, body)
+                durations.append((time.perf_counter() - request_start) * 1000)
+            elapsed = time.perf_counter() - start
+            results[name] = {
+                'method': method,
+                'path': path,
+                'status': status,
+                **{key: round(value, 3) for key, value in summarize(durations).items()},
+                'requests_per_second': round(options['repeat'] / elapsed, 1),
+                'queries': queries,
+                'bytes': len(content),
+            }
+            if status >= 400:
+                self.stderr.write(f'{name}: {method} {path} answered {status}')
+        return results
+
+    def follow_cursor(self, client, path, pages):
+        for _ in range(pages):
+            status, content, _ = client.request('GET', path, None)
+            following = json.loads(content).get('next') if status == 200 else None
+            if not following:
+                break
+            parts = urlsplit(following)
+            path = f'{parts.path}?{parts.query}'
+        return path
+
+    def check_coverage(self, cases):
+        routes = {pattern.name for pattern in router.urls} | {'stats', 'metrics'}
+        covered = set()
+        for _, _, path, _ in cases:
+            try:
+                covered.add(resolve(urlsplit(path).path).url_name)
+            except Resolver404:
+                pass
+        missing = routes - covered
+        if missing and len(cases) == len(CASES):
+            self.stderr.write(f'Routes not benchmarked: {", ".join(sorted(missing))}')
+
+    def print_results(self, results, baseline, options):
+        metric = options['metric']
+        self.stdout.write(
+            f'{"endpoint":<26} {"status":>6} {"p50":>9} {"p95":>9} {"p99":>9} {"req/s":>8} '
+            f'{"queries":>7} {"bytes":>10}' + (f' {metric + " vs base":>14}' if baseline else '')
+        )
+        for name, result in results.items():
+            line = (
+                f'{name:<26} {result["status"]:>6} {result["p50"]:>7.2f}ms {result["p95"]:>7.2f}ms '
+                f'{result["p99"]:>7.2f}ms {result["requests_per_second"]:>8.1f} '
+                f'{"-" if result["queries"] is None else result["queries"]:>7} {result["bytes"]:>10,}'
+            )
+            before = (baseline or {}).get(name)
+            if before and before.get(metric):
+                line += f' {(result[metric] / before[metric] - 1):>+14.0%}'
+            self.stdout.write(line)
+
+    def regressions(self, results, baseline, options):
+        metric, threshold = options['metric'], options['threshold']
+        found = []
+        for name, result in results.items():
+            before = baseline.get(name)
+            if before is None:
+                continue
+            slower = result[metric] - before[metric]
+            if slower > 1 and slower > before[metric] * threshold:
+                found.append(f'{name}: {metric} {before[metric]:.2f}ms -> {result[metric]:.2f}ms')
+            if None not in (result['queries'], before.get('queries')) and result['queries'] > before['queries']:
+                found.append(f'{name}: {before["queries"]} -> {result["queries"]} queries')
+        return found
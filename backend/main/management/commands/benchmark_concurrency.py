@@ -0,0 +1,81 @@
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.benchmarking import free_port, gunicorn_args, percentile, run_load, server
+from main.cache import bump_version
+from main.models import BlogPost, Member, Project, Technology
+from main.seeding import seed, unseed
+
+# SERVER_WORKER_CLASS values (see backend/server.py)
+SERVERS = ['sync', 'gthread', 'asgi']
+
+# A page view's worth of list and detail reads
+PATHS = [
+    '/api/members/',
+    '/api/blogs/',
+    '/api/projects/',
+    '/api/blogs/?page=2',
+    '/api/projects/?status=ongoing',
+    '/api/members/{member}/',
+    '/api/blogs/{blog}/',
+    '/api/projects/{project}/',
+]
+
+
+class Command(BaseCommand):
+    help = 'Compares API throughput and latency under gunicorn sync, gthread and uvicorn (ASGI) workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', default='10,100,500',
+                            help='Comma-separated numbers of concurrent connections')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds per run')
+        parser.add_argument('--workers', type=int,
+                            help='Server worker processes (default: as sized by backend/server.py)')
+        parser.add_argument('--servers', default=','.join(SERVERS), help=f'Comma-separated: {", ".join(SERVERS)}')
+        parser.add_argument('--no-cache', action='store_true',
+                            help='Turn the response cache off in the servers, so every request queries')
+        parser.add_argument('--members', type=int, default=200)
+        parser.add_argument('--blogs', type=int, default=1000)
+        parser.add_argument('--projects', type=int, default=300)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        servers = options['servers'].split(',')
+        if set(servers) - set(SERVERS):
+            raise CommandError(f'--servers must be among {", ".join(SERVERS)}')
+        levels = [int(level) for level in options['connections'].split(',')]
+
+        # The servers are separate processes, so the rows must be committed;
+        # they are deleted again at the end
+        created = seed(random.Random(options['seed']), options['members'], options['blogs'], options['projects'])
+        try:
+            ids = {
+                'member': created['members'][0],
+                'blog': created['blogs'][0],
+                'project': created['projects'][0],
+            }
+            paths = [path.format(**ids) for path in PATHS]
+            env = {'API_CACHE_ENABLED': 'False' if options['no_cache'] else 'True', 'DEBUG': 'False'}
+            results = []
+            for name in servers:
+                port = free_port()
+                # Start each server with a cold response cache
+                for model in (Member, BlogPost, Project, Technology):
+                    bump_version(model)
+                self.stdout.write(f'Starting {name} server')
+                with server(gunicorn_args(port, options['workers']), port, {**env, 'SERVER_WORKER_CLASS': name}):
+                    run_load(port, paths, 10, 2)
+                    for connections in levels:
+                        latencies, failures, elapsed = run_load(port, paths, connections, options['duration'])
+                        results.append((name, connections, latencies, failures, elapsed))
+        finally:
+            unseed(created)
+
+        self.stdout.write(f'{len(paths)} paths, response cache {"off" if options["no_cache"] else "on"}')
+        self.stdout.write(f'{"server":<7} {"conns":>6} {"req/s":>9} {"p50":>9} {"p99":>9} {"errors":>7}')
+        for name, connections, latencies, failures, elapsed in results:
+            self.stdout.write(
+                f'{name:<7} {connections:>6} {len(latencies) / elapsed:>9.1f} '
+                f'{percentile(latencies, 50):>7.1f}ms {percentile(latencies, 99):>7.1f}ms {failures:>7}'
+            )
@@ -0,0 +1,90 @@
+import gc
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from main.benchmarking import Rollback, api_client
+from main.models import BlogPost, Project
+from main.seeding import build_blog_posts, build_projects
+from main.serializers import BlogPostSerializer, ProjectSerializer
+
+RESOURCES = {
+    'projects': (Project, ProjectSerializer, build_projects),
+    'blogs': (BlogPost, BlogPostSerializer, build_blog_posts),
+}
+SEED_BATCH = 5000
+
+
+class Command(BaseCommand):
+    help = 'Compares time, time to first byte and peak memory: buffered list vs streaming /export/'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--resource', choices=sorted(RESOURCES), default='projects')
+        parser.add_argument('--rows', type=int, default=100_000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        model, serializer_class, build = RESOURCES[options['resource']]
+        path = f'/api/{options["resource"]}/export/'
+        rng = random.Random(options['seed'])
+        results = []
+        try:
+            with transaction.atomic(), api_client() as client:
+                for start in range(0, options['rows'], SEED_BATCH):
+                    count = min(SEED_BATCH, options['rows'] - start)
+                    model.objects.bulk_create(build(rng, count, start=start), batch_size=500)
+
+                def buffered():
+                    # What a list without pagination does: serialize everything, then render
+                    queryset = model.objects.prefetch_related(*_prefetches(model))
+                    body = JSONRenderer().render(serializer_class(queryset, many=True).data)
+                    yield body
+
+                def streaming():
+                    yield from client.get(path).streaming_content
+
+                for label, produce in (('buffered list', buffered), ('streaming export', streaming)):
+                    results.append((label, *self.run(produce)))
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(f'{options["rows"]:,} {options["resource"]}')
+        self.stdout.write(f'{"path":<18} {"bytes":>13} {"total":>10} {"first byte":>11} {"peak memory":>12}')
+        for label, size, total, first_byte, peak in results:
+            self.stdout.write(
+                f'{label:<18} {size:>13,} {total:>8.0f}ms {first_byte:>9.0f}ms {peak / 2 ** 20:>10.1f}MB'
+            )
+
+    def run(self, produce):
+        """
+        Return (bytes, total ms, first byte ms, peak traced bytes) for one response
+        """
+        # Timings without tracemalloc, which slows allocation-heavy code a lot;
+        # collect first so one path does not pay for the other's garbage
+        gc.collect()
+        size, first_byte = 0, None
+        start = time.perf_counter()
+        for chunk in produce():
+            if first_byte is None:
+                first_byte = (time.perf_counter() - start) * 1000
+            size += len(chunk)
+        total = (time.perf_counter() - start) * 1000
+
+        gc.collect()
+        tracemalloc.start()
+        try:
+            for chunk in produce():
+                pass
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return size, total, first_byte, peak
+
+
+def _prefetches(model):
+    return ['author_members'] if model is BlogPost else []
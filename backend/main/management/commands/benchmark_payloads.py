@@ -0,0 +1,49 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from main.benchmarking import Rollback, api_client, measure, summarize
+from main.models import BlogPost, Project
+from main.seeding import build_blog_posts, build_projects
+from main.serializers import BlogPostSerializer, ProjectSerializer
+
+
+class Command(BaseCommand):
+    help = 'Measures list payload size and latency: full rows vs card serializers vs ?fields='
+
+    def add_arguments(self, parser):
+        parser.add_argument('--blogs', type=int, default=200)
+        parser.add_argument('--projects', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        blog_fields = ','.join(BlogPostSerializer.Meta.fields)
+        project_fields = ','.join(ProjectSerializer.Meta.fields)
+        cases = [
+            ('blogs, every field (previous list)', f'/api/blogs/?fields={blog_fields}'),
+            ('blogs, card (default list)', '/api/blogs/'),
+            ('blogs, ?fields=id,title,slug', '/api/blogs/?fields=id,title,slug'),
+            ('projects, every field (previous list)', f'/api/projects/?fields={project_fields}'),
+            ('projects, card (default list)', '/api/projects/'),
+            ('projects, ?omit=technologies_used', '/api/projects/?omit=technologies_used'),
+        ]
+
+        rng = random.Random(options['seed'])
+        results = []
+        try:
+            with transaction.atomic(), api_client() as client:
+                BlogPost.objects.bulk_create(build_blog_posts(rng, options['blogs']), batch_size=500)
+                Project.objects.bulk_create(build_projects(rng, options['projects']), batch_size=500)
+                for label, path in cases:
+                    size = len(client.get(path).content)
+                    timings = summarize(measure(lambda: client.get(path), options['repeat']))
+                    results.append((label, size, timings))
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(f'{"request":<40} {"bytes/page":>11} {"p50":>9} {"p95":>9}')
+        for label, size, timings in results:
+            self.stdout.write(f'{label:<40} {size:>11,} {timings["p50"]:>7.1f}ms {timings["p95"]:>7.1f}ms')
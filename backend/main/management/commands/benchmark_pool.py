@@ -0,0 +1,100 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from main.benchmarking import free_port, gunicorn_args, percentile, run_load, server
+from main.seeding import seed, unseed
+
+# How the servers get their database connections: the environment each runs with
+MODES = {
+    # A new connection for every request
+    'direct': {'DATABASE_POOL': 'False', 'DATABASE_CONN_MAX_AGE': '0'},
+    # One connection per thread, kept between requests (the default without a pool)
+    'persistent': {'DATABASE_POOL': 'False', 'DATABASE_CONN_MAX_AGE': '600'},
+    # psycopg's pool, DATABASE_POOL_* as in the environment
+    'pool': {'DATABASE_POOL': 'True'},
+}
+
+# List and detail reads, every one of them querying
+PATHS = [
+    '/api/members/',
+    '/api/blogs/',
+    '/api/projects/?status=ongoing',
+    '/api/members/{member}/',
+    '/api/blogs/{blog}/',
+    '/api/projects/{project}/',
+]
+
+
+class Command(BaseCommand):
+    help = ('Compares API latency under bursts of load with and without database connection pooling '
+            '(Postgres only)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', default='20,100',
+                            help='Comma-separated numbers of concurrent connections in a burst')
+        parser.add_argument('--duration', type=float, default=3, help='Seconds each burst lasts')
+        parser.add_argument('--bursts', type=int, default=5, help='Bursts per mode and size')
+        parser.add_argument('--idle', type=float, default=2, help='Seconds between bursts')
+        parser.add_argument('--modes', default=','.join(MODES), help=f'Comma-separated: {", ".join(MODES)}')
+        parser.add_argument('--server', default='gthread', help='SERVER_WORKER_CLASS of the servers')
+        parser.add_argument('--workers', type=int,
+                            help='Server worker processes (default: as sized by backend/server.py)')
+        parser.add_argument('--members', type=int, default=200)
+        parser.add_argument('--blogs', type=int, default=1000)
+        parser.add_argument('--projects', type=int, default=300)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Connection pooling needs Postgres; set DATABASE_URL')
+        modes = options['modes'].split(',')
+        if set(modes) - set(MODES):
+            raise CommandError(f'--modes must be among {", ".join(MODES)}')
+        levels = [int(level) for level in options['connections'].split(',')]
+
+        # The servers are separate processes, so the rows must be committed;
+        # they are deleted again at the end
+        created = seed(random.Random(options['seed']), options['members'], options['blogs'], options['projects'])
+        try:
+            ids = {
+                'member': created['members'][0],
+                'blog': created['blogs'][0],
+                'project': created['projects'][0],
+            }
+            paths = [path.format(**ids) for path in PATHS]
+            # Uncached, so every request needs a connection
+            env = {'API_CACHE_ENABLED': 'False', 'DEBUG': 'False', 'SERVER_WORKER_CLASS': options['server']}
+            results = []
+            for mode in modes:
+                port = free_port()
+                self.stdout.write(f'Starting {options["server"]} server, {mode} connections')
+                with server(gunicorn_args(port, options['workers']), port, {**env, **MODES[mode]}):
+                    run_load(port, paths, 10, 2)
+                    for connections in levels:
+                        latencies, failures, elapsed = [], 0, 0.0
+                        for _ in range(options['bursts']):
+                            # Quiet between bursts, as between visitors
+                            time.sleep(options['idle'])
+                            burst, failed, seconds = run_load(port, paths, connections, options['duration'])
+                            latencies += burst
+                            failures += failed
+                            elapsed += seconds
+                        results.append((mode, connections, latencies, failures, elapsed))
+        finally:
+            unseed(created)
+
+        self.stdout.write(
+            f'{len(paths)} paths, {options["bursts"]} bursts of {options["duration"]:g}s '
+            f'{options["idle"]:g}s apart, response cache off'
+        )
+        self.stdout.write(f'{"mode":<10} {"conns":>6} {"req/s":>9} {"p50":>9} {"p95":>9} {"p99":>9} {"errors":>7}')
+        for mode, connections, latencies, failures, elapsed in results:
+            self.stdout.write(
+                f'{mode:<10} {connections:>6} {len(latencies) / elapsed:>9.1f} '
+                f'{percentile(latencies, 50):>7.1f}ms {percentile(latencies, 95):>7.1f}ms '
+                f'{percentile(latencies, 99):>7.1f}ms {failures:>7}'
+            )
+        self.stdout.write('Pool waits and checkouts are in /metrics as db_pool_*')
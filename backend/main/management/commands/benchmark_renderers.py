@@ -0,0 +1,77 @@
+import gc
+import random
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from main.benchmarking import Rollback, api_client, measure, summarize
+from main.renderers import ORJSONRenderer
+from main.seeding import seed
+from main.serializers import BlogPostSerializer
+
+RENDERERS = [('json', JSONRenderer()), ('orjson', ORJSONRenderer())]
+
+
+class Command(BaseCommand):
+    help = 'Compares JSON encode time and memory per endpoint: DRF JSONRenderer vs ORJSONRenderer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=50)
+        parser.add_argument('--blogs', type=int, default=200)
+        parser.add_argument('--projects', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        results = []
+        try:
+            with transaction.atomic(), api_client() as client:
+                created = seed(random.Random(options['seed']), options['members'], options['blogs'],
+                               options['projects'])
+                blog_fields = ','.join(BlogPostSerializer.Meta.fields)
+                cases = [
+                    ('members', '/api/members/'),
+                    ('members roster', '/api/members/roster/'),
+                    ('blogs', '/api/blogs/'),
+                    ('blogs, every field', f'/api/blogs/?fields={blog_fields}'),
+                    ('blog detail', f'/api/blogs/{created["blogs"][0]}/'),
+                    ('projects', '/api/projects/'),
+                    ('project detail', f'/api/projects/{created["projects"][0]}/'),
+                    ('stats', '/api/stats/'),
+                ]
+                for label, path in cases:
+                    # The data the view hands to the renderer
+                    data = client.get(path).data
+                    runs = [self.run(renderer, data, options['repeat']) for _, renderer in RENDERERS]
+                    results.append((label, runs))
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(f'{"endpoint":<20} {"bytes":>9} ' + ' '.join(
+            f'{name + " p50":>12} {name + " peak":>12}' for name, _ in RENDERERS
+        ) + f' {"speedup":>8}')
+        for label, runs in results:
+            size = runs[0][0]
+            self.stdout.write(f'{label:<20} {size:>9,} ' + ' '.join(
+                f'{timings["p50"] * 1000:>10.0f}us {peak / 1024:>10.1f}KB' for _, timings, peak in runs
+            ) + f' {runs[0][1]["p50"] / runs[-1][1]["p50"]:>7.1f}x')
+
+    def run(self, renderer, data, repeat):
+        """
+        Return (bytes, encode timings in ms, peak traced bytes) of rendering ``data``
+        """
+        content = renderer.render(data, renderer.media_type)
+        # Timings without tracemalloc, which slows allocation a lot
+        gc.collect()
+        timings = summarize(measure(lambda: renderer.render(data, renderer.media_type), repeat))
+        gc.collect()
+        tracemalloc.start()
+        try:
+            renderer.render(data, renderer.media_type)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return len(content), timings, peak
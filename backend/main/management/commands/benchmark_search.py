@@ -0,0 +1,77 @@
+import random
+from functools import reduce
+from operator import and_, or_
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from main.benchmarking import Rollback, measure, summarize
+from main.models import BlogPost
+from main.search import get_search_backend
+from main.seeding import build_blog_posts
+from main.views import BlogPostViewSet
+
+
+class Command(BaseCommand):
+    help = 'Compares blog search latency (icontains scan vs full-text index) as the corpus grows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 20000],
+                            help='Corpus sizes to measure, in blog posts')
+        parser.add_argument('--queries', nargs='+',
+                            default=['diffusion', 'reinforcement learning', 'graph neural', 'quantization latency'])
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        backend = get_search_backend('default')
+        if backend is None:
+            self.stdout.write(self.style.WARNING('No full-text backend for this database; only measuring icontains'))
+
+        rng = random.Random(options['seed'])
+        rows = []
+        try:
+            with transaction.atomic():
+                created = 0
+                for size in sorted(options['sizes']):
+                    BlogPost.objects.bulk_create(build_blog_posts(rng, size - created, start=created), batch_size=500)
+                    created = size
+                    for query in options['queries']:
+                        rows.append(self._measure(backend, size, query, options['repeat']))
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(f'{"posts":>7}  {"query":<22} {"icontains p50":>14} {"p95":>8}  {"fts p50":>8} {"p95":>8}  {"hits":>6}')
+        for row in rows:
+            fts = row['fts']
+            self.stdout.write(
+                f'{row["size"]:>7}  {row["query"]:<22} {row["icontains"]["p50"]:>12.1f}ms {row["icontains"]["p95"]:>6.1f}ms'
+                + (f'  {fts["p50"]:>6.1f}ms {fts["p95"]:>6.1f}ms  {row["hits"]:>6}' if fts else '')
+            )
+
+    def _measure(self, backend, size, query, repeat):
+        queryset = BlogPost.objects.all()
+
+        # What SearchFilter builds: every term must appear in one of the fields
+        legacy = queryset.filter(reduce(and_, [
+            reduce(or_, [Q(**{f'{field}__icontains': term}) for field in BlogPostViewSet.search_fields])
+            for term in query.split()
+        ]))
+
+        def run_legacy():
+            legacy.count()
+            list(legacy.order_by('-date_published')[:10])
+
+        row = {'size': size, 'query': query, 'icontains': summarize(measure(run_legacy, repeat)), 'fts': None}
+        if backend is not None:
+            ranked = backend.search(queryset, query)
+
+            def run_fts():
+                ranked.count()
+                list(ranked.order_by('-search_rank')[:10])
+
+            row['fts'] = summarize(measure(run_fts, repeat))
+            row['hits'] = ranked.count()
+        return row
@@ -0,0 +1,70 @@
+import gc
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from main.benchmarking import Rollback, api_client, measure, summarize
+from main.models import BlogPost, Member, Project
+from main.seeding import seed
+from main.serializers import BlogPostSerializer, MemberSerializer, ProjectSerializer
+from main.values import get_plan
+
+QUERYSETS = [
+    ('members', MemberSerializer, lambda: Member.objects.order_by('pk')),
+    ('blogs', BlogPostSerializer, lambda: BlogPost.objects.prefetch_related('author_members').order_by('pk')),
+    ('projects', ProjectSerializer, lambda: Project.objects.prefetch_related('technologies').order_by('pk')),
+]
+ENDPOINTS = ['/api/members/', '/api/blogs/', '/api/projects/', '/api/members/active/']
+
+
+class Command(BaseCommand):
+    help = 'Compares ModelSerializer with values_list() rows: rows per second and list endpoint latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=200)
+        parser.add_argument('--blogs', type=int, default=500)
+        parser.add_argument('--projects', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        serializers, endpoints = [], []
+        try:
+            with transaction.atomic(), api_client() as client:
+                seed(random.Random(options['seed']), options['members'], options['blogs'], options['projects'])
+                for label, serializer_class, queryset in QUERYSETS:
+                    plan = get_plan(serializer_class)
+                    count = queryset().count()
+                    model = self.run(lambda: serializer_class(queryset(), many=True).data, repeat)
+                    values = self.run(lambda: plan.represent(plan.rows(queryset())), repeat)
+                    serializers.append((label, count, model, values))
+                for path in ENDPOINTS:
+                    with override_settings(API_VALUES_SERIALIZERS=False):
+                        model = self.run(lambda: client.get(path), repeat)
+                    values = self.run(lambda: client.get(path), repeat)
+                    endpoints.append((path, model, values))
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write('Whole table, queries included')
+        self.stdout.write(f'{"model":<10} {"rows":>6} {"serializer rows/s":>18} {"values rows/s":>14} {"speedup":>8}')
+        for label, count, model, values in serializers:
+            self.stdout.write(
+                f'{label:<10} {count:>6} {count / model["p50"] * 1000:>18,.0f} '
+                f'{count / values["p50"] * 1000:>14,.0f} {model["p50"] / values["p50"]:>7.1f}x'
+            )
+        self.stdout.write('\nList endpoints, p50')
+        self.stdout.write(f'{"endpoint":<22} {"serializer":>11} {"values":>9} {"speedup":>8}')
+        for path, model, values in endpoints:
+            self.stdout.write(
+                f'{path:<22} {model["p50"]:>9.2f}ms {values["p50"]:>7.2f}ms {model["p50"] / values["p50"]:>7.1f}x'
+            )
+
+    def run(self, func, repeat):
+        func()
+        gc.collect()
+        return summarize(measure(func, repeat))
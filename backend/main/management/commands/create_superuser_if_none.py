@@ -2,6 +2,10 @@ from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from django.db import transaction
 
+USERNAME = 'admin'
+EMAIL = 'admin@example.com'
+PASSWORD = 'admin123'
+
 
 class Command(BaseCommand):
     help = 'Creates a superuser if none exists'
@@ -9,9 +13,9 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         User = get_user_model()
         
-        username = 'admin'
-        email = 'admin@example.com'
-        password = 'admin123'
+        username = USERNAME
+        email = EMAIL
+        password = PASSWORD
         
         try:
             with transaction.atomic():
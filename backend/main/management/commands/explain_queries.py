@@ -0,0 +1,178 @@
+import json
+import random
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from main.benchmarking import Rollback, api_client
+from main.models import BlogPost, Project
+from main.search import get_search_backend
+from main.seeding import seed
+
+# Every endpoint and filter/ordering combination the frontend or API docs use
+ENDPOINTS = [
+    '/api/members/',
+    '/api/members/?page=2',
+    '/api/members/?active=true',
+    '/api/members/?active=false',
+    '/api/members/?por_holders=true',
+    '/api/members/?batch=2023',
+    '/api/members/?designation=Lead',
+    '/api/members/?search=rahul',
+    '/api/members/?ordering=name',
+    '/api/members/?ordering=-batch',
+    '/api/members/?ordering=joined_date',
+    '/api/members/por_holders/',
+    '/api/members/active/',
+    '/api/members/roster/',
+    '/api/members/export/',
+    '/api/blogs/',
+    '/api/blogs/?page=5',
+    '/api/blogs/?pagination=cursor',
+    '/api/blogs/?published=true',
+    '/api/blogs/?published=false',
+    '/api/blogs/?author=Author',
+    '/api/blogs/?search=diffusion',
+    '/api/blogs/?ordering=-date_published',
+    '/api/blogs/?ordering=-date_created',
+    '/api/blogs/?ordering=-views_count',
+    '/api/blogs/{blog}/',
+    '/api/blogs/export/',
+    '/api/projects/',
+    '/api/projects/?page=2',
+    '/api/projects/?pagination=cursor',
+    '/api/projects/?status=ongoing',
+    '/api/projects/?technology=PyTorch',
+    '/api/projects/?technology=pytorch&technology=cuda',
+    '/api/projects/?technology=pytorch,cuda&technology_match=any',
+    '/api/projects/?search=vision',
+    '/api/projects/?ordering=name',
+    '/api/projects/?ordering=-end_date',
+    '/api/projects/?ordering=-created_at',
+    '/api/projects/ongoing/',
+    '/api/projects/completed/',
+    '/api/projects/{project}/',
+    '/api/projects/export/',
+]
+
+# Endpoints whose filters cannot use a b-tree index (substring matches),
+# with the tables they are allowed to scan
+EXPECTED_SCANS = {
+    '/api/members/?designation=Lead': {'main_member'},
+    '/api/members/?search=rahul': {'main_member'},
+    '/api/blogs/?author=Author': {'main_blogpost'},
+    '/api/projects/?search=vision': {'main_project'},
+}
+
+# "SCAN main_member" reads the whole table. "SCAN t USING INDEX i" walks an
+# index in order (fine with LIMIT), "USING COVERING INDEX" reads only the
+# index, and a VIRTUAL TABLE scan is FTS5's own lookup
+_SQLITE_SCAN = re.compile(r'^SCAN (\w+)$')
+
+
+class Command(BaseCommand):
+    help = 'Runs EXPLAIN for every API query against a seeded database and flags full table scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=300)
+        parser.add_argument('--blogs', type=int, default=3000)
+        parser.add_argument('--projects', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every query plan')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            raise CommandError(f'Query plans are only checked on SQLite and PostgreSQL, not {connection.vendor}')
+
+        rng = random.Random(options['seed'])
+        results = []
+        try:
+            with transaction.atomic(), api_client() as client:
+                seed(rng, options['members'], options['blogs'], options['projects'])
+                if connection.vendor == 'postgresql':
+                    with connection.cursor() as cursor:
+                        cursor.execute('ANALYZE')
+                        # The tables are small enough that a seq scan always wins;
+                        # turning it off leaves one only where no index applies
+                        cursor.execute('SET LOCAL enable_seqscan = off')
+                # Keep the one-off backend detection query out of the first blog request
+                get_search_backend(connection.alias)
+                ids = {
+                    'blog': BlogPost.objects.values_list('pk', flat=True).first(),
+                    'project': Project.objects.values_list('pk', flat=True).first(),
+                }
+                for path in ENDPOINTS:
+                    results.append(self.inspect(client, path.format(**ids), path, options['verbose_plans']))
+                raise Rollback
+        except Rollback:
+            pass
+
+        failures = 0
+        self.stdout.write(f'{"endpoint":<60} {"queries":>7}  scans')
+        for path, queries, scans in results:
+            unexpected = scans - EXPECTED_SCANS.get(path, set())
+            failures += bool(unexpected)
+            if unexpected:
+                note = self.style.ERROR(', '.join(sorted(unexpected)))
+            elif scans:
+                note = f'{", ".join(sorted(scans))} (expected: substring filter)'
+            else:
+                note = '-'
+            self.stdout.write(f'{path:<60} {queries:>7}  {note}')
+
+        if failures:
+            raise CommandError(f'{failures} endpoint(s) read a whole table; add or fix an index')
+        self.stdout.write(self.style.SUCCESS('No unexpected full table scans'))
+
+    def inspect(self, client, url, path, verbose):
+        """
+        Request ``url`` and return (path, number of queries, tables read by a full scan)
+        """
+        queries = []
+
+        def record(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith('SELECT'):
+                queries.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            response = client.get(url)
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+        if response.status_code != 200:
+            raise CommandError(f'{url} returned {response.status_code}')
+
+        scans = set()
+        for sql, params in queries:
+            plan, tables = self.explain(sql, params)
+            scans |= tables
+            if verbose:
+                self.stdout.write(f'{url}\n  {sql}\n' + ''.join(f'    {line}\n' for line in plan))
+        return path, len(queries), scans
+
+    def explain(self, sql, params):
+        """
+        Return (plan lines, tables read by a full scan) for one query
+        """
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                lines = [row[3] for row in cursor.fetchall()]
+                tables = {match.group(1) for match in map(_SQLITE_SCAN.match, lines) if match}
+                return lines, tables
+
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            lines, tables = [], set()
+            nodes = [plan[0]['Plan']]
+            while nodes:
+                node = nodes.pop()
+                lines.append(f'{node["Node Type"]} {node.get("Relation Name", "")} {node.get("Index Name", "")}'.strip())
+                if node['Node Type'] == 'Seq Scan':
+                    tables.add(node['Relation Name'])
+                nodes.extend(node.get('Plans', ()))
+            return lines, tables
@@ -0,0 +1,72 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from main.cache import bump_version
+from main.images import IMAGE_FIELDS, render, stale_fields
+
+
+def _setup_worker():
+    # A no-op when the pool forks; needed when it spawns
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = 'Makes missing or outdated renditions of uploaded images across a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes (default: one per CPU)')
+        parser.add_argument('--force', action='store_true',
+                            help='Render every upload again, even if its renditions are up to date')
+
+    def handle(self, *args, **options):
+        # source file -> [(model, pk, renditions field)]; one upload can back several rows
+        targets = {}
+        for model, fields in IMAGE_FIELDS.items():
+            for instance in model.objects.only('pk', *fields, *fields.values()).iterator():
+                stale = fields if options['force'] else stale_fields(instance)
+                for field, renditions_field in stale.items():
+                    name = getattr(instance, field).name
+                    if name:
+                        targets.setdefault(name, []).append((model, instance.pk, renditions_field))
+                    else:
+                        model.objects.filter(pk=instance.pk).update(**{renditions_field: {}})
+
+        if not targets:
+            self.stdout.write(self.style.SUCCESS('All renditions are up to date'))
+            return
+
+        self.stdout.write(f'Rendering {len(targets)} image(s) with {options["workers"]} worker(s)')
+        # Forked workers must not inherit open database connections
+        connections.close_all()
+        start = time.perf_counter()
+        done = failed = 0
+        touched = set()
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=_setup_worker) as pool:
+            futures = {pool.submit(render, name): name for name in targets}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    renditions = future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f'{name}: {exc}')
+                    continue
+                for model, pk, renditions_field in targets[name]:
+                    model.objects.filter(pk=pk).update(**{renditions_field: renditions})
+                    touched.add(model)
+                done += 1
+
+        # update() sends no signals, so invalidate cached API responses here
+        for model in touched:
+            bump_version(model)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f'Rendered {done} image(s) in {elapsed:.1f}s'))
+        if failed:
+            self.stderr.write(self.style.ERROR(f'{failed} image(s) failed'))
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main import snapshots
+
+
+class Command(BaseCommand):
+    help = 'Writes the pre-rendered API responses that nginx serves (see main/snapshots.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', action='store_true',
+                            help='Only the lists, list actions and stats, not every detail response')
+
+    def handle(self, *args, **options):
+        if not snapshots.enabled():
+            raise CommandError('Set API_SNAPSHOT_DIR to the directory nginx serves the snapshots from')
+        start = time.perf_counter()
+        if options['pages']:
+            changed, removed = snapshots.render_pages(), 0
+        else:
+            changed, removed = snapshots.render_all()
+        self.stdout.write(self.style.SUCCESS(
+            f'{changed} snapshot(s) changed, {removed} removed in {time.perf_counter() - start:.1f}s'
+        ))
@@ -0,0 +1,113 @@
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connection
+
+from main import snapshots
+from main.jobs import prune_done, requeue_expired, run_next
+from main.stats import refresh_stats
+
+logger = logging.getLogger('main.jobs')
+
+# Seconds between requeueing expired jobs and pruning finished ones
+MAINTENANCE_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = 'Runs queued background jobs until stopped with SIGINT or SIGTERM'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help='Jobs to run at once, one thread each (default: 1)')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds an idle thread waits before looking for due jobs again')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once no job is due instead of waiting for more')
+
+    def handle(self, *args, **options):
+        self.stopping = threading.Event()
+        self.poll_interval = options['poll_interval']
+        self.burst = options['burst']
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, self.stop)
+
+        name = f'{socket.gethostname()}:{os.getpid()}'
+        threads = [
+            threading.Thread(target=self.work, args=(f'{name}:{index}',), name=f'worker-{index}')
+            for index in range(max(1, options['concurrency']))
+        ]
+        self.stdout.write(f'Worker {name} running {len(threads)} job(s) at a time')
+        for thread in threads:
+            thread.start()
+
+        last_maintenance = 0
+        self.last_refresh = {}
+        while any(thread.is_alive() for thread in threads):
+            if time.monotonic() - last_maintenance >= MAINTENANCE_INTERVAL:
+                self.maintain()
+                last_maintenance = time.monotonic()
+            # A --burst run only drains the queue
+            if not self.burst:
+                # Ahead of the stats snapshot expiring, so readers do not rebuild it
+                self.refresh(settings.STATS_REFRESH_INTERVAL / 2, refresh_stats, 'the site stats')
+                # For view counts, which change without queueing a render
+                if snapshots.enabled():
+                    self.refresh(settings.API_SNAPSHOT_REFRESH_INTERVAL, snapshots.render_pages, 'the API snapshots')
+            self.stopping.wait(1)
+        for thread in threads:
+            thread.join()
+        self.stdout.write(f'Worker {name} stopped')
+
+    def stop(self, signum, frame):
+        # Threads finish the job they are running, then exit
+        self.stdout.write('Stopping after the running jobs finish')
+        self.stopping.set()
+
+    def work(self, worker):
+        try:
+            while not self.stopping.is_set():
+                close_old_connections()
+                try:
+                    ran = run_next(worker)
+                except DatabaseError:
+                    # The database is down or not migrated yet; try again later
+                    logger.exception('Worker %s could not claim a job', worker)
+                    ran = False
+                if not ran:
+                    if self.burst:
+                        return
+                    self.stopping.wait(self.poll_interval)
+        finally:
+            connection.close()
+
+    def maintain(self):
+        try:
+            requeued = requeue_expired()
+            pruned = prune_done()
+        except DatabaseError:
+            logger.exception('Job maintenance failed')
+            return
+        finally:
+            close_old_connections()
+        if requeued:
+            logger.warning('Requeued %d job(s) whose worker stopped', requeued)
+        if pruned:
+            logger.info('Deleted %d finished job(s)', pruned)
+
+    def refresh(self, interval, func, name):
+        # Run func() if it last ran more than interval seconds ago
+        if time.monotonic() - self.last_refresh.get(name, -interval) < interval:
+            return
+        try:
+            func()
+        except (DatabaseError, OSError):
+            logger.exception('Refreshing %s failed', name)
+        finally:
+            close_old_connections()
+        self.last_refresh[name] = time.monotonic()
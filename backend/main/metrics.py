@@ -0,0 +1,297 @@
+"""
+Per-request performance metrics.
+
+``ServerTimingMiddleware`` (main/middleware.py) measures every request and
+adds it to this process's ``Registry``: a latency histogram per view,
+method and status code, plus database time, query count, rendering time
+and response cache outcome per view.
+
+Each gunicorn worker keeps its own registry and writes it to
+``METRICS_DIR/<pid>.json`` every ``METRICS_FLUSH_INTERVAL`` seconds and on
+exit. ``/metrics`` adds up every worker's file in the Prometheus text
+format, so it reports the whole server whichever worker answers. When a
+worker exits its file is folded into ``retired.json`` by the gunicorn
+master (see backend/server.py), so totals never go down.
+
+With DATABASE_POOL on, each written file also holds the state of the
+process's database connection pools, read from psycopg's pool stats:
+connections open, in use and waited for (gauges, dropped when the worker
+exits), and checkouts, time spent waiting and timeouts (counters).
+"""
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds, in seconds, of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RETIRED = 'retired'
+
+# name: (type, help, labels); histogram series are [bucket counts..., +Inf, sum]
+METRICS = {
+    'http_request_duration_seconds': ('histogram', 'Time to answer a request', ('view', 'method', 'status')),
+    'http_request_db_seconds_total': ('counter', 'Time spent in database queries', ('view',)),
+    'http_request_db_queries_total': ('counter', 'Database queries run', ('view',)),
+    'http_request_serialize_seconds_total': ('counter', 'Time spent rendering response data', ('view',)),
+    'http_request_cache_total': ('counter', 'API response cache lookups', ('view', 'outcome')),
+    'db_pool_connections': ('gauge', 'Open pooled database connections', ('database',)),
+    'db_pool_connections_in_use': ('gauge', 'Pooled connections lent to a request', ('database',)),
+    'db_pool_requests_waiting': ('gauge', 'Requests waiting for a pooled connection', ('database',)),
+    'db_pool_checkouts_total': ('counter', 'Connections taken from the pool', ('database',)),
+    'db_pool_wait_seconds_total': ('counter', 'Time spent waiting for a pooled connection', ('database',)),
+    'db_pool_timeouts_total': ('counter', 'Requests that gave up waiting for a pooled connection', ('database',)),
+}
+# Sampled from the pools when written, rather than counted per request
+POOL_METRICS = [name for name in METRICS if name.startswith('db_pool_')]
+
+
+class Registry:
+    """
+    Thread-safe, per-process metrics, keyed by metric name and label values
+    """
+
+    def __init__(self, flush_interval=None):
+        self.flush_interval = settings.METRICS_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self._lock = threading.Lock()
+        self._series = {name: {} for name in METRICS}
+        self._timer = None
+
+    def observe(self, view, method, status, duration, db_time=0.0, queries=0, serialize_time=0.0,
+                cache_outcome=None):
+        """
+        Record one request
+        """
+        with self._lock:
+            histogram = self._series['http_request_duration_seconds'].setdefault(
+                (view, method, str(status)), [0] * (len(BUCKETS) + 2)
+            )
+            for index, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    histogram[index] += 1
+            histogram[-2] += 1
+            histogram[-1] += duration
+            self._add('http_request_db_seconds_total', (view,), db_time)
+            self._add('http_request_db_queries_total', (view,), queries)
+            self._add('http_request_serialize_seconds_total', (view,), serialize_time)
+            if cache_outcome:
+                self._add('http_request_cache_total', (view, cache_outcome), 1)
+            self._schedule_flush()
+
+    def snapshot(self):
+        """
+        JSON-serializable copy: {name: [[labels, value], ...]}
+        """
+        with self._lock:
+            snapshot = {
+                name: [[list(labels), list(value) if isinstance(value, list) else value]
+                       for labels, value in series.items()]
+                for name, series in self._series.items()
+                if name not in POOL_METRICS
+            }
+        snapshot.update(pool_snapshot())
+        return snapshot
+
+    def flush(self):
+        """
+        Write this process's metrics to its file in METRICS_DIR
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        _write(_path(os.getpid()), self.snapshot())
+
+    def _add(self, name, labels, amount):
+        # Caller holds the lock
+        series = self._series[name]
+        series[labels] = series.get(labels, 0) + amount
+
+    def _schedule_flush(self):
+        # Caller holds the lock
+        if self._timer is not None or self.flush_interval <= 0:
+            return
+        self._timer = threading.Timer(self.flush_interval, self._flush_from_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_from_timer(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        except OSError:
+            logger.exception('Failed to write metrics')
+
+
+def pool_snapshot():
+    """
+    This process's connection pool metrics, in the form of ``Registry.snapshot()``
+    """
+    snapshot = {name: [] for name in POOL_METRICS}
+    for connection in connections.all():
+        # None unless the database is Postgres with a pool configured; the
+        # pool opens with the first connection
+        pool = getattr(connection, 'pool', None)
+        if pool is None or pool.closed:
+            continue
+        # psycopg leaves out counters that are still zero
+        stats = pool.get_stats()
+        labels = [connection.alias]
+        size = stats.get('pool_size', 0)
+        snapshot['db_pool_connections'].append([labels, size])
+        snapshot['db_pool_connections_in_use'].append([labels, size - stats.get('pool_available', 0)])
+        snapshot['db_pool_requests_waiting'].append([labels, stats.get('requests_waiting', 0)])
+        snapshot['db_pool_checkouts_total'].append([labels, stats.get('requests_num', 0)])
+        snapshot['db_pool_wait_seconds_total'].append([labels, stats.get('requests_wait_ms', 0) / 1000])
+        snapshot['db_pool_timeouts_total'].append([labels, stats.get('requests_errors', 0)])
+    return snapshot
+
+
+def _path(name):
+    return Path(settings.METRICS_DIR) / f'{name}.json'
+
+
+def _write(path, snapshot):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Written whole and renamed, so readers never see half a file
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(tmp, path)
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def merge(snapshots):
+    """
+    Add up snapshots into {name: {labels: value}}
+    """
+    merged = {name: {} for name in METRICS}
+    for snapshot in snapshots:
+        for name, series in snapshot.items():
+            if name not in merged:
+                continue
+            for labels, value in series:
+                labels = tuple(labels)
+                current = merged[name].get(labels)
+                if isinstance(value, list):
+                    merged[name][labels] = value if current is None else [a + b for a, b in zip(current, value)]
+                else:
+                    merged[name][labels] = (current or 0) + value
+    return merged
+
+
+def collect(flush=True):
+    """
+    Every worker's metrics added up, this process's being current
+
+    Without ``flush``, only what the workers have written so far, for
+    processes that serve no requests themselves.
+    """
+    if flush:
+        get_registry().flush()
+    return merge(_read(path) for path in Path(settings.METRICS_DIR).glob('*.json'))
+
+
+def retire(pid):
+    """
+    Fold the metrics of the exited worker ``pid`` into the retired totals
+    """
+    path = _path(pid)
+    if not path.exists():
+        return
+    # Gauges describe the worker as it was, so they go with it
+    counters = {name: series for name, series in _read(path).items()
+                if name in METRICS and METRICS[name][0] != 'gauge'}
+    retired = merge([_read(_path(RETIRED)), counters])
+    _write(_path(RETIRED), {
+        name: [[list(labels), value] for labels, value in series.items()]
+        for name, series in retired.items()
+    })
+    path.unlink()
+
+
+def reset():
+    """
+    Delete the metrics of every process, e.g. when the server starts
+    """
+    for path in Path(settings.METRICS_DIR).glob('*.json'):
+        path.unlink(missing_ok=True)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, **extra):
+    pairs = [*zip(names, values), *extra.items()]
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def render(merged):
+    """
+    Prometheus text exposition format (version 0.0.4)
+    """
+    lines = []
+    for name, (kind, help_text, label_names) in METRICS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        for values, value in sorted(merged[name].items()):
+            if kind != 'histogram':
+                lines.append(f'{name}{_labels(label_names, values)} {value:g}')
+                continue
+            for bound, count in zip(BUCKETS, value):
+                lines.append(f'{name}_bucket{_labels(label_names, values, le=f"{bound:g}")} {count}')
+            lines.append(f'{name}_bucket{_labels(label_names, values, le="+Inf")} {value[-2]}')
+            lines.append(f'{name}_sum{_labels(label_names, values)} {value[-1]:g}')
+            lines.append(f'{name}_count{_labels(label_names, values)} {value[-2]}')
+    return '\n'.join(lines) + '\n'
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """
+    Return this process's registry, creating it on first use
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = Registry()
+    return _registry
+
+
+def _flush_at_exit():
+    if _registry is not None:
+        try:
+            _registry.flush()
+        except OSError:
+            pass
+
+
+def _reset_after_fork():
+    # A forked worker starts from zero; the parent's counts stay in its own file
+    global _registry, _registry_lock
+    _registry = None
+    _registry_lock = threading.Lock()
+
+
+atexit.register(_flush_at_exit)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
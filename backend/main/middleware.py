@@ -0,0 +1,170 @@
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .metrics import get_registry
+from .routers import replica_reads
+
+# The QueryTimer of the request being served; context variables follow a
+# request into the threads sync_to_async() runs its queries in
+_query_timer = ContextVar('query_timer', default=None)
+
+
+class QueryTimer:
+    """
+    Database execute wrapper that adds up query time and count
+    """
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.queries += 1
+
+
+def _time_query(execute, sql, params, many, context):
+    timer = _query_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def _install_query_timing(connection, **kwargs):
+    # Installed once per connection object and left in place, so queries of
+    # async views, which run on other threads' connections, are timed too
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+connection_created.connect(_install_query_timing)
+
+
+class ServerTimingMiddleware:
+    """
+    Times each request, adds a Server-Timing header and records it in main/metrics.py
+
+    Goes first in MIDDLEWARE, so ``total`` covers the other middleware too.
+    ``serialize`` is the renderer turning response data into bytes; building
+    that data from models counts as ``app``, since querysets run lazily
+    while serializing and the two cannot be told apart.
+
+    Sync and async capable, so it adds no thread switch to the async views
+    served under ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            # Django runs a sync hook in a thread when serving async
+            self.process_template_response = self._aprocess_template_response
+        # Connections opened before this module was imported
+        for connection in connections.all(initialized_only=True):
+            _install_query_timing(connection)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        start, timer, token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _query_timer.reset(token)
+        return self._finish(request, response, start, timer)
+
+    async def __acall__(self, request):
+        start, timer, token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _query_timer.reset(token)
+        return self._finish(request, response, start, timer)
+
+    def _start(self, request):
+        request._render_times = []
+        timer = QueryTimer()
+        return time.perf_counter(), timer, _query_timer.set(timer)
+
+    def _finish(self, request, response, start, timer):
+        total = time.perf_counter() - start
+        serialize = sum(request._render_times)
+        cache_outcome = response.get('X-Cache', '').lower() or None
+        timings = [
+            f'db;dur={timer.seconds * 1000:.1f};desc="{timer.queries} queries"',
+            f'serialize;dur={serialize * 1000:.1f}',
+            f'app;dur={max(0.0, total - timer.seconds - serialize) * 1000:.1f}',
+        ]
+        if cache_outcome:
+            timings.append(f'cache;desc={cache_outcome}')
+        timings.append(f'total;dur={total * 1000:.1f}')
+        response['Server-Timing'] = ', '.join(timings)
+
+        get_registry().observe(
+            _view_name(request), request.method, response.status_code, total,
+            db_time=timer.seconds, queries=timer.queries, serialize_time=serialize, cache_outcome=cache_outcome,
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this; time it from here to the end
+        start = time.perf_counter()
+        response.add_post_render_callback(lambda _: request._render_times.append(time.perf_counter() - start))
+        return response
+
+    async def _aprocess_template_response(self, request, response):
+        return ServerTimingMiddleware.process_template_response(self, request, response)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Read from a replica while serving safe-method requests (see main/routers.py)
+
+    A request that writes sets a cookie that keeps the client on the
+    primary for DATABASE_REPLICA_PIN_SECONDS, so it reads its own writes
+    even when the replicas lag.
+    """
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+    COOKIE = 'db_primary'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = request.method not in self.SAFE_METHODS or self.COOKIE in request.COOKIES
+        with replica_reads(pinned) as state:
+            response = self.get_response(request)
+        if state['wrote']:
+            response.set_cookie(self.COOKIE, '1', max_age=settings.DATABASE_REPLICA_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
+
+
+def _view_name(request):
+    """
+    Label for the view that answered: ``MemberViewSet.list``, a URL name, or
+    ``unmatched``; never the path, so the number of series stays bounded
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    func = match.func
+    cls = getattr(func, 'cls', None)
+    actions = getattr(func, 'actions', None)
+    if cls is not None and actions:
+        return f'{cls.__name__}.{actions.get(request.method.lower(), request.method.lower())}'
+    if cls is not None:
+        return cls.__name__
+    return match.view_name or getattr(func, '__name__', 'unknown')
@@ -0,0 +1,92 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:12
+
+from django.db import migrations
+
+# Frozen copies of the DDL in main/search.py as of this migration; later
+# changes to the index go in new migrations, not here
+
+POSTGRES_INDEX_SQL = [
+    """
+    ALTER TABLE main_blogpost ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(small_description, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(author, '')), 'C') ||
+        setweight(to_tsvector('english', coalesce(blog_content, '')), 'D')
+    ) STORED
+    """,
+    'CREATE INDEX IF NOT EXISTS main_blogpost_search_vector_gin ON main_blogpost USING GIN (search_vector)',
+]
+POSTGRES_DROP_SQL = [
+    'DROP INDEX IF EXISTS main_blogpost_search_vector_gin',
+    'ALTER TABLE main_blogpost DROP COLUMN IF EXISTS search_vector',
+]
+
+SQLITE_INDEX_SQL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS main_blogpost_fts USING fts5("
+    "title, small_description, author, blog_content, "
+    "content='main_blogpost', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS main_blogpost_fts_ai AFTER INSERT ON main_blogpost BEGIN "
+    "INSERT INTO main_blogpost_fts(rowid, title, small_description, author, blog_content) "
+    "VALUES (new.id, new.title, new.small_description, new.author, new.blog_content); END",
+    "CREATE TRIGGER IF NOT EXISTS main_blogpost_fts_ad AFTER DELETE ON main_blogpost BEGIN "
+    "INSERT INTO main_blogpost_fts(main_blogpost_fts, rowid, title, small_description, author, blog_content) "
+    "VALUES ('delete', old.id, old.title, old.small_description, old.author, old.blog_content); END",
+    "CREATE TRIGGER IF NOT EXISTS main_blogpost_fts_au "
+    "AFTER UPDATE OF title, small_description, author, blog_content ON main_blogpost BEGIN "
+    "INSERT INTO main_blogpost_fts(main_blogpost_fts, rowid, title, small_description, author, blog_content) "
+    "VALUES ('delete', old.id, old.title, old.small_description, old.author, old.blog_content); "
+    "INSERT INTO main_blogpost_fts(rowid, title, small_description, author, blog_content) "
+    "VALUES (new.id, new.title, new.small_description, new.author, new.blog_content); END",
+    "INSERT INTO main_blogpost_fts(main_blogpost_fts) VALUES ('rebuild')",
+]
+SQLITE_DROP_SQL = [
+    'DROP TRIGGER IF EXISTS main_blogpost_fts_ai',
+    'DROP TRIGGER IF EXISTS main_blogpost_fts_ad',
+    'DROP TRIGGER IF EXISTS main_blogpost_fts_au',
+    'DROP TABLE IF EXISTS main_blogpost_fts',
+]
+
+
+def sqlite_has_fts5(cursor):
+    cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+    if cursor.fetchone()[0]:
+        return True
+    try:
+        cursor.execute('CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)')
+        cursor.execute('DROP TABLE temp.fts5_probe')
+    except Exception:
+        return False
+    return True
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            statements = POSTGRES_INDEX_SQL
+        elif connection.vendor == 'sqlite' and sqlite_has_fts5(cursor):
+            statements = SQLITE_INDEX_SQL
+        else:
+            return
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    statements = {'postgresql': POSTGRES_DROP_SQL, 'sqlite': SQLITE_DROP_SQL}.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0002_remove_project_herosectionimagelink_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
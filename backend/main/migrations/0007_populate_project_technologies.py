@@ -0,0 +1,53 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:24
+
+from django.db import migrations
+
+
+# Frozen copies of the helpers in main/models.py as of this migration
+
+def technology_key(name):
+    return ' '.join(name.split()).lower()[:100].rstrip()
+
+
+def split_technologies(value):
+    names = {}
+    for name in (value or '').split(','):
+        # Technology.name and key hold 100 characters
+        name = ' '.join(name.split())[:100].rstrip()
+        if name:
+            names.setdefault(technology_key(name), name)
+    return list(names.values())
+
+
+def populate_technologies(apps, schema_editor):
+    Project = apps.get_model('main', 'Project')
+    Technology = apps.get_model('main', 'Technology')
+    Through = Project.technologies.through
+
+    names = {}
+    for project_id, value in Project.objects.values_list('pk', 'technologies_used'):
+        names[project_id] = split_technologies(value)
+
+    technologies = {}
+    for project_names in names.values():
+        for name in project_names:
+            key = technology_key(name)
+            if key not in technologies:
+                technologies[key] = Technology.objects.get_or_create(key=key, defaults={'name': name})[0]
+
+    Through.objects.bulk_create([
+        Through(project_id=project_id, technology_id=technologies[technology_key(name)].pk)
+        for project_id, project_names in names.items()
+        for name in project_names
+    ], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_technology'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_technologies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.3 on 2026-10-18 20:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0007_populate_project_technologies'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='photo_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='blog_image_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='thumbnail_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='hero_section_image_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -13,6 +13,8 @@ class Member(models.Model):
     # Photos
     photo_link = models.URLField(null=True, blank=True)
     photo_file = models.ImageField(upload_to='member_photos/', null=True, blank=True)
+    # Resized copies of photo_file (see main/images.py)
+    photo_renditions = models.JSONField(default=dict, blank=True, editable=False)
     
     # Academic Info
     batch = models.CharField(max_length=150, null=True, blank=True)
@@ -35,6 +37,19 @@ class Member(models.Model):
     
     class Meta:
         ordering = ['-is_por_holder', 'name']
+        indexes = [
+            # Default ordering, and the por_holders action
+            models.Index(fields=['-is_por_holder', 'name'], name='member_por_name_idx'),
+            # ?active=true and the active action, in default order
+            models.Index(fields=['-is_por_holder', 'name'], condition=models.Q(is_active=True),
+                         name='member_active_por_name_idx'),
+            models.Index(fields=['batch', '-is_por_holder', 'name'], name='member_batch_idx'),
+            models.Index(fields=['name'], name='member_name_idx'),
+            models.Index(fields=['joined_date'], name='member_joined_idx'),
+            # Cover the list validator aggregate (latest change, count) per filter
+            models.Index(fields=['is_active', 'updated_at'], name='member_active_updated_idx'),
+            models.Index(fields=['is_por_holder', 'updated_at'], name='member_por_updated_idx'),
+        ]
         verbose_name = 'Team Member'
         verbose_name_plural = 'Team Members'
     
@@ -61,6 +76,8 @@ class BlogPost(models.Model):
     blog_image_link = models.URLField(null=True, blank=True)
     blog_image_file = models.ImageField(upload_to='blog_images/', null=True, blank=True)
     thumbnail = models.ImageField(upload_to='blog_thumbnails/', null=True, blank=True)
+    blog_image_renditions = models.JSONField(default=dict, blank=True, editable=False)
+    thumbnail_renditions = models.JSONField(default=dict, blank=True, editable=False)
     
     # Links
     linkedin_link = models.URLField(null=True, blank=True)
@@ -74,6 +91,15 @@ class BlogPost(models.Model):
     
     class Meta:
         ordering = ['-date_published']
+        indexes = [
+            # Keyset pagination walks (date_published, id) downwards
+            models.Index(fields=['-date_published', '-id'], name='blogpost_published_id_idx'),
+            models.Index(fields=['is_published', '-date_published'], name='blogpost_is_published_idx'),
+            models.Index(fields=['-date_created'], name='blogpost_created_idx'),
+            models.Index(fields=['-views_count'], name='blogpost_views_idx'),
+            # Covers the list validator aggregate (latest change, views sum)
+            models.Index(fields=['is_published', 'date_modified', 'views_count'], name='blogpost_validators_idx'),
+        ]
         verbose_name = 'Blog Post'
         verbose_name_plural = 'Blog Posts'
     
@@ -86,6 +112,94 @@ class BlogPost(models.Model):
         return f'{self.title or "Untitled"} - {self.author or "Unknown"}'
 
 
+# Longest technology name kept; technologies_used allows much longer tags
+TECHNOLOGY_NAME_LENGTH = 100
+
+
+def technology_key(name):
+    """
+    Case- and whitespace-insensitive lookup key for a technology name, e.g. 'pytorch'
+    """
+    return ' '.join(name.split()).lower()[:TECHNOLOGY_NAME_LENGTH].rstrip()
+
+
+def split_technologies(value):
+    """
+    Parse a comma-separated technologies string into display names, without
+    duplicates and cut to TECHNOLOGY_NAME_LENGTH characters
+    """
+    names = {}
+    for name in (value or '').split(','):
+        name = ' '.join(name.split())[:TECHNOLOGY_NAME_LENGTH].rstrip()
+        if name:
+            names.setdefault(technology_key(name), name)
+    return list(names.values())
+
+
+class TechnologyManager(models.Manager):
+
+    def resolve(self, names):
+        """
+        Return the Technology rows for ``names``, creating missing ones
+        """
+        keys = {technology_key(name): name for name in names}
+        existing = {technology.key: technology for technology in self.filter(key__in=keys)}
+        missing = [Technology(key=key, name=name) for key, name in keys.items() if key not in existing]
+        if missing:
+            # A concurrent save may have created some of them
+            self.bulk_create(missing, ignore_conflicts=True)
+            existing = {technology.key: technology for technology in self.filter(key__in=keys)}
+        return [existing[key] for key in keys]
+
+    def tagged_project_ids(self, names, match_any=False):
+        """
+        Subquery of the ids of projects tagged with every one (or any) of ``names``
+        """
+        keys = {technology_key(name) for name in names}
+        tagged = Project.technologies.through.objects.filter(technology__key__in=keys).values('project_id')
+        if match_any:
+            return tagged
+        return tagged.annotate(tags=models.Count('technology_id')).filter(tags=len(keys)).values('project_id')
+
+    def assign(self, projects):
+        """
+        Replace the technologies of ``projects`` with those in their technologies_used,
+        in bulk (for bulk_create()d projects, which skip Project.save())
+        """
+        names = {project.pk: split_technologies(project.technologies_used) for project in projects}
+        technologies = {
+            technology.key: technology
+            for technology in self.resolve({name for project_names in names.values() for name in project_names})
+        }
+        through = Project.technologies.through
+        through.objects.filter(project_id__in=names).delete()
+        through.objects.bulk_create([
+            through(project_id=project_id, technology_id=technologies[technology_key(name)].pk)
+            for project_id, project_names in names.items()
+            for name in project_names
+        ], batch_size=1000)
+
+
+class Technology(models.Model):
+    # Display name, as first entered
+    name = models.CharField(max_length=TECHNOLOGY_NAME_LENGTH)
+    # technology_key(name); unique, so tag lookups are an index seek
+    key = models.CharField(max_length=TECHNOLOGY_NAME_LENGTH, unique=True)
+
+    objects = TechnologyManager()
+
+    class Meta:
+        ordering = ['name']
+        verbose_name_plural = 'Technologies'
+
+    def save(self, *args, **kwargs):
+        self.key = technology_key(self.name)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.name
+
+
 class Project(models.Model):
     STATUS_CHOICES = [
         ('ongoing', 'Ongoing'),
@@ -102,11 +216,14 @@ class Project(models.Model):
     
     # Technologies
     technologies_used = models.CharField(max_length=500, null=True, blank=True, help_text="Comma-separated technologies")
+    # Kept in sync with technologies_used on save
+    technologies = models.ManyToManyField(Technology, blank=True, related_name='projects')
     tech_stack = models.TextField(null=True, blank=True, help_text="Detailed tech stack")
     
     # Images
     hero_section_image_link = models.URLField(null=True, blank=True)
     hero_section_image_file = models.ImageField(upload_to='projects/hero/', null=True, blank=True)
+    hero_section_image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     image_1_link = models.URLField(null=True, blank=True)  # add more if required
     
     # Links
@@ -132,6 +249,14 @@ class Project(models.Model):
     
     class Meta:
         ordering = ['-start_date']
+        indexes = [
+            models.Index(fields=['-start_date', '-id'], name='project_start_id_idx'),
+            models.Index(fields=['status', '-start_date'], name='project_status_start_idx'),
+            models.Index(fields=['name'], name='project_name_idx'),
+            models.Index(fields=['-end_date'], name='project_end_idx'),
+            models.Index(fields=['-created_at'], name='project_created_idx'),
+            models.Index(fields=['updated_at'], name='project_updated_idx'),
+        ]
         verbose_name = 'Project'
         verbose_name_plural = 'Projects'
     
@@ -139,7 +264,60 @@ class Project(models.Model):
         if self.name and not self.slug:
             self.slug = slugify(self.name)
         super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'technologies_used' in update_fields:
+            self.technologies.set(Technology.objects.resolve(split_technologies(self.technologies_used)))
     
     def __str__(self):
         return f'{self.name or "Unnamed Project"} - {self.status or "Unknown"}'
 
+
+
+class Job(models.Model):
+    """
+    A unit of background work, run by ``manage.py run_worker`` (see main/jobs.py)
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    # Name the job function was registered under
+    name = models.CharField(max_length=100)
+    args = models.JSONField(default=list, blank=True)
+    # At most one queued job per key; enqueueing a duplicate returns the queued one
+    dedupe_key = models.CharField(max_length=200, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    # Not claimed before this time; pushed back after each failed attempt
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=200, null=True, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['run_at', 'id']
+        indexes = [
+            # Claiming: the oldest due queued job
+            models.Index(fields=['run_at', 'id'], name='job_queued_idx', condition=models.Q(status='queued')),
+            # Requeueing jobs whose worker died
+            models.Index(fields=['locked_at'], name='job_running_idx', condition=models.Q(status='running')),
+            # Pruning finished jobs
+            models.Index(fields=['finished_at'], name='job_done_idx', condition=models.Q(status='done')),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'], condition=models.Q(status='queued'), name='job_queued_dedupe_key'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk} ({self.status})'
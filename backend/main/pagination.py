@@ -0,0 +1,157 @@
+"""
+Opt-in keyset (cursor) pagination.
+
+Page-number pagination stays the default. On viewsets that set
+``keyset_field``, ``?pagination=cursor`` (or any ``?cursor=``) switches to
+keyset mode: rows are ordered by that field descending with ``id`` as the tie-breaker, and each page
+is a range query that starts where the previous one stopped. There is no
+COUNT(*) and no OFFSET, so page N costs the same as page 1. Rows whose
+``keyset_field`` is NULL come last, ordered by id; that part of the walk
+uses its own query so both stay index range scans.
+"""
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import F, Q, prefetch_related_objects
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page numbers by default, keyset pages on request
+    """
+    mode_query_param = 'pagination'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset_field = getattr(view, 'keyset_field', None)
+        self.keyset = self.keyset_field is not None and self.use_keyset(request)
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        if request.query_params.get('ordering'):
+            raise ValidationError({'ordering': 'Cursor pagination only supports the default ordering.'})
+        # Ranked search results are ordered by relevance, which the cursor cannot follow
+        query = queryset.query
+        if 'search_rank' in query.annotations or 'search_rank' in query.extra:
+            raise ValidationError({'search': 'Cursor pagination cannot page through ranked search results.'})
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position = self.decode_cursor(request, queryset.model._meta.get_field(self.keyset_field))
+        forward = position is None or position['d'] == 'next'
+
+        # Prefetch once for the whole page, not once per segment
+        lookups = queryset._prefetch_related_lookups
+        queryset = queryset.prefetch_related(None)
+        rows = []
+        for segment in self.segments(queryset, position, forward):
+            rows.extend(segment[:self.page_size + 1 - len(rows)])
+            if len(rows) > self.page_size:
+                break
+        has_more = len(rows) > self.page_size
+        page = rows[:self.page_size]
+        prefetch_related_objects(page, *lookups)
+
+        if forward:
+            self.next_position = self.position(page[-1]) if has_more else None
+            self.previous_position = self.position(page[0]) if position and page else None
+        else:
+            page.reverse()
+            self.previous_position = self.position(page[0]) if has_more else None
+            self.next_position = self.position(page[-1]) if page else None
+        return page
+
+    def use_keyset(self, request):
+        return (request.query_params.get(self.mode_query_param) == 'cursor'
+                or self.cursor_query_param in request.query_params)
+
+    def segments(self, queryset, position, forward):
+        """
+        Querysets that together yield the rows after (or before) ``position``, nearest first
+        """
+        field = self.keyset_field
+        not_null = queryset.filter(**{f'{field}__isnull': False})
+        null = queryset.filter(**{f'{field}__isnull': True})
+        if forward:
+            not_null = not_null.order_by(F(field).desc(), '-id')
+            null = null.order_by('-id')
+            if position is None:
+                return [not_null, null]
+            if position['v'] is None:
+                return [null.filter(id__lt=position['id'])]
+            value = position['v']
+            return [
+                not_null.filter(Q(**{f'{field}__lte': value}),
+                                Q(**{f'{field}__lt': value}) | Q(id__lt=position['id'])),
+                null,
+            ]
+
+        not_null = not_null.order_by(F(field).asc(), 'id')
+        null = null.order_by('id')
+        if position['v'] is None:
+            return [null.filter(id__gt=position['id']), not_null]
+        value = position['v']
+        return [
+            not_null.filter(Q(**{f'{field}__gte': value}),
+                            Q(**{f'{field}__gt': value}) | Q(id__gt=position['id'])),
+        ]
+
+    def position(self, obj):
+        return {'v': getattr(obj, self.keyset_field), 'id': obj.pk}
+
+    def encode_cursor(self, position, direction):
+        value = position['v']
+        payload = {'v': value.isoformat() if value is not None else None, 'id': position['id'], 'd': direction}
+        return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+
+    def decode_cursor(self, request, field):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            position = {
+                'v': field.to_python(payload['v']) if payload['v'] is not None else None,
+                'id': int(payload['id']),
+                'd': payload['d'],
+            }
+        except (TypeError, ValueError, KeyError, binascii.Error, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if position['d'] not in ('next', 'prev'):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def get_link(self, position, direction):
+        if position is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        url = replace_query_param(url, self.mode_query_param, 'cursor')
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position, direction))
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        return self.get_link(self.next_position, 'next')
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        return self.get_link(self.previous_position, 'prev')
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
@@ -0,0 +1,85 @@
+"""
+Extra response formats for the API, and the JSON encoder they share.
+
+``encode()`` produces the bytes DRF's JSONRenderer does with the default
+settings (compact, UTF-8, U+2028 and U+2029 escaped) but encodes with
+orjson: one pass in C straight to bytes, with dicts, lists, strings,
+numbers, datetimes, dates, times and UUIDs handled natively. Anything else
+(decimals, lazy translation strings, querysets, ...) goes through DRF's
+encoder. Values orjson refuses, such as integers wider than 64 bits, are
+encoded with the standard library instead.
+
+Floats, of which the API has only search ranks, keep their value but may
+be spelled differently: orjson writes ``1e-5`` as ``0.00001`` and ``1e16``
+as ``1e16`` where the standard library writes ``1e-05`` and ``1e+16``.
+"""
+import json
+
+import orjson
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+_encoder = encoders.JSONEncoder()
+
+
+def _default(obj):
+    return _encoder.default(obj)
+
+
+def _escape(content):
+    # JSON allows these two unescaped; JavaScript string literals do not
+    if b'\xe2\x80\xa8' in content or b'\xe2\x80\xa9' in content:
+        content = content.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+    return content
+
+
+def encode(data):
+    """
+    Encode ``data`` the way DRF's JSONRenderer does with the default settings, as bytes
+    """
+    try:
+        return _escape(orjson.dumps(data, default=_default, option=OPTIONS))
+    except orjson.JSONEncodeError:
+        content = json.dumps(data, cls=encoders.JSONEncoder, ensure_ascii=False, separators=(',', ':'))
+        return _escape(content.encode('utf-8'))
+
+
+def dumps(data):
+    """
+    ``encode()`` as a string
+    """
+    return encode(data).decode('utf-8')
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+    """
+    JSONRenderer that encodes with ``encode()``
+
+    Responses asking for indentation, and projects that turn off
+    UNICODE_JSON or COMPACT_JSON, get the standard library's output.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        return encode(data)
+
+
+class NDJSONRenderer(renderers.BaseRenderer):
+    """
+    Newline-delimited JSON: one object per line
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        return b''.join(encode(row) + b'\n' for row in rows)
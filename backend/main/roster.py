@@ -0,0 +1,75 @@
+"""
+Precomputed team roster for the Team page.
+
+The roster is every member in ``Member.Meta.ordering``, serialized once,
+plus the POR holder, active and per-batch groups as lists of member ids.
+It is stored in the cache under the current Member version, so any member
+save or delete makes the next read rebuild it; the signal handlers also
+queue a ``roster.refresh`` job that rebuilds it in the background, so
+readers rarely pay for it.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache import KEY_PREFIX, get_versions
+from .jobs import register
+from .models import Member
+from .routers import primary_reads
+from .serializers import MemberSerializer
+
+# Superseded snapshots are never read again; let them age out
+SNAPSHOT_TIMEOUT = 24 * 60 * 60
+
+
+def _snapshot_key(version):
+    return f'{KEY_PREFIX}:roster:{version}'
+
+
+def build_roster():
+    members = list(Member.objects.all())
+    batches = {}
+    for member in members:
+        if member.batch:
+            batches.setdefault(member.batch, []).append(member.pk)
+    return {
+        'count': len(members),
+        # No request, so uploaded photos are site-relative /media/ paths
+        'members': MemberSerializer(members, many=True).data,
+        'por_holders': [member.pk for member in members if member.is_por_holder],
+        'active': [member.pk for member in members if member.is_active],
+        # Newest batch first
+        'batches': [
+            {'batch': batch, 'members': batches[batch]}
+            for batch in sorted(batches, reverse=True)
+        ],
+    }
+
+
+def get_roster():
+    """
+    Return the roster snapshot as {'version': ..., 'data': ...}
+    """
+    version = get_versions([Member])[0]
+    if not settings.API_CACHE_ENABLED:
+        return {'version': version, 'data': build_roster()}
+    snapshot = cache.get(_snapshot_key(version))
+    if snapshot is None:
+        snapshot = _store(version)
+    return snapshot
+
+
+def _store(version):
+    # Cached for a day, so never from a replica that may miss the latest save
+    with primary_reads():
+        snapshot = {'version': version, 'data': build_roster()}
+    cache.set(_snapshot_key(version), snapshot, SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+@register('roster.refresh')
+def refresh_roster():
+    """
+    Rebuild the snapshot whether or not one is cached for the current version
+    """
+    if settings.API_CACHE_ENABLED:
+        _store(get_versions([Member])[0])
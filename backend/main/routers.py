@@ -0,0 +1,144 @@
+"""
+Read replica routing.
+
+With DATABASE_REPLICA_URLS set, settings.py adds a database per replica
+(``replica_0``, ``replica_1``, ...), ``ReplicaRouter`` and
+``ReplicaRoutingMiddleware`` (main/middleware.py). The reads of a GET,
+HEAD or OPTIONS request then go to one replica for the whole request,
+each request taking the next replica in turn. Everything else reads from
+``default``, so a client always sees its own writes:
+
+- requests with another method, and the rest of a request once it has written
+- requests from a client that wrote in the last DATABASE_REPLICA_PIN_SECONDS
+- reads inside a transaction
+- work outside a request: management commands, jobs, the view counter,
+  and streamed export bodies, which are read after the view returns
+- blocks wrapped in ``primary_reads()``, e.g. building the roster and stats
+  snapshots, which are cached for longer than a replica may lag
+
+All writes go to ``default``, and only ``default`` is migrated. A replica
+that cannot be connected to is skipped for DATABASE_REPLICA_RETRY_SECONDS;
+with none left, reads go to ``default``. Django's connection health checks
+run as each request starts, so a replica that went away is noticed by the
+next request. Replicas lag behind the primary, so responses built from one
+are cached for at most DATABASE_REPLICA_CACHE_TIMEOUT seconds (see
+main/cache.py).
+
+To try it locally, copy db.sqlite3 to replica.sqlite3 and start the server
+with DATABASE_REPLICA_URLS=sqlite:///replica.sqlite3 (relative to the
+working directory). Nothing copies writes to the copy, so changes made in
+the admin show in the API only while the admin's browser is pinned.
+"""
+import contextvars
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+# The routing of the request being served: {'replica': alias or None, 'pinned': bool, 'wrote': bool}
+_state = contextvars.ContextVar('replica_routing', default=None)
+
+_turn = itertools.count()
+# alias -> time.monotonic() until which it is not tried again
+_down_until = {}
+
+
+@contextmanager
+def replica_reads(pinned=False):
+    """
+    Route the reads in the block to a replica, unless ``pinned`` to the primary
+
+    Yields the routing state; its ``wrote`` is True once the block has written.
+    """
+    state = {'replica': None if pinned else choose_replica(), 'pinned': pinned, 'wrote': False}
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """
+    Route the reads in the block to the primary, for data cached for longer
+    than a replica may lag, such as the roster and stats snapshots
+    """
+    with replica_reads(pinned=True):
+        yield
+
+
+def choose_replica():
+    """
+    Return the next replica that accepts connections, or None
+    """
+    replicas = settings.DATABASE_REPLICAS
+    if not replicas:
+        return None
+    start = next(_turn)
+    for offset in range(len(replicas)):
+        alias = replicas[(start + offset) % len(replicas)]
+        if _down_until.get(alias, 0) > time.monotonic():
+            continue
+        if _healthy(alias):
+            _down_until.pop(alias, None)
+            return alias
+        logger.warning('Replica %s is unreachable; reading from the others for %ss',
+                       alias, settings.DATABASE_REPLICA_RETRY_SECONDS)
+        _down_until[alias] = time.monotonic() + settings.DATABASE_REPLICA_RETRY_SECONDS
+    return None
+
+
+def _healthy(alias):
+    # Connects if needed; an open connection was checked when the request started
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError:
+        return False
+    return True
+
+
+def reading_replica():
+    """
+    The replica the current request reads from, or None
+    """
+    state = _state.get()
+    if state is None or state['wrote'] or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return None
+    return state['replica']
+
+
+def pinned_to_primary():
+    """
+    Whether the current request must see the client's own recent writes
+    """
+    state = _state.get()
+    return state is not None and (state['pinned'] or state['wrote'])
+
+
+class ReplicaRouter:
+    """
+    Send request reads to ``reading_replica()`` and everything else to ``default``
+    """
+
+    def db_for_read(self, model, **hints):
+        return reading_replica() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state['wrote'] = True
+        # Never the database an instance was read from: that may be a replica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every database holds the same rows
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
@@ -0,0 +1,253 @@
+"""
+Ranked full-text search over blog posts.
+
+Postgres keeps a weighted ``tsvector`` in a generated ``search_vector``
+column on main_blogpost with a GIN index on it; SQLite keeps an external
+content FTS5 table, ``main_blogpost_fts``, in sync through triggers. Either
+way the index is maintained by the database on every insert/update/delete,
+including ``bulk_create()`` and ``update()``. Weights, highest first:
+title, small description, author, content.
+
+``search_snippet`` is HTML-escaped text with the matches wrapped in
+``<mark>`` tags, safe to insert as HTML: the database highlights with
+private-use placeholder characters, escapes the result, then turns the
+placeholders into tags.
+
+On any other database (or an SQLite build without FTS5) blog search falls
+back to DRF's ``icontains`` SearchFilter.
+"""
+import re
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.db.models import BooleanField, FloatField, TextField
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+SNIPPET_START = '<mark>'
+SNIPPET_END = '</mark>'
+# What the database highlights with before escaping; blog content never holds them
+_PLACEHOLDER_START = '\ue000'
+_PLACEHOLDER_END = '\ue001'
+# In this order: '&' first, so the other entities are not escaped twice
+_ESCAPES = (('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;'), ('"', '&quot;'), ("'", '&#x27;'))
+
+BLOG_TABLE = 'main_blogpost'
+FTS_TABLE = 'main_blogpost_fts'
+FTS_COLUMNS = ('title', 'small_description', 'author', 'blog_content')
+
+POSTGRES_INDEX_SQL = [
+    f"""
+    ALTER TABLE {BLOG_TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(small_description, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(author, '')), 'C') ||
+        setweight(to_tsvector('english', coalesce(blog_content, '')), 'D')
+    ) STORED
+    """,
+    f'CREATE INDEX IF NOT EXISTS {BLOG_TABLE}_search_vector_gin ON {BLOG_TABLE} USING GIN (search_vector)',
+]
+POSTGRES_DROP_SQL = [
+    f'DROP INDEX IF EXISTS {BLOG_TABLE}_search_vector_gin',
+    f'ALTER TABLE {BLOG_TABLE} DROP COLUMN IF EXISTS search_vector',
+]
+
+_fts_columns = ', '.join(FTS_COLUMNS)
+_new_values = ', '.join(f'new.{column}' for column in FTS_COLUMNS)
+_old_values = ', '.join(f'old.{column}' for column in FTS_COLUMNS)
+SQLITE_TABLE_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"{_fts_columns}, content='{BLOG_TABLE}', content_rowid='id', tokenize='porter unicode61')"
+)
+SQLITE_TRIGGERS = {
+    f'{FTS_TABLE}_ai': (
+        f'AFTER INSERT ON {BLOG_TABLE} BEGIN '
+        f'INSERT INTO {FTS_TABLE}(rowid, {_fts_columns}) VALUES (new.id, {_new_values}); END'
+    ),
+    f'{FTS_TABLE}_ad': (
+        f'AFTER DELETE ON {BLOG_TABLE} BEGIN '
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_fts_columns}) VALUES ('delete', old.id, {_old_values}); END"
+    ),
+    # Only indexed columns, so view counter flushes do not reindex posts
+    f'{FTS_TABLE}_au': (
+        f'AFTER UPDATE OF {_fts_columns} ON {BLOG_TABLE} BEGIN '
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_fts_columns}) VALUES ('delete', old.id, {_old_values}); "
+        f'INSERT INTO {FTS_TABLE}(rowid, {_fts_columns}) VALUES (new.id, {_new_values}); END'
+    ),
+}
+
+
+def install_search_index(connection):
+    """
+    Create the full-text index for ``connection`` if it is missing
+
+    Safe to call repeatedly. On SQLite, Django rebuilds a table when some
+    columns are altered, which drops its triggers, so this is also run
+    after every migrate (see MainConfig.ready) and rebuilds the FTS table
+    whenever a trigger had to be recreated.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            for sql in POSTGRES_INDEX_SQL:
+                cursor.execute(sql)
+    elif connection.vendor == 'sqlite' and sqlite_has_fts5(connection):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s", [BLOG_TABLE]
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+            cursor.execute(SQLITE_TABLE_SQL)
+            missing = [name for name in SQLITE_TRIGGERS if name not in existing]
+            for name in missing:
+                cursor.execute(f'CREATE TRIGGER {name} {SQLITE_TRIGGERS[name]}')
+            if missing:
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def uninstall_search_index(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for sql in POSTGRES_DROP_SQL:
+                cursor.execute(sql)
+        elif connection.vendor == 'sqlite':
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def sqlite_has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        if cursor.fetchone()[0]:
+            return True
+        # Builds can also load FTS5 without the compile option being reported
+        try:
+            cursor.execute('CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)')
+            cursor.execute('DROP TABLE temp.fts5_probe')
+        except Exception:
+            return False
+        return True
+
+
+def _escaped_snippet(sql):
+    """
+    SQL for the snippet ``sql``, made with the placeholders, escaped and with ``<mark>`` tags
+    """
+    for char, entity in _ESCAPES + ((_PLACEHOLDER_START, SNIPPET_START), (_PLACEHOLDER_END, SNIPPET_END)):
+        literal = char.replace("'", "''")
+        sql = f"replace({sql}, '{literal}', '{entity}')"
+    return sql
+
+
+class PostgresSearchBackend:
+    query_sql = "websearch_to_tsquery('english', %s)"
+
+    def search(self, queryset, query):
+        column = f'"{BLOG_TABLE}"."search_vector"'
+        return queryset.filter(
+            RawSQL(f'{column} @@ {self.query_sql}', [query], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(f'ts_rank({column}, {self.query_sql})', [query], output_field=FloatField()),
+            search_snippet=RawSQL(
+                _escaped_snippet(
+                    f"ts_headline('english', concat_ws(' ', \"{BLOG_TABLE}\".\"small_description\", "
+                    f"\"{BLOG_TABLE}\".\"blog_content\"), {self.query_sql}, "
+                    f"'StartSel={_PLACEHOLDER_START}, StopSel={_PLACEHOLDER_END}, "
+                    f"MaxWords=35, MinWords=15, MaxFragments=2')"
+                ),
+                [query],
+                output_field=TextField(),
+            ),
+        )
+
+
+class SQLiteSearchBackend:
+    # bm25() weights, in FTS_COLUMNS order
+    weights = (10.0, 4.0, 2.0, 1.0)
+
+    def search(self, queryset, query):
+        match = self.match_expression(query)
+        if match is None:
+            return queryset.none()
+        weights = ', '.join(str(weight) for weight in self.weights)
+        # The ORM cannot join a virtual table, and bm25()/snippet() only work
+        # in the query that runs the MATCH, so join the FTS table with extra()
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = "{BLOG_TABLE}"."id"', f'{FTS_TABLE} MATCH %s'],
+            params=[match],
+            select={
+                # bm25() is lower-is-better, so negate it to sort like ts_rank
+                'search_rank': f'-bm25({FTS_TABLE}, {weights})',
+                # Column -1 lets FTS5 pick the best-matching column
+                'search_snippet': _escaped_snippet(
+                    f"snippet({FTS_TABLE}, -1, '{_PLACEHOLDER_START}', '{_PLACEHOLDER_END}', '…', 32)"
+                ),
+            },
+        )
+
+    def match_expression(self, query):
+        """
+        Turn free text into an FTS5 query: every word must match, the last as a prefix
+        """
+        words = re.findall(r'\w+', query)
+        if not words:
+            return None
+        terms = [f'"{word}"' for word in words]
+        terms[-1] += '*'
+        return ' '.join(terms)
+
+
+_backends = {}
+
+
+def get_search_backend(using):
+    """
+    Return the full-text backend for database alias ``using``, or None
+    """
+    if using not in _backends:
+        connection = connections[using]
+        backend = None
+        if connection.vendor == 'postgresql':
+            backend = PostgresSearchBackend()
+        elif connection.vendor == 'sqlite' and sqlite_has_fts5(connection):
+            backend = SQLiteSearchBackend()
+        _backends[using] = backend
+    return _backends[using]
+
+
+async def aget_search_backend(using):
+    """
+    get_search_backend() for async views; only the first call per database queries it
+    """
+    if using in _backends:
+        return _backends[using]
+    return await sync_to_async(get_search_backend)(using)
+
+
+class BlogSearchFilter(filters.SearchFilter):
+    """
+    ?search= for blog posts, ranked by relevance with highlighted snippets
+
+    Results carry ``search_rank`` and ``search_snippet``. They are ordered by
+    rank unless the request also asks for an explicit ?ordering=.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        backend = get_search_backend(queryset.db)
+        if backend is None:
+            return super().filter_queryset(request, queryset, view)
+
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        queryset = backend.search(queryset, ' '.join(terms))
+        if self._is_ranked(queryset) and not request.query_params.get(
+                filters.OrderingFilter.ordering_param):
+            queryset = queryset.order_by('-search_rank', '-date_published', '-id')
+        return queryset
+
+    def _is_ranked(self, queryset):
+        query = queryset.query
+        return 'search_rank' in query.annotations or 'search_rank' in query.extra
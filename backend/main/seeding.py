@@ -0,0 +1,235 @@
+"""
+Synthetic content for sample data and benchmarks
+"""
+import random
+from datetime import timedelta
+
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .models import BlogPost, Member, Project, Technology
+
+TOPICS = [
+    'neural networks', 'transformers', 'reinforcement learning', 'computer vision',
+    'natural language processing', 'generative models', 'diffusion models', 'graph neural networks',
+    'optimization', 'interpretability', 'robotics', 'speech recognition', 'recommender systems',
+    'federated learning', 'quantization', 'retrieval augmented generation',
+]
+VOCABULARY = (
+    'model data training loss gradient layer attention embedding token dataset batch epoch '
+    'accuracy inference network weights bias feature label prediction benchmark evaluation '
+    'pipeline deployment latency throughput memory GPU kernel tensor matrix vector sampling '
+    'distribution probability regularization dropout convolution pooling encoder decoder '
+    'transformer sequence context window prompt fine-tuning pretraining objective reward policy '
+    'agent environment exploration baseline experiment ablation result figure table paper '
+    'club workshop session project team research open source community learning'
+).split()
+
+
+TECHNOLOGIES = [
+    'Python', 'PyTorch', 'TensorFlow', 'JAX', 'scikit-learn', 'OpenCV', 'CUDA', 'React', 'Django',
+    'FastAPI', 'LangChain', 'Hugging Face', 'ONNX', 'Docker', 'Kubernetes', 'PostgreSQL', 'C++',
+]
+
+DESIGNATIONS = ['Member', 'Member', 'Member', 'Coordinator', 'Core Team', 'Technical Lead', 'Design Lead']
+FIRST_NAMES = [
+    'Aarav', 'Aditi', 'Arjun', 'Diya', 'Ishaan', 'Kavya', 'Meera', 'Nikhil', 'Priya', 'Rahul',
+    'Riya', 'Rohan', 'Saanvi', 'Siddharth', 'Tanvi', 'Varun', 'Vihaan', 'Zara',
+]
+LAST_NAMES = ['Agarwal', 'Bose', 'Gupta', 'Iyer', 'Jain', 'Kapoor', 'Mehta', 'Nair', 'Rao', 'Shah', 'Verma']
+
+# Paragraphs that generated articles are assembled from
+PARAGRAPH_POOL_SIZE = 4096
+_paragraphs = None
+
+
+def words(rng, count):
+    return ' '.join(rng.choices(VOCABULARY, k=count))
+
+
+def _paragraph_pool():
+    # Built once from a fixed seed; articles differ in which paragraphs they use
+    global _paragraphs
+    if _paragraphs is None:
+        rng = random.Random(0)
+        _paragraphs = []
+        for _ in range(PARAGRAPH_POOL_SIZE):
+            size = rng.randint(40, 120)
+            _paragraphs.append((words(rng, size).capitalize() + '.', size))
+    return _paragraphs
+
+
+def article(rng, word_count):
+    """
+    Markdown-ish article of roughly ``word_count`` words
+    """
+    pool = _paragraph_pool()
+    paragraphs = []
+    remaining = word_count
+    while remaining > 0:
+        text, size = rng.choice(pool)
+        paragraphs.append(text)
+        remaining -= size
+        if rng.random() < 0.2:
+            paragraphs.append(f'## {words(rng, 3).title()}')
+    return '\n\n'.join(paragraphs)
+
+
+def article_length(rng):
+    """
+    Word count of a blog post: log-normal, median ~700 words, long tail
+    """
+    return max(50, min(6000, int(rng.lognormvariate(6.55, 0.6))))
+
+
+def build_members(rng, count, start=0):
+    """
+    Return ``count`` unsaved Member instances
+    """
+    today = timezone.now().date()
+    members = []
+    for i in range(start, start + count):
+        name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i + 1}'
+        batch = rng.randint(2019, 2025)
+        members.append(Member(
+            name=name,
+            email=f'{slugify(name)}@example.com',
+            bio=f'{words(rng, rng.randint(15, 40)).capitalize()}.',
+            batch=str(batch),
+            designation=rng.choice(DESIGNATIONS),
+            is_por_holder=rng.random() < 0.1,
+            is_active=batch >= 2022,
+            github_link=f'https://github.com/{slugify(name)}',
+            joined_date=today - timedelta(days=rng.randint(0, 365 * 5)),
+        ))
+    return members
+
+
+def build_authorships(rng, post_ids, member_ids):
+    """
+    Return unsaved BlogPost.author_members through rows, one to three authors per post
+    """
+    through = BlogPost.author_members.through
+    return [
+        through(blogpost_id=post_id, member_id=member_id)
+        for post_id in post_ids
+        for member_id in rng.sample(member_ids, min(len(member_ids), rng.randint(1, 3)))
+    ]
+
+
+def build_blog_posts(rng, count, start=0):
+    """
+    Return ``count`` unsaved BlogPost instances with unique slugs
+    """
+    now = timezone.now()
+    posts = []
+    for i in range(start, start + count):
+        topic = rng.choice(TOPICS)
+        title = f'{topic.title()}: {words(rng, rng.randint(2, 6)).title()}'
+        posts.append(BlogPost(
+            title=title,
+            # The index suffix keeps slugs unique however titles repeat
+            slug=f'{slugify(title)[:330]}-{i + 1}',
+            author=f'Author {rng.randint(1, 200)}',
+            date_published=now - timedelta(minutes=rng.randint(0, 60 * 24 * 365 * 3)),
+            blog_content=article(rng, article_length(rng)),
+            small_description=f'Notes on {topic}: {words(rng, rng.randint(10, 30))}.',
+            views_count=int(rng.paretovariate(1.2) * 10),
+            is_published=rng.random() > 0.05,
+        ))
+    return posts
+
+
+def build_projects(rng, count, start=0):
+    """
+    Return ``count`` unsaved Project instances with unique slugs
+    """
+    today = timezone.now().date()
+    projects = []
+    for i in range(start, start + count):
+        topic = rng.choice(TOPICS)
+        name = f'{topic.title()} {words(rng, rng.randint(1, 3)).title()}'
+        status = rng.choice(['ongoing', 'ongoing', 'completed', 'planned'])
+        start_date = today - timedelta(days=rng.randint(0, 365 * 3))
+        technologies = rng.sample(TECHNOLOGIES, rng.randint(2, 6))
+        projects.append(Project(
+            name=name,
+            slug=f'{slugify(name)[:280]}-{i + 1}',
+            short_description=f'{words(rng, rng.randint(12, 30)).capitalize()}.',
+            description=article(rng, rng.randint(150, 900)),
+            tagline=f'{topic.capitalize()} for {words(rng, 2)}',
+            technologies_used=','.join(technologies),
+            tech_stack=article(rng, rng.randint(40, 200)),
+            github_link=f'https://github.com/ai-club/{slugify(name)}-{i + 1}',
+            start_date=start_date,
+            end_date=start_date + timedelta(days=rng.randint(30, 200)) if status == 'completed' else None,
+            status=status,
+        ))
+    return projects
+
+
+def next_index(model):
+    """
+    Index to number new rows' slugs from so they match no existing slug
+
+    A generated slug ends in its row's index, which is never above the
+    row's own primary key, so indexes past the highest key are unused.
+    """
+    return model.objects.aggregate(top=Max('pk'))['top'] or 0
+
+
+def seed(rng, members, blogs, projects, batch_size=1000, progress=None):
+    """
+    Save ``members``, ``blogs`` and ``projects`` rows with authors and
+    technology tags; return the primary keys of everything created
+
+    Rows are built and inserted ``batch_size`` at a time, so memory stays
+    flat however many there are. Each kind of row draws from its own
+    random stream, so the same ``rng`` seed gives the same data whatever
+    the batch size. ``progress(kind, done, total)`` is called after each batch.
+    """
+    streams = {kind: random.Random(rng.random()) for kind in ('members', 'blogs', 'authors', 'projects')}
+    progress = progress or (lambda kind, done, total: None)
+    technologies = set(Technology.objects.values_list('pk', flat=True))
+    created = {'members': [], 'blogs': [], 'projects': []}
+
+    start = next_index(Member)
+    for offset in range(0, members, batch_size):
+        count = min(batch_size, members - offset)
+        rows = Member.objects.bulk_create(build_members(streams['members'], count, start + offset))
+        created['members'] += [member.pk for member in rows]
+        progress('members', offset + count, members)
+
+    start = next_index(BlogPost)
+    for offset in range(0, blogs, batch_size):
+        count = min(batch_size, blogs - offset)
+        rows = BlogPost.objects.bulk_create(build_blog_posts(streams['blogs'], count, start + offset))
+        post_ids = [post.pk for post in rows]
+        if created['members']:
+            BlogPost.author_members.through.objects.bulk_create(
+                build_authorships(streams['authors'], post_ids, created['members'])
+            )
+        created['blogs'] += post_ids
+        progress('blogs', offset + count, blogs)
+
+    start = next_index(Project)
+    for offset in range(0, projects, batch_size):
+        count = min(batch_size, projects - offset)
+        rows = Project.objects.bulk_create(build_projects(streams['projects'], count, start + offset))
+        Technology.objects.assign(rows)
+        created['projects'] += [project.pk for project in rows]
+        progress('projects', offset + count, projects)
+
+    created['technologies'] = set(Technology.objects.values_list('pk', flat=True)) - technologies
+    return created
+
+
+def unseed(created):
+    """
+    Delete the rows ``seed()`` created
+    """
+    BlogPost.objects.filter(pk__in=created['blogs']).delete()
+    Project.objects.filter(pk__in=created['projects']).delete()
+    Member.objects.filter(pk__in=created['members']).delete()
+    Technology.objects.filter(pk__in=created['technologies']).delete()
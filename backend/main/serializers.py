@@ -1,10 +1,41 @@
 from rest_framework import serializers
+from .images import rendition_urls
 from .models import Member, BlogPost, Project
 
-class MemberSerializer(serializers.ModelSerializer):
+
+class SparseFieldsetMixin:
+    """
+    Lets the caller trim the output: fields=[...] keeps only those fields,
+    omit=[...] drops those. Unknown names are ignored.
+    """
+    def __init__(self, *args, fields=None, omit=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in omit or ():
+            self.fields.pop(name, None)
+
+
+class RenditionsField(serializers.Field):
+    """
+    Resized versions of an uploaded image: per-format URLs by width and a srcset
+    """
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        return rendition_urls(value, request.build_absolute_uri if request is not None else None)
+
+
+class MemberSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for the Member model
     """
+    photo_renditions = RenditionsField()
+
     class Meta:
         model = Member
         fields = '__all__'
@@ -14,35 +45,73 @@ class MemberBasicSerializer(serializers.ModelSerializer):
     """
     Simplified Member serializer for nested relationships
     """
+    photo_renditions = RenditionsField()
+
     class Meta:
         model = Member
-        fields = ['id', 'name', 'designation', 'photo_link', 'photo_file', 'github_link', 'linkedin_link']
+        fields = ['id', 'name', 'designation', 'photo_link', 'photo_file', 'photo_renditions',
+                  'github_link', 'linkedin_link']
 
 
-class BlogPostSerializer(serializers.ModelSerializer):
+class BlogPostSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for the BlogPost model
     """
     # Add member details when they are associated with a blog post
     author_members_details = MemberBasicSerializer(source='author_members', many=True, read_only=True)
+    # Only present on ?search= results
+    search_rank = serializers.FloatField(read_only=True)
+    search_snippet = serializers.CharField(read_only=True)
+    blog_image_renditions = RenditionsField()
+    thumbnail_renditions = RenditionsField()
     
     class Meta:
         model = BlogPost
         fields = ['id', 'title', 'slug', 'author', 'author_members', 'date_published', 
                  'date_created', 'date_modified', 'blog_content', 'small_description', 
-                 'blog_image_link', 'blog_image_file', 'thumbnail', 'linkedin_link', 
+                 'blog_image_link', 'blog_image_file', 'blog_image_renditions', 'thumbnail',
+                 'thumbnail_renditions', 'linkedin_link', 
                  'github_link', 'medium_link', 'other_links', 'views_count', 
-                 'is_published', 'author_members_details']
+                 'is_published', 'author_members_details', 'search_rank', 'search_snippet']
+
+
+class BlogPostCardSerializer(BlogPostSerializer):
+    """
+    BlogPost serializer for list pages: everything but the article body
+    """
+    class Meta(BlogPostSerializer.Meta):
+        fields = ['id', 'title', 'slug', 'author', 'author_members', 'date_published',
+                 'date_created', 'date_modified', 'small_description',
+                 'blog_image_link', 'blog_image_file', 'blog_image_renditions', 'thumbnail',
+                 'thumbnail_renditions', 'linkedin_link',
+                 'github_link', 'medium_link', 'views_count',
+                 'is_published', 'author_members_details', 'search_rank', 'search_snippet']
 
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for the Project model
     """
+    # Technology names, from the prefetched tags
+    technologies = serializers.SlugRelatedField(many=True, read_only=True, slug_field='name')
+    hero_section_image_renditions = RenditionsField()
+
     class Meta:
         model = Project
         fields = ['id', 'name', 'slug', 'short_description', 'description', 'tagline',
-                 'technologies_used', 'tech_stack', 'hero_section_image_link', 
-                 'hero_section_image_file', 'image_1_link', 'website_link', 'github_link', 
-                 'demo_link', 'documentation_link', 'video_link', 'start_date', 
-                 'end_date', 'status', 'created_at', 'updated_at']
\ No newline at end of file
+                 'technologies_used', 'technologies', 'tech_stack', 'hero_section_image_link', 
+                 'hero_section_image_file', 'hero_section_image_renditions', 'image_1_link',
+                 'website_link', 'github_link', 'demo_link', 'documentation_link', 'video_link', 'start_date', 
+                 'end_date', 'status', 'created_at', 'updated_at']
+
+
+class ProjectCardSerializer(ProjectSerializer):
+    """
+    Project serializer for list pages: no long description or tech stack
+    """
+    class Meta(ProjectSerializer.Meta):
+        fields = ['id', 'name', 'slug', 'short_description', 'tagline',
+                 'technologies_used', 'technologies', 'hero_section_image_link',
+                 'hero_section_image_file', 'hero_section_image_renditions', 'image_1_link',
+                 'website_link', 'github_link', 'demo_link', 'documentation_link', 'video_link', 'start_date',
+                 'end_date', 'status', 'created_at', 'updated_at']
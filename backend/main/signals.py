@@ -0,0 +1,125 @@
+"""
+Signal handlers that keep derived data in sync with the models
+"""
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_version
+from .images import IMAGE_FIELDS, queue_renditions
+from .jobs import enqueue
+from .models import BlogPost, Member, Project, Technology
+
+
+_batch = threading.local()
+
+
+@contextmanager
+def batched_changes():
+    """
+    Run the cache, roster, stats and API snapshot handlers once for the
+    whole block instead of once per row, for bulk loads and deletes
+
+    Yields the set of changed models; add those changed with bulk_create()
+    or update(), which send no signals.
+    """
+    changed = getattr(_batch, 'changed', None)
+    if changed is not None:
+        # Nested: the outermost block does the work
+        yield changed
+        return
+    changed = _batch.changed = set()
+    try:
+        yield changed
+    finally:
+        _batch.changed = None
+    if changed:
+        _invalidate(*changed)
+    if Member in changed:
+        enqueue('roster.refresh', dedupe_key='roster.refresh')
+    if changed & {Member, BlogPost, Project}:
+        enqueue('stats.refresh', dedupe_key='stats.refresh')
+    if changed and settings.API_SNAPSHOT_DIR:
+        enqueue('snapshots.render', dedupe_key='snapshots.render')
+
+
+def _batching(*models):
+    changed = getattr(_batch, 'changed', None)
+    if changed is None:
+        return False
+    changed.update(models)
+    return True
+
+
+def _invalidate(*models):
+    # Bump after commit so a concurrent request cannot cache pre-commit data
+    # under the new version
+    def bump():
+        for model in models:
+            bump_version(model)
+    transaction.on_commit(bump)
+
+
+@receiver([post_save, post_delete], sender=Member)
+@receiver([post_save, post_delete], sender=BlogPost)
+@receiver([post_save, post_delete], sender=Project)
+@receiver([post_save, post_delete], sender=Technology)
+def invalidate_api_cache(sender, **kwargs):
+    if not _batching(sender):
+        _invalidate(sender)
+
+
+@receiver(post_save, sender=Member)
+@receiver(post_save, sender=BlogPost)
+@receiver(post_save, sender=Project)
+def make_image_renditions(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Not for fixture loading, where the files may not exist yet
+    if raw or (update_fields is not None and not set(update_fields) & set(IMAGE_FIELDS[sender])):
+        return
+    queue_renditions(instance)
+
+
+@receiver([post_save, post_delete], sender=Member)
+def rebuild_team_roster(sender, **kwargs):
+    # Queued in the same transaction, so a worker only sees it after commit;
+    # under JOBS_ALWAYS_EAGER it runs after invalidate_api_cache's version bump
+    if not _batching(sender):
+        enqueue('roster.refresh', dedupe_key='roster.refresh')
+
+
+@receiver([post_save, post_delete], sender=Member)
+@receiver([post_save, post_delete], sender=BlogPost)
+@receiver([post_save, post_delete], sender=Project)
+def rebuild_site_stats(sender, **kwargs):
+    # After invalidate_api_cache, so the rebuilt snapshot is stored under the new versions
+    if not _batching(sender):
+        enqueue('stats.refresh', dedupe_key='stats.refresh')
+
+
+@receiver([post_save, post_delete], sender=Member)
+@receiver([post_save, post_delete], sender=BlogPost)
+@receiver([post_save, post_delete], sender=Project)
+@receiver([post_save, post_delete], sender=Technology)
+def render_api_snapshots(sender, instance, **kwargs):
+    # Queued in the transaction, so the job sees the committed rows (and, from
+    # the admin, the many-to-many changes saved after the row)
+    if not settings.API_SNAPSHOT_DIR or _batching(sender):
+        return
+    label = sender._meta.label_lower
+    enqueue('snapshots.render', label, instance.pk, dedupe_key=f'snapshots.render:{label}:{instance.pk}')
+
+
+@receiver(m2m_changed, sender=BlogPost.author_members.through)
+def invalidate_blog_authors(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and not _batching(BlogPost):
+        _invalidate(BlogPost)
+
+
+@receiver(m2m_changed, sender=Project.technologies.through)
+def invalidate_project_technologies(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and not _batching(Project):
+        _invalidate(Project)
@@ -0,0 +1,258 @@
+"""
+Pre-rendered API responses that nginx serves without reaching Django.
+
+The API is read-only and changes when someone edits in the admin, so its
+most requested responses are written out under API_SNAPSHOT_DIR: the
+first page of each list, the list actions (POR holders, active members,
+roster, ongoing and completed projects), /api/stats/, and every detail
+response, by id and, for blogs and projects, by slug. A response is
+stored as ``<path>/index.json`` beside a gzipped ``index.json.gz``, and
+nginx (nginx/nginx.conf) answers plain GETs from them with ``try_files``,
+passing everything else, and every miss, on to Django.
+
+Files hold the same bytes the API returns. They are written under a
+temporary name and renamed, and only when their content changed, so nginx
+never serves half a file and the ETag it makes from the file's mtime stays
+put while the data does. Slugs are symlinks to the id's directory.
+
+A save or delete queues a ``snapshots.render`` job (see main/signals.py)
+that rewrites the row's detail files, those of the rows embedding it, and
+the pages; ``manage.py render_api_snapshots`` rewrites everything and
+removes the files of rows that are gone. View counts change without
+signals, so ``run_worker`` also rewrites the pages every
+API_SNAPSHOT_REFRESH_INTERVAL seconds; detail files keep the count of
+their last render.
+"""
+import asyncio
+import gzip
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.conf import settings
+from django.test import RequestFactory
+from django.urls import resolve
+
+from .jobs import register
+from .models import Member, Technology
+from .renderers import encode
+
+FILE_NAME = 'index.json'
+
+# Responses that do not belong to a single row
+PAGES = (
+    '/api/members/',
+    '/api/members/por_holders/',
+    '/api/members/active/',
+    '/api/members/roster/',
+    '/api/blogs/',
+    '/api/projects/',
+    '/api/projects/ongoing/',
+    '/api/projects/completed/',
+    '/api/stats/',
+)
+
+# model: (resource, field) for rows whose detail responses embed another model's
+EMBEDDED_IN = {
+    Member: ('blogs', 'author_members'),
+    Technology: ('projects', 'technologies'),
+}
+
+
+def enabled():
+    return bool(settings.API_SNAPSHOT_DIR)
+
+
+def _root():
+    return Path(settings.API_SNAPSHOT_DIR)
+
+
+def _request(path):
+    base = urlsplit(settings.API_SNAPSHOT_BASE_URL)
+    # Serializers build absolute URLs (images, next page) from the request
+    return RequestFactory().get(path, HTTP_HOST=base.netloc, HTTP_ACCEPT='application/json',
+                                secure=base.scheme == 'https')
+
+
+def _resources():
+    """
+    {prefix: (viewset class, basename)} of the router's viewsets
+    """
+    from .urls import router
+    return {prefix: (viewset, basename) for prefix, viewset, basename in router.registry}
+
+
+def _viewset(prefix, action):
+    viewset_class, basename = _resources()[prefix]
+    viewset = viewset_class(action_map={'get': action}, basename=basename, detail=action == 'retrieve',
+                            format_kwarg=None, args=(), kwargs={})
+    viewset.request = viewset.initialize_request(_request(f'/api/{prefix}/'))
+    return viewset
+
+
+def _replace(path, content):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(content)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+
+
+def _write(directory, content):
+    """
+    Store ``content`` as ``directory/index.json`` and its gzipped copy; return whether it changed
+    """
+    path = directory / FILE_NAME
+    try:
+        if path.read_bytes() == content:
+            return False
+    except OSError:
+        pass
+    directory.mkdir(parents=True, exist_ok=True)
+    # The .gz first: once try_files finds the plain file, gzip_static finds its copy
+    _replace(path.with_name(FILE_NAME + '.gz'), gzip.compress(content, mtime=0))
+    _replace(path, content)
+    return True
+
+
+def _link(path, target):
+    if path.is_symlink() and os.readlink(path) == target:
+        return
+    tmp = path.with_name(f'.tmp-{os.getpid()}-{path.name}')
+    os.symlink(target, tmp)
+    os.replace(tmp, path)
+
+
+def _unlink_slugs(directory, slugs):
+    # Symlinks to the directories of the ids in ``slugs`` ({id: slug or None})
+    # under slugs those rows no longer have
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_symlink():
+                target = os.readlink(entry.path)
+                if target in slugs and entry.name != slugs[target]:
+                    os.unlink(entry.path)
+
+
+def _remove(directory):
+    if directory.is_symlink():
+        directory.unlink()
+    else:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def render_page(path):
+    """
+    Write the snapshot of ``path`` from its view; return whether the file changed
+    """
+    match = resolve(path)
+    view = match.func
+    if asyncio.iscoroutinefunction(view):
+        view = async_to_sync(view)
+    response = view(_request(path), *match.args, **match.kwargs)
+    if hasattr(response, 'render'):
+        response.render()
+    directory = _root() / path.strip('/')
+    if response.status_code != 200:
+        _remove(directory)
+        return False
+    return _write(directory, response.content)
+
+
+def render_pages():
+    """
+    Write every page snapshot; return how many changed
+    """
+    return sum(render_page(path) for path in PAGES)
+
+
+def render_details(prefix, pks=None):
+    """
+    Write the detail snapshots of the ``prefix`` rows (those in ``pks``, or all)
+
+    Returns (changed, names), names being every id and slug directory written.
+    """
+    viewset = _viewset(prefix, 'retrieve')
+    slug_field = getattr(viewset, 'slug_field', None)
+    # Slugs that would shadow a list route, e.g. /api/projects/ongoing/
+    reserved = {action.url_path for action in viewset.get_extra_actions() if not action.detail}
+    serializer = viewset.get_serializer()
+    queryset = viewset.get_queryset()
+    if pks is not None:
+        queryset = queryset.filter(pk__in=pks)
+
+    directory = _root() / 'api' / prefix
+    changed, slugs = 0, {}
+    # Prefetches run per chunk when an iterator is given a chunk_size
+    for instance in queryset.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE):
+        pk = str(instance.pk)
+        changed += _write(directory / pk, encode(serializer.to_representation(instance)))
+        slug = getattr(instance, slug_field) if slug_field else None
+        if slug and not slug.isdigit() and slug not in reserved:
+            _link(directory / slug, pk)
+            slugs[pk] = slug
+        else:
+            slugs[pk] = None
+    if pks is not None and slug_field and slugs:
+        _unlink_slugs(directory, slugs)
+    return changed, set(slugs) | {slug for slug in slugs.values() if slug}
+
+
+def render_all():
+    """
+    Write every snapshot and delete those of rows that are gone; return (changed, removed)
+    """
+    changed, removed = render_pages(), 0
+    pages = {path.strip('/').split('/')[-1] for path in PAGES}
+    for prefix in _resources():
+        rendered, names = render_details(prefix)
+        changed += rendered
+        directory = _root() / 'api' / prefix
+        if not directory.is_dir():
+            continue
+        keep = names | pages
+        with os.scandir(directory) as entries:
+            stale = [
+                entry.name for entry in entries
+                if entry.name not in keep and not entry.name.startswith('.') and (entry.is_symlink() or entry.is_dir())
+            ]
+        for name in stale:
+            _remove(directory / name)
+        removed += len(stale)
+    return changed, removed
+
+
+@register('snapshots.render', atomic=False)
+def render_changed(label=None, pk=None):
+    """
+    Rewrite the snapshots a change to the ``label`` row ``pk`` affects, or all of them
+    """
+    if not enabled():
+        return
+    if label is None:
+        render_all()
+        return
+    model = apps.get_model(label)
+    deleted = not model.objects.filter(pk=pk).exists()
+    for prefix, (viewset_class, _) in _resources().items():
+        if viewset_class.queryset.model is not model:
+            continue
+        directory = _root() / 'api' / prefix
+        if not deleted:
+            render_details(prefix, [pk])
+        elif directory.is_dir():
+            _remove(directory / str(pk))
+            _unlink_slugs(directory, {str(pk): None})
+    if model in EMBEDDED_IN:
+        prefix, field = EMBEDDED_IN[model]
+        if deleted:
+            # Its links went with it, so which rows embedded it is unknown
+            render_details(prefix)
+        else:
+            related = _resources()[prefix][0].queryset.model
+            render_details(prefix, list(related.objects.filter(**{field: pk}).values_list('pk', flat=True)))
+    render_pages()
@@ -0,0 +1,86 @@
+"""
+Compact list representations and sparse fieldsets for the API viewsets.
+
+List-style actions use the viewset's ``card_serializer_class`` unless the
+client asks for specific fields. ``?fields=a,b`` picks fields from the full
+serializer; ``?omit=a,b`` drops fields from whichever serializer applies.
+The queryset only loads the columns the chosen fields read, so unused
+TextFields never leave the database.
+"""
+import functools
+
+from django.core.exceptions import FieldDoesNotExist
+
+
+def _names(query_params, param):
+    if param not in query_params:
+        return None
+    return [name.strip() for value in query_params.getlist(param) for name in value.split(',') if name.strip()]
+
+
+class SparseFieldsMixin:
+    card_serializer_class = None
+    card_actions = ('list',)
+
+    def requested_fields(self):
+        return _names(self.request.query_params, 'fields')
+
+    def omitted_fields(self):
+        return _names(self.request.query_params, 'omit')
+
+    def get_serializer_class(self):
+        if (self.card_serializer_class is not None and self.action in self.card_actions
+                and self.requested_fields() is None):
+            return self.card_serializer_class
+        return super().get_serializer_class()
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.requested_fields())
+        kwargs.setdefault('omit', self.omitted_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        columns, relations = self.selected_columns(queryset.model)
+        if not relations:
+            # Nothing serialized needs the prefetched relations
+            queryset = queryset.prefetch_related(None)
+        return queryset.only(*columns)
+
+    def selected_columns(self, model):
+        """
+        Model fields read by the serializer that will be used for this request,
+        as (concrete field names, many-to-many field names)
+        """
+        fields, omit = self.requested_fields(), self.omitted_fields()
+        # Validators and keyset pagination read these from every object
+        always = tuple(filter(None, (getattr(self, 'last_modified_field', None),
+                                     getattr(self, 'keyset_field', None))))
+        always += tuple(getattr(self, 'etag_fields', ()))
+        return _columns(
+            model,
+            self.get_serializer_class(),
+            tuple(sorted(set(fields))) if fields is not None else None,
+            tuple(sorted(set(omit))) if omit is not None else None,
+            always,
+        )
+
+
+@functools.lru_cache(maxsize=256)
+def _columns(model, serializer_class, fields, omit, always):
+    serializer = serializer_class(fields=fields, omit=omit)
+    columns = {model._meta.pk.name, *always}
+    relations = set()
+    for field in serializer.fields.values():
+        if field.source == '*':
+            continue
+        try:
+            model_field = model._meta.get_field(field.source.split('.')[0])
+        except FieldDoesNotExist:
+            # Annotations such as search_rank
+            continue
+        if model_field.many_to_many:
+            relations.add(model_field.name)
+        elif model_field.concrete:
+            columns.add(model_field.name)
+    return sorted(columns), sorted(relations)
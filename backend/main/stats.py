@@ -0,0 +1,106 @@
+"""
+Precomputed site statistics and highlights for the landing and about pages.
+
+The snapshot holds the member, project and blog post counts (a handful of
+aggregate queries) and short lists of the latest and most viewed blog
+posts and the ongoing projects, serialized once. It is stored in the
+cache under the current versions of the models it is built from, so any
+change makes the next read rebuild it, and the signal handlers queue a
+``stats.refresh`` job that rebuilds it in the background first.
+
+View counts are written without signals (see main/counters.py), so the
+snapshot also expires after ``STATS_REFRESH_INTERVAL`` seconds, and
+``manage.py run_worker`` rebuilds it on that schedule so readers rarely
+pay for it.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Prefetch, Q, Sum, prefetch_related_objects
+
+from .cache import KEY_PREFIX, get_versions
+from .jobs import register
+from .models import BlogPost, Member, Project, Technology
+from .routers import primary_reads
+from .serializers import BlogPostCardSerializer, MemberBasicSerializer, ProjectCardSerializer
+
+# Models the snapshot is built from; projects embed their technologies
+DEPENDENCIES = (Member, BlogPost, Project, Technology)
+# Items in each highlights list
+HIGHLIGHTS = 6
+
+
+def _snapshot_key(versions):
+    return f'{KEY_PREFIX}:stats:snapshot:' + '-'.join(str(version) for version in versions)
+
+
+def build_stats():
+    members = Member.objects.aggregate(
+        total=Count('pk'),
+        active=Count('pk', filter=Q(is_active=True)),
+        por_holders=Count('pk', filter=Q(is_por_holder=True)),
+    )
+    projects = Project.objects.aggregate(
+        total=Count('pk'),
+        **{status: Count('pk', filter=Q(status=status)) for status, _ in Project.STATUS_CHOICES},
+    )
+    published = BlogPost.objects.filter(is_published=True)
+    blogs = published.aggregate(total=Count('pk'), views=Sum('views_count'))
+
+    latest = list(published.order_by('-date_published', '-id')[:HIGHLIGHTS])
+    most_viewed = list(published.order_by('-views_count', '-date_published', '-id')[:HIGHLIGHTS])
+    # One author query for both lists
+    prefetch_related_objects(
+        latest + most_viewed,
+        Prefetch('author_members', queryset=Member.objects.only(*MemberBasicSerializer.Meta.fields)),
+    )
+    ongoing = Project.objects.filter(status='ongoing').prefetch_related('technologies')[:HIGHLIGHTS]
+
+    # No request, so uploaded images are site-relative /media/ paths
+    return {
+        'members': members,
+        'projects': {
+            'total': projects.pop('total'),
+            'by_status': projects,
+        },
+        'blogs': {
+            'total': blogs['total'],
+            'views': blogs['views'] or 0,
+        },
+        'highlights': {
+            'latest_blogs': BlogPostCardSerializer(latest, many=True).data,
+            'most_viewed_blogs': BlogPostCardSerializer(most_viewed, many=True).data,
+            'ongoing_projects': ProjectCardSerializer(ongoing, many=True).data,
+        },
+    }
+
+
+def _store(versions):
+    # Cached past DATABASE_REPLICA_CACHE_TIMEOUT, so read from the primary
+    with primary_reads():
+        snapshot = {'built_at': time.time_ns(), 'data': build_stats()}
+    cache.set(_snapshot_key(versions), snapshot, settings.STATS_REFRESH_INTERVAL)
+    return snapshot
+
+
+def get_stats():
+    """
+    Return the stats snapshot as {'built_at': ..., 'data': ...}
+    """
+    if not settings.API_CACHE_ENABLED:
+        return {'built_at': time.time_ns(), 'data': build_stats()}
+    versions = get_versions(DEPENDENCIES)
+    snapshot = cache.get(_snapshot_key(versions))
+    if snapshot is None:
+        snapshot = _store(versions)
+    return snapshot
+
+
+@register('stats.refresh')
+def refresh_stats():
+    """
+    Rebuild the snapshot whether or not the current one has expired
+    """
+    if settings.API_CACHE_ENABLED:
+        _store(get_versions(DEPENDENCIES))
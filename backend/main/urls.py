@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from . import views
+from .async_views import async_read_view
 
 # Create a router and register our viewsets with it
 router = DefaultRouter()
@@ -8,7 +10,29 @@ router.register(r'members', views.MemberViewSet, basename='member')
 router.register(r'blogs', views.BlogPostViewSet, basename='blog')
 router.register(r'projects', views.ProjectViewSet, basename='project')
 
+
+
+def async_urlpatterns():
+    """
+    Routes for the async read path (see main/async_views.py), ahead of the router's
+    """
+    patterns = []
+    for prefix, viewset, basename in router.registry:
+        patterns += [
+            path(f'api/{prefix}/', async_read_view(viewset, basename)),
+            path(f'api/{prefix}/<int:pk>/', async_read_view(viewset, basename, detail=True)),
+        ]
+    return patterns
+
+
 urlpatterns = [
+    path('api/stats/', views.stats, name='stats'),
     path('api/', include(router.urls)),
     path('api-auth/', include('rest_framework.urls', namespace='rest_framework')),
-]
\ No newline at end of file
+    # Not proxied by nginx; scraped from inside the container network
+    path('metrics', views.metrics, name='metrics'),
+]
+
+# Under ASGI, list and detail GETs go to the async views
+if settings.API_ASYNC_VIEWS:
+    urlpatterns = async_urlpatterns() + urlpatterns
\ No newline at end of file
@@ -0,0 +1,367 @@
+"""
+List responses built from ``.values_list()`` rows instead of model instances.
+
+A ModelSerializer turns every row into a model instance and then runs
+get_attribute() and to_representation() on a field object per column, so
+a page of rows costs a great deal of Python before anything is encoded.
+The API is read-only, so for list-style actions ``ValuesListMixin``
+compiles the serializer the request would use (card or full, after
+?fields= and ?omit=) into a ``Plan`` once per process: the columns to
+select and, per field, a transform. Strings, numbers and booleans need
+none, and file URLs are bound to the request once per response. Rows are
+read as tuples, and each many-to-many relation with one query on its
+through table, in the related model's default ordering as the viewsets'
+prefetches give it.
+
+The output is the serializer's own, so responses, cache entries and
+snapshots do not change. A serializer with a field the plan cannot
+reproduce exactly (a method field, a dotted source, a foreign key, ...)
+is used as before, as it is for detail responses, keyset pages and the
+async views. API_VALUES_SERIALIZERS=False turns the fast path off.
+"""
+import functools
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.core.files.storage import FileSystemStorage
+from django.db.models import QuerySet
+from django.utils.encoding import filepath_to_uri
+from rest_framework import relations, serializers
+from rest_framework.fields import empty
+from rest_framework.settings import api_settings
+
+from .images import rendition_urls
+from .serializers import RenditionsField
+
+# Fields whose to_representation() returns the value read from the database unchanged
+UNCHANGED = {
+    serializers.IntegerField, serializers.CharField, serializers.EmailField, serializers.URLField,
+    serializers.SlugField, serializers.BooleanField,
+}
+# Fields whose to_representation() depends on the value alone
+BY_VALUE = {
+    serializers.FloatField, serializers.DecimalField, serializers.ChoiceField, serializers.DateField,
+    serializers.DateTimeField, serializers.TimeField, serializers.DurationField, serializers.UUIDField,
+}
+
+# A compiled serializer field. ``kind`` says what ``argument`` holds:
+#   'value'       the transform of the column or annotation ``source``, or None
+#   'file'        the storage of the file column ``source``
+#   'renditions'  nothing; ``source`` is a renditions JSON column
+#   'pks'/'slugs' the related model's column listed, for the many-to-many ``source``
+#   'nested'      the ``Plan`` of the related rows, for the many-to-many ``source``
+Field = namedtuple('Field', 'name kind source argument')
+# The through model of a many-to-many relation, its foreign keys to the
+# row and the related row, and the related model's ordering across the join
+Relation = namedtuple('Relation', 'through source target ordering')
+
+
+class Plan:
+    """
+    How to build a serializer's ``many=True`` data from ``values_list()`` rows
+    """
+
+    def __init__(self, model, fields, columns, annotations, relations):
+        self.model = model
+        self.fields = fields
+        # Concrete columns, the primary key first
+        self.columns = columns
+        # Annotations read when the queryset has them, e.g. search_rank
+        self.annotations = annotations
+        # {name: (Relation, columns of the related model the fields read)}
+        self.relations = relations
+
+    def select(self, queryset):
+        """
+        Names of the columns to read from ``queryset``
+        """
+        query = queryset.query
+        present = [name for name in self.annotations if name in query.annotations or name in query.extra]
+        return [*self.columns, *present]
+
+    def values(self, queryset, columns):
+        return queryset.prefetch_related(None).values_list(*columns)
+
+    def rows(self, queryset):
+        """
+        The rows of ``queryset``, read in one query
+        """
+        columns = self.select(queryset)
+        return Rows(self.values(queryset, columns), columns)
+
+    def represent(self, rows, request=None):
+        """
+        The serializer's data for ``rows``, with URLs made absolute for ``request``
+        """
+        if not rows:
+            return []
+        getters = self._getters(rows, request)
+        data = []
+        for row in rows:
+            item = {}
+            for name, position, transform in getters:
+                value = row[position]
+                # As Serializer.to_representation(), which passes None through
+                item[name] = value if transform is None or value is None else transform(value)
+            data.append(item)
+        return data
+
+    def _getters(self, rows, request):
+        """
+        (name, position in the row, transform) of each field present in ``rows``
+        """
+        index = {name: position for position, name in enumerate(rows.columns)}
+        build_url = request.build_absolute_uri if request is not None else None
+        links = {}
+        if self.relations:
+            pks = [row[0] for row in rows]
+            links = {name: self._links(relation, columns, pks)
+                     for name, (relation, columns) in self.relations.items()}
+
+        getters = []
+        for field in self.fields:
+            if field.kind in ('pks', 'slugs', 'nested'):
+                # The transform takes the row's primary key
+                grouped = self._group(field, links[field.source], request)
+                getters.append((field.name, 0, lambda pk, grouped=grouped: grouped.get(pk) or []))
+            elif field.source in index:
+                if field.kind == 'file':
+                    transform = _file_url(field.argument, build_url)
+                elif field.kind == 'renditions':
+                    transform = functools.partial(rendition_urls, build_url=build_url)
+                else:
+                    transform = field.argument
+                getters.append((field.name, index[field.source], transform))
+        return getters
+
+    def _links(self, relation, columns, pks):
+        """
+        Rows of (row pk, *related columns), one per link, in the related model's order
+        """
+        return relation.through.objects.filter(**{f'{relation.source}__in': pks}).order_by(
+            *relation.ordering
+        ).values_list(relation.source, *(f'{relation.target}__{column}' for column in columns))
+
+    def _group(self, field, links, request):
+        """
+        {row pk: [field representation of each related row]}
+        """
+        relation, columns = self.relations[field.source]
+        if field.kind == 'nested':
+            related = Rows((link[1:] for link in links), columns)
+            values = zip((link[0] for link in links), field.argument.represent(related, request))
+        else:
+            position = columns.index(field.argument) + 1
+            values = ((link[0], link[position]) for link in links)
+        grouped = {}
+        for pk, value in values:
+            grouped.setdefault(pk, []).append(value)
+        return grouped
+
+
+class Rows(list):
+    """
+    ``values_list()`` tuples and the names of their columns
+    """
+
+    def __init__(self, rows, columns):
+        super().__init__(rows)
+        self.columns = columns
+
+
+class ValuesSerializer:
+    """
+    Stands in for ``serializer_class(rows, many=True)`` with a ``Plan``; only ``data`` is supported
+    """
+
+    def __init__(self, plan, rows, context=None):
+        self.plan = plan
+        self.rows = rows
+        self.context = context or {}
+
+    @functools.cached_property
+    def data(self):
+        return self.plan.represent(self.rows, self.context.get('request'))
+
+
+class ValuesListMixin:
+    """
+    Serialize the lists of a read-only viewset from ``values_list()`` rows
+
+    Applies to ``list`` with page numbers and to actions that pass a queryset
+    to ``get_serializer(..., many=True)``.
+    """
+
+    def get_values_plan(self):
+        if not settings.API_VALUES_SERIALIZERS:
+            return None
+        fields, omit = self.requested_fields(), self.omitted_fields()
+        return get_plan(
+            self.get_serializer_class(),
+            tuple(sorted(set(fields))) if fields is not None else None,
+            tuple(sorted(set(omit))) if omit is not None else None,
+        )
+
+    def paginate_queryset(self, queryset):
+        plan = self.get_values_plan()
+        # Keyset pages read their position from model instances
+        keyset = getattr(self, 'keyset_field', None) and self.paginator.use_keyset(self.request)
+        if plan is None or keyset or queryset.model is not plan.model:
+            return super().paginate_queryset(queryset)
+        columns = plan.select(queryset)
+        page = super().paginate_queryset(plan.values(queryset, columns))
+        return None if page is None else Rows(page, columns)
+
+    def get_serializer(self, *args, **kwargs):
+        rows = args[0] if args else None
+        if kwargs.get('many') and isinstance(rows, (Rows, QuerySet)):
+            plan = self.get_values_plan()
+            if isinstance(rows, QuerySet) and plan is not None and rows.model is plan.model:
+                rows = plan.rows(rows)
+            if isinstance(rows, Rows):
+                return ValuesSerializer(plan, rows, self.get_serializer_context())
+        return super().get_serializer(*args, **kwargs)
+
+
+def _file_url(storage, build_url):
+    """
+    Transform from a file name to FileField's representation: its URL, absolute with ``build_url``
+    """
+    base_url = getattr(storage, 'base_url', None)
+    # __class__, not type(): default_storage is a lazy proxy
+    if not isinstance(storage, FileSystemStorage) or storage.__class__.url is not FileSystemStorage.url or not base_url:
+        def url(name):
+            if not name:
+                return None
+            return build_url(storage.url(name)) if build_url else storage.url(name)
+        return url
+
+    # FileSystemStorage.url() joins the quoted name to base_url, and
+    # build_absolute_uri() prefixes the scheme and host; do both once
+    prefix = build_url(base_url) if build_url else base_url
+
+    def url(name):
+        if not name:
+            return None
+        path = filepath_to_uri(name).lstrip('/')
+        if '/.' in '/' + path:
+            # Dot segments, which urljoin() resolves
+            return build_url(storage.url(name)) if build_url else storage.url(name)
+        return prefix + path
+    return url
+
+
+@functools.lru_cache(maxsize=256)
+def get_plan(serializer_class, fields=None, omit=None):
+    """
+    The ``Plan`` of ``serializer_class(fields=fields, omit=omit)``, or None if it has a field no plan can reproduce
+    """
+    return compile_serializer(serializer_class(fields=fields, omit=omit))
+
+
+def compile_serializer(serializer):
+    model = serializer.Meta.model
+    fields, columns, annotations, relations = [], [model._meta.pk.name], [], {}
+    for name, serializer_field in serializer.fields.items():
+        if serializer_field.write_only:
+            continue
+        field = _compile_field(model, name, serializer_field)
+        if field is None:
+            return None
+        fields.append(field)
+        if field.kind in ('pks', 'slugs', 'nested'):
+            relation, related_columns = relations.setdefault(field.source, (_relation(model, field.source), []))
+            wanted = field.argument.columns if field.kind == 'nested' else [field.argument]
+            related_columns += [column for column in wanted if column not in related_columns]
+        elif field.source not in columns and field.source not in annotations:
+            try:
+                model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                annotations.append(field.source)
+            else:
+                columns.append(field.source)
+    return Plan(model, fields, columns, annotations, relations)
+
+
+def _compile_field(model, name, field):
+    source = field.source
+    if source == '*' or '.' in source:
+        return None
+
+    if isinstance(field, serializers.ListSerializer):
+        many_to_many = _many_to_many(model, source)
+        child = field.child
+        if (many_to_many is None or not isinstance(child, serializers.ModelSerializer)
+                or child.Meta.model is not many_to_many.related_model):
+            return None
+        nested = compile_serializer(child)
+        if nested is None or nested.annotations or nested.relations:
+            return None
+        return Field(name, 'nested', source, nested)
+
+    if type(field) is relations.ManyRelatedField:
+        many_to_many = _many_to_many(model, source)
+        child = field.child_relation
+        if many_to_many is None:
+            return None
+        if type(child) is relations.PrimaryKeyRelatedField and child.pk_field is None:
+            return Field(name, 'pks', source, many_to_many.related_model._meta.pk.name)
+        if type(child) is relations.SlugRelatedField and '__' not in child.slug_field:
+            return Field(name, 'slugs', source, child.slug_field)
+        return None
+
+    try:
+        model_field = model._meta.get_field(source)
+    except FieldDoesNotExist:
+        # An annotation: the serializer skips the field when the row lacks it
+        if hasattr(model, source) or field.required or field.allow_null or field.default is not empty:
+            return None
+        model_field = None
+    else:
+        if not model_field.concrete or model_field.is_relation:
+            return None
+
+    kind = type(field)
+    if kind is RenditionsField:
+        return Field(name, 'renditions', source, None) if model_field is not None else None
+    if kind in (serializers.FileField, serializers.ImageField):
+        if model_field is None:
+            return None
+        if getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+            return Field(name, 'file', source, model_field.storage)
+        return Field(name, 'value', source, _name_or_none)
+    if kind in UNCHANGED:
+        return Field(name, 'value', source, None)
+    if kind in BY_VALUE:
+        return Field(name, 'value', source, field.to_representation)
+    if kind is serializers.JSONField and not field.binary:
+        return Field(name, 'value', source, None)
+    return None
+
+
+def _name_or_none(name):
+    return name or None
+
+
+def _many_to_many(model, name):
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+    if not field.many_to_many or not field.concrete:
+        return None
+    # Orderings _relation() can follow across the join
+    if not all(isinstance(order, str) and order != '?' for order in field.related_model._meta.ordering):
+        return None
+    return field
+
+
+def _relation(model, name):
+    field = model._meta.get_field(name)
+    target = field.m2m_reverse_field_name()
+    ordering = []
+    for order in field.related_model._meta.ordering:
+        descending = order.startswith('-')
+        ordering.append(f'{"-" if descending else ""}{target}__{order.lstrip("-")}')
+    return Relation(field.remote_field.through, field.m2m_field_name(), target, ordering)
@@ -1,12 +1,33 @@
+import ipaddress
+
+from django.conf import settings
+from django.db.models import Prefetch
+from django.http import Http404, HttpResponse, HttpResponseForbidden
 from django.shortcuts import render
-from rest_framework import viewsets, permissions, filters
-from rest_framework.decorators import action
+from django.utils.crypto import constant_time_compare
+from rest_framework import viewsets, permissions, filters, status
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-from .models import Member, BlogPost, Project
-from .serializers import MemberSerializer, BlogPostSerializer, ProjectSerializer
+from .cache import CachedResponseMixin, cached
+from .conditional import ConditionalGetMixin, conditional_response, set_validators
+from .counters import existing_post_ids, parse_post_id, record_views
+from .export import ExportMixin
+from .lookup import SlugLookupMixin
+from . import metrics as metrics_registry
+from .models import Member, BlogPost, Project, Technology
+from .roster import get_roster
+from .search import BlogSearchFilter
+from .serializers import (
+    MemberSerializer, MemberBasicSerializer, BlogPostSerializer, BlogPostCardSerializer,
+    ProjectSerializer, ProjectCardSerializer,
+)
+from .sparse import SparseFieldsMixin
+from .stats import get_stats
+from .values import ValuesListMixin
 
 # API Views
-class MemberViewSet(viewsets.ReadOnlyModelViewSet):
+class MemberViewSet(CachedResponseMixin, ConditionalGetMixin, ValuesListMixin, SparseFieldsMixin, ExportMixin,
+                    viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for viewing team members
     """
@@ -16,9 +37,11 @@ class MemberViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'designation', 'batch', 'bio']
     ordering_fields = ['name', 'batch', 'joined_date']
+    cache_dependencies = (Member,)
+    last_modified_field = 'updated_at'
     
     def get_queryset(self):
-        queryset = Member.objects.all()
+        queryset = super().get_queryset()
         
         # Filter by active status
         active = self.request.query_params.get('active')
@@ -45,36 +68,64 @@ class MemberViewSet(viewsets.ReadOnlyModelViewSet):
         return queryset
     
     @action(detail=False)
+    @cached
     def por_holders(self, request):
         """
         Return a list of all POR holders
         """
-        por_holders = Member.objects.filter(is_por_holder=True)
+        por_holders = self.filter_queryset(self.get_queryset()).filter(is_por_holder=True)
         serializer = self.get_serializer(por_holders, many=True)
         return Response(serializer.data)
     
     @action(detail=False)
+    @cached
     def active(self, request):
         """
         Return a list of active members
         """
-        active_members = Member.objects.filter(is_active=True)
+        active_members = self.filter_queryset(self.get_queryset()).filter(is_active=True)
         serializer = self.get_serializer(active_members, many=True)
         return Response(serializer.data)
 
-class BlogPostViewSet(viewsets.ReadOnlyModelViewSet):
+    @action(detail=False)
+    def roster(self, request):
+        """
+        Return every member in one response, with POR holder, active and batch groups
+
+        Served from a snapshot that is rebuilt when members change (see main/roster.py).
+        """
+        snapshot = get_roster()
+        etag = f'"roster-{snapshot["version"]}"'
+        last_modified = snapshot['version'] // 10 ** 9
+        response = conditional_response(request, etag, last_modified)
+        if response is None:
+            response = Response(snapshot['data'])
+            set_validators(response, etag, last_modified)
+        return response
+
+class BlogPostViewSet(CachedResponseMixin, ConditionalGetMixin, ValuesListMixin, SparseFieldsMixin, ExportMixin,
+                      SlugLookupMixin, viewsets.ReadOnlyModelViewSet):
     """
-    API endpoint for viewing blog posts
+    API endpoint for viewing blog posts, by id or slug
     """
-    queryset = BlogPost.objects.all()
+    # author_members and author_members_details both read this prefetch
+    queryset = BlogPost.objects.prefetch_related(
+        Prefetch('author_members', queryset=Member.objects.only(*MemberBasicSerializer.Meta.fields))
+    )
     serializer_class = BlogPostSerializer
+    card_serializer_class = BlogPostCardSerializer
     permission_classes = [permissions.AllowAny]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [BlogSearchFilter, filters.OrderingFilter]
+    # Only used when the database has no full-text search (see main/search.py)
     search_fields = ['title', 'author', 'blog_content', 'small_description']
     ordering_fields = ['date_published', 'date_created', 'views_count']
+    cache_dependencies = (BlogPost, Member)
+    last_modified_field = 'date_modified'
+    etag_fields = ('views_count',)
+    keyset_field = 'date_published'
     
     def get_queryset(self):
-        queryset = BlogPost.objects.all()
+        queryset = super().get_queryset()
         
         # Filter by published status
         published = self.request.query_params.get('published')
@@ -93,53 +144,141 @@ class BlogPostViewSet(viewsets.ReadOnlyModelViewSet):
     def increment_views(self, request, pk=None):
         """
         Increment the view count for a blog post
+
+        The view is buffered and written back in a batch (see main/counters.py);
+        the only query checks that the post exists.
         """
-        blog = self.get_object()
-        blog.views_count = (blog.views_count or 0) + 1
-        blog.save()
+        post_id = parse_post_id(pk)
+        if post_id is None or not existing_post_ids([post_id]):
+            raise Http404
+        record_views([post_id])
         return Response({'status': 'view count incremented'})
 
+    @action(detail=False, methods=['post'], url_path='views')
+    def record_batch_views(self, request):
+        """
+        Record views for several blog posts at once, e.g. from navigator.sendBeacon
+
+        Expects {"ids": [1, 2, 3]}; an id may repeat to count several views.
+        Ids of posts that do not exist are skipped.
+        """
+        ids = request.data.get('ids') if hasattr(request.data, 'get') else None
+        if not isinstance(ids, list) or not ids:
+            return Response({'ids': 'Expected a non-empty list of blog post ids.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > settings.VIEW_COUNTER_MAX_BEACON_IDS:
+            return Response({'ids': f'At most {settings.VIEW_COUNTER_MAX_BEACON_IDS} ids per request.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        post_ids = [parse_post_id(post_id) for post_id in ids]
+        if None in post_ids:
+            return Response({'ids': 'Blog post ids must be positive integers.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        post_ids = existing_post_ids(post_ids)
+        if post_ids:
+            record_views(post_ids)
+        return Response({'status': 'views recorded', 'recorded': len(post_ids)},
+                        status=status.HTTP_202_ACCEPTED)
+
 
-class ProjectViewSet(viewsets.ReadOnlyModelViewSet):
+class ProjectViewSet(CachedResponseMixin, ConditionalGetMixin, ValuesListMixin, SparseFieldsMixin, ExportMixin,
+                     SlugLookupMixin, viewsets.ReadOnlyModelViewSet):
     """
-    API endpoint for viewing projects
+    API endpoint for viewing projects, by id or slug
     """
-    queryset = Project.objects.all()
+    queryset = Project.objects.prefetch_related('technologies')
     serializer_class = ProjectSerializer
+    card_serializer_class = ProjectCardSerializer
+    card_actions = ('list', 'ongoing', 'completed')
     permission_classes = [permissions.AllowAny]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'description', 'short_description', 'technologies_used']  # Removed 'tags'
     ordering_fields = ['name', 'start_date', 'end_date', 'created_at']
+    cache_dependencies = (Project, Technology)
+    last_modified_field = 'updated_at'
+    keyset_field = 'start_date'
     
     def get_queryset(self):
-        queryset = Project.objects.all()
+        queryset = super().get_queryset()
         
         # Filter by status
         status = self.request.query_params.get('status')
         if status is not None:
             queryset = queryset.filter(status=status)
             
-        # Filter by technology
-        technology = self.request.query_params.get('technology')
-        if technology is not None:
-            queryset = queryset.filter(technologies_used__icontains=technology)
+        # Filter by technology tags: ?technology=pytorch&technology=cuda (or
+        # ?technology=pytorch,cuda) matches projects with all of them, or any
+        # of them with ?technology_match=any
+        names = [
+            name for value in self.request.query_params.getlist('technology')
+            for name in value.split(',') if name.strip()
+        ]
+        if names:
+            match_any = self.request.query_params.get('technology_match', 'all').lower() == 'any'
+            queryset = queryset.filter(pk__in=Technology.objects.tagged_project_ids(names, match_any))
             
         return queryset
         
     @action(detail=False)
+    @cached
     def ongoing(self, request):
         """
         Return a list of ongoing projects
         """
-        ongoing = Project.objects.filter(status='ongoing')
+        ongoing = self.filter_queryset(self.get_queryset()).filter(status='ongoing')
         serializer = self.get_serializer(ongoing, many=True)
         return Response(serializer.data)
         
     @action(detail=False)
+    @cached
     def completed(self, request):
         """
         Return a list of completed projects
         """
-        completed = Project.objects.filter(status='completed')
+        completed = self.filter_queryset(self.get_queryset()).filter(status='completed')
         serializer = self.get_serializer(completed, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def stats(request):
+    """
+    Return the landing page counts and highlights in one response
+
+    Served from a snapshot rebuilt when the data changes and on a schedule (see main/stats.py).
+    """
+    snapshot = get_stats()
+    etag = f'"stats-{snapshot["built_at"]}"'
+    last_modified = snapshot['built_at'] // 10 ** 9
+    response = conditional_response(request, etag, last_modified)
+    if response is None:
+        response = Response(snapshot['data'])
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def metrics(request):
+    """
+    Request metrics of every worker in the Prometheus text format (see main/metrics.py)
+
+    Only for the scraper: see METRICS_TOKEN.
+    """
+    if not _may_scrape(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        metrics_registry.render(metrics_registry.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+def _may_scrape(request):
+    if settings.METRICS_TOKEN:
+        return constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {settings.METRICS_TOKEN}')
+    # Behind nginx every request comes from a private address
+    if 'X-Forwarded-For' in request.headers or 'X-Real-IP' in request.headers:
+        return False
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return address.is_loopback or address.is_private
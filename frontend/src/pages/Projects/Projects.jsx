@@ -165,7 +165,12 @@ const fetchProjects = async (pageToFetch, currentFilters) => {
 
     // filters the API actually supports
     if (currentFilters.status) params.set("status", currentFilters.status);
-    if (currentFilters.technology) params.set("technology", currentFilters.technology);
+    // Comma-separated tags must all match (?technology=a&technology=b)
+    currentFilters.technology
+      .split(",")
+      .map((t) => t.trim())
+      .filter(Boolean)
+      .forEach((t) => params.append("technology", t));
     if (currentFilters.search) params.set("search", currentFilters.search);
 
     // API doc shows ?ordering=field (no minus). If UI sends "-field",
@@ -183,15 +188,8 @@ const fetchProjects = async (pageToFetch, currentFilters) => {
     const data = await res.json();
     const raw = Array.isArray(data?.results) ? data.results : Array.isArray(data) ? data : [];
 let normalized = raw.map((p, i) => {
-  // Handle technologies_used and tech_stack fields
-  const techArray =
-    Array.isArray(p.technologies)
-      ? p.technologies
-      : typeof p.technologies_used === "string"
-      ? p.technologies_used.split(",").map(s => s.trim()).filter(Boolean)
-      : typeof p.technologies === "string"
-      ? p.technologies.split(",").map(s => s.trim()).filter(Boolean)
-      : [];
+  // The API returns technologies as an array of tag names
+  const techArray = Array.isArray(p.technologies) ? p.technologies : [];
 
   return {
     id: p.id ?? i + 1,
@@ -384,7 +382,7 @@ let normalized = raw.map((p, i) => {
               name="technology"
               value={filters.technology}
               onChange={handleFilterChange}
-              placeholder="Filter by technology…"
+              placeholder="Technologies, e.g. PyTorch, CUDA"
               className="p-3 rounded-lg bg-white/10 text-white placeholder-white/50 border border-indigo-400/40"
             />
 
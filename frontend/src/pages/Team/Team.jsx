@@ -1,11 +1,11 @@
-import React, { useEffect, useRef, useState, useCallback } from 'react';
+import React, { useEffect, useRef, useState, useCallback, useMemo } from 'react';
 
 const API_BASE_URL = 'https://aiclub-bitsp.dev/api';
 
 /**
  * Team Member Card for Carousel
  */
-const TeamMemberCard = ({ name, position, image, socials, batch, isActive }) => {
+const TeamMemberCard = ({ name, position, image, srcSet, socials, batch, isActive }) => {
   return (
     <div
       className={`flex-shrink-0 w-full max-w-xs sm:w-72 md:w-80 mx-3 transition-all duration-500 transform ${
@@ -24,7 +24,10 @@ const TeamMemberCard = ({ name, position, image, socials, batch, isActive }) =>
           <div className="relative w-40 h-40 sm:w-60 sm:h-60 rounded-full overflow-hidden border-4 border-indigo-400/40 shadow-[0_0_20px_rgba(99,102,241,0.4)] group-hover:border-indigo-300 transition-all duration-500">
             <img
               src={image}
+              srcSet={srcSet}
+              sizes="(min-width: 640px) 240px, 160px"
               alt={name}
+              loading="lazy"
               className="w-full h-full object-cover rounded-full group-hover:scale-110 transition-transform duration-700"
             />
           </div>
@@ -66,7 +69,7 @@ const TeamMemberCard = ({ name, position, image, socials, batch, isActive }) =>
 const Team = () => {
   const containerRef = useRef(null);
   const carouselRef = useRef(null);
-  const [teamMembers, setTeamMembers] = useState([]);
+  const [roster, setRoster] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [currentPage, setCurrentPage] = useState(0); // Now using page index instead of card index
@@ -83,6 +86,102 @@ const Team = () => {
     ordering: 'name',
   });
 
+  // Format a roster member for the carousel card
+  const formatMember = (member) => {
+    // Decide which image field to use
+    let image = null;
+
+    if (member.photo_link) {
+      // Direct external URL (e.g., Google Drive, Cloudinary)
+      image = member.photo_link;
+    } else if (member.photo_file) {
+      // Uploaded image file (relative /media path)
+      image = member.photo_file.startsWith('http')
+        ? member.photo_file
+        : `${API_BASE_URL.replace('/api', '')}${member.photo_file}`;
+    } else {
+      // Fallback placeholder
+      image = 'https://via.placeholder.com/400x400?text=AI+Club+Member';
+    }
+
+    // Resized WebP copies of an uploaded photo (relative /media paths in the roster)
+    const srcSet = member.photo_file && member.photo_renditions
+      ? member.photo_renditions.webp
+          .map(({ width, url }) => `${url.startsWith('http') ? url : `${API_BASE_URL.replace('/api', '')}${url}`} ${width}w`)
+          .join(', ')
+      : undefined;
+
+    // Build socials cleanly
+    const socials = [];
+    if (member.github_link) {
+      socials.push({ icon: 'fab fa-github', url: member.github_link });
+    }
+    if (member.linkedin_link) {
+      socials.push({ icon: 'fab fa-linkedin-in', url: member.linkedin_link });
+    }
+
+    return {
+      id: member.id,
+      name: member.name,
+      position: member.designation,
+      description: member.bio || '',
+      image,
+      srcSet,
+      socials,
+      batch: member.batch,
+      joined_date: member.joined_date,
+      active: member.is_active,
+      porHolder: member.is_por_holder,
+    };
+  };
+
+  // Fetch the whole roster in one request; filters are applied below without refetching
+  const fetchTeamMembers = useCallback(async () => {
+    setLoading(true);
+    setError(null);
+
+    try {
+      const response = await fetch(`${API_BASE_URL}/members/roster/`);
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+      const data = await response.json();
+      setRoster((data.members || []).map(formatMember));
+    } catch (e) {
+      console.error("Failed to fetch team members:", e);
+      setError("Failed to load team data. Please try again later.");
+    } finally {
+      setLoading(false);
+    }
+  }, []);
+
+  useEffect(() => {
+    fetchTeamMembers();
+  }, [fetchTeamMembers]);
+
+  // Same filters and orderings as /api/members/, applied to the roster
+  const teamMembers = useMemo(() => {
+    const contains = (value, query) => (value || '').toLowerCase().includes(query.toLowerCase());
+    const members = roster.filter(member =>
+      (filters.active === 'all' || String(Boolean(member.active)) === filters.active) &&
+      (filters.por_holders === 'all' || String(Boolean(member.porHolder)) === filters.por_holders) &&
+      (!filters.batch || member.batch === filters.batch) &&
+      (!filters.designation || contains(member.position, filters.designation)) &&
+      (!filters.search || [member.name, member.position, member.batch, member.description]
+        .some(value => contains(value, filters.search)))
+    );
+    if (filters.ordering) {
+      const field = filters.ordering.replace('-', '');
+      const direction = filters.ordering.startsWith('-') ? -1 : 1;
+      members.sort((a, b) => direction * (a[field] || '').localeCompare(b[field] || ''));
+    }
+    return members;
+  }, [roster, filters]);
+
+  useEffect(() => {
+    setCurrentPage(0);
+  }, [filters]);
+
   // Calculate total pages
   const totalPages = Math.ceil(teamMembers.length / cardsPerPage);
 
@@ -99,147 +198,6 @@ const Team = () => {
     return () => clearInterval(interval);
   }, [autoPlay, totalPages]);
 
- // ... inside the Team component
-
-// Build API URL based on filters
-const buildApiUrl = (currentFilters) => {
-    const params = new URLSearchParams();
-    
-    // Handle special endpoints (if por_holders=true and no other filters)
-    if (currentFilters.por_holders === 'true' && 
-        currentFilters.active === 'all' && 
-        !currentFilters.batch && 
-        !currentFilters.search && 
-        !currentFilters.designation) {
-      return `${API_BASE_URL}/members/por_holders/`;
-    }
-    
-    // Add filter parameters to URLSearchParams
-    if (currentFilters.active !== 'all') {
-      params.append('active', currentFilters.active);
-    }
-    if (currentFilters.por_holders !== 'all') {
-      params.append('por_holders', currentFilters.por_holders);
-    }
-    // ... (other filters like batch, designation, search, ordering)
-    if (currentFilters.batch) {
-      params.append('batch', currentFilters.batch);
-    }
-    if (currentFilters.designation) {
-      params.append('designation', currentFilters.designation);
-    }
-    if (currentFilters.search) {
-      params.append('search', currentFilters.search);
-    }
-    if (currentFilters.ordering) {
-      params.append('ordering', currentFilters.ordering);
-    }
-    
-    const queryString = params.toString();
-    // Return the final URL
-    return `${API_BASE_URL}/members/${queryString ? `?${queryString}` : ''}`;
-};
-  // Fetch team members
-  // Fetch team members with pagination support
-const fetchTeamMembers = useCallback(async () => {
-    setLoading(true);
-    setError(null);
-    
-    // Start with the initial URL based on filters
-    let currentURL = buildApiUrl(filters);
-    let allMembers = [];
-    
-    try {
-        while (currentURL) {
-            console.log('Fetching from:', currentURL);
-            
-            const response = await fetch(currentURL); 
-            
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            
-            const data = await response.json();
-            
-            // Extract members from the current page
-            let membersData = [];
-            if (Array.isArray(data.results)) {
-                membersData = data.results; // Standard DRF pagination
-            } else if (Array.isArray(data.members)) {
-                membersData = data.members; // Alternate array key
-            } else if (Array.isArray(data)) {
-                membersData = data; // Non-paginated response for the first run
-            }
-            
-            // Add members from the current page to the total list
-            allMembers = [...allMembers, ...membersData];
-            
-            // Set the URL for the next iteration (data.next will be null when done)
-            currentURL = data.next || null;
-            
-            // OPTIONAL: If the response is not paginated, break the loop after the first fetch
-            if (!data.next && !data.results) {
-                break;
-            }
-        } // End of while loop
-        
-        // --- Process All Collected Members ---
-const formattedMembers = allMembers.map(member => {
-  // Decide which image field to use
-  let image = null;
-
-  if (member.photo_link) {
-    // Direct external URL (e.g., Google Drive, Cloudinary)
-    image = member.photo_link;
-  } else if (member.photo_file) {
-    // Uploaded image file (relative /media path)
-    image = member.photo_file.startsWith('http')
-      ? member.photo_file
-      : `${API_BASE_URL.replace('/api', '')}${member.photo_file}`;
-  } else if (member.image || member.image_url) {
-    // Future-proofing in case serializer uses other names
-    image = member.image || member.image_url;
-  } else {
-    // Fallback placeholder
-    image = 'https://via.placeholder.com/400x400?text=AI+Club+Member';
-  }
-
-  // Build socials cleanly
-  const socials = [];
-  if (member.github_link) {
-    socials.push({ icon: 'fab fa-github', url: member.github_link });
-  }
-  if (member.linkedin_link) {
-    socials.push({ icon: 'fab fa-linkedin-in', url: member.linkedin_link });
-  }
-
-  return {
-    id: member.id,
-    name: member.name,
-    position: member.designation,
-    description: member.bio || '',
-    image,
-    socials,
-    batch: member.batch,
-    joined_date: member.joined_date,
-    active: member.is_active, // your model field name
-  };
-});
-
-        
-        setTeamMembers(formattedMembers);
-        setCurrentPage(0); // Reset to the first page after successful fetch
-    } catch (e) {
-        console.error("Failed to fetch team members:", e);
-        setError("Failed to load team data. Please try again later.");
-    } finally {
-        setLoading(false);
-    }
-}, [filters]);
-  useEffect(() => {
-    fetchTeamMembers();
-  }, [fetchTeamMembers]);
-
   // Navigation functions
   const nextPage = () => {
     if (totalPages <= 1) return;
@@ -292,7 +250,7 @@ const formattedMembers = allMembers.map(member => {
   };
 
   // Get batch options from current members
-  const batchOptions = [...new Set(teamMembers.map(member => member.batch).filter(batch => batch))].sort();
+  const batchOptions = [...new Set(roster.map(member => member.batch).filter(batch => batch))].sort();
 
   // Render content based on state
   let content;